@@ -0,0 +1,42 @@
+"""add aggregated import error reporting
+
+Revision ID: 20260304_0005
+Revises: 20260304_0004
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0005"
+down_revision: Union[str, None] = "20260304_0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    history_columns = {col["name"] for col in inspector.get_columns("import_history")}
+    if "error_count" not in history_columns:
+        op.add_column("import_history", sa.Column("error_count", sa.Integer(), nullable=True, server_default="0"))
+    if "error_summary" not in history_columns:
+        op.add_column("import_history", sa.Column("error_summary", sa.JSON(), nullable=True))
+    if "error_report_path" not in history_columns:
+        op.add_column("import_history", sa.Column("error_report_path", sa.String(length=1024), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    history_columns = {col["name"] for col in inspector.get_columns("import_history")}
+    for column_name in ["error_report_path", "error_summary", "error_count"]:
+        if column_name in history_columns:
+            op.drop_column("import_history", column_name)
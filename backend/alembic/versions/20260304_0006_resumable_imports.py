@@ -0,0 +1,44 @@
+"""add resumable import checkpoints
+
+Revision ID: 20260304_0006
+Revises: 20260304_0005
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0006"
+down_revision: Union[str, None] = "20260304_0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    history_columns = {col["name"] for col in inspector.get_columns("import_history")}
+    if "checkpoint_row" not in history_columns:
+        op.add_column("import_history", sa.Column("checkpoint_row", sa.Integer(), nullable=True))
+    if "checkpoint_offset" not in history_columns:
+        op.add_column("import_history", sa.Column("checkpoint_offset", sa.BigInteger(), nullable=True))
+    if "upload_path" not in history_columns:
+        op.add_column("import_history", sa.Column("upload_path", sa.String(length=1024), nullable=True))
+    if "resume_state" not in history_columns:
+        op.add_column("import_history", sa.Column("resume_state", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    history_columns = {col["name"] for col in inspector.get_columns("import_history")}
+    for column_name in ["resume_state", "upload_path", "checkpoint_offset", "checkpoint_row"]:
+        if column_name in history_columns:
+            op.drop_column("import_history", column_name)
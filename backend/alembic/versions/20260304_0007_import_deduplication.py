@@ -0,0 +1,52 @@
+"""add import content hash and idempotency key
+
+Revision ID: 20260304_0007
+Revises: 20260304_0006
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0007"
+down_revision: Union[str, None] = "20260304_0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    history_columns = {col["name"] for col in inspector.get_columns("import_history")}
+    if "content_hash" not in history_columns:
+        op.add_column("import_history", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    if "idempotency_key" not in history_columns:
+        op.add_column("import_history", sa.Column("idempotency_key", sa.String(length=255), nullable=True))
+
+    index_names = {idx["name"] for idx in inspector.get_indexes("import_history")}
+    if "ix_import_history_content_hash" not in index_names:
+        op.create_index("ix_import_history_content_hash", "import_history", ["content_hash"], unique=False)
+    if "ix_import_history_idempotency_key" not in index_names:
+        op.create_index("ix_import_history_idempotency_key", "import_history", ["idempotency_key"], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    index_names = {idx["name"] for idx in inspector.get_indexes("import_history")}
+    if "ix_import_history_idempotency_key" in index_names:
+        op.drop_index("ix_import_history_idempotency_key", table_name="import_history")
+    if "ix_import_history_content_hash" in index_names:
+        op.drop_index("ix_import_history_content_hash", table_name="import_history")
+
+    history_columns = {col["name"] for col in inspector.get_columns("import_history")}
+    for column_name in ["idempotency_key", "content_hash"]:
+        if column_name in history_columns:
+            op.drop_column("import_history", column_name)
@@ -0,0 +1,61 @@
+"""add persistent import jobs
+
+Revision ID: 20260304_0008
+Revises: 20260304_0007
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0008"
+down_revision: Union[str, None] = "20260304_0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "import_jobs" not in inspector.get_table_names():
+        op.create_table(
+            "import_jobs",
+            sa.Column("id", sa.String(length=36), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("table_name", sa.String(length=255), nullable=False),
+            sa.Column("file_name", sa.String(length=255), nullable=False),
+            sa.Column("status", sa.String(length=50), nullable=False),
+            sa.Column("progress", sa.Integer(), nullable=True),
+            sa.Column("message", sa.String(length=1024), nullable=True),
+            sa.Column("params", sa.JSON(), nullable=False),
+            sa.Column("upload_path", sa.String(length=1024), nullable=True),
+            sa.Column("upload_data", sa.LargeBinary(), nullable=True),
+            sa.Column("result", sa.JSON(), nullable=True),
+            sa.Column("worker_id", sa.String(length=255), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_import_jobs_user_id", "import_jobs", ["user_id"], unique=False)
+        op.create_index("ix_import_jobs_status", "import_jobs", ["status"], unique=False)
+        op.create_index("ix_import_jobs_created_at", "import_jobs", ["created_at"], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "import_jobs" in inspector.get_table_names():
+        index_names = {idx["name"] for idx in inspector.get_indexes("import_jobs")}
+        for index_name in ["ix_import_jobs_created_at", "ix_import_jobs_status", "ix_import_jobs_user_id"]:
+            if index_name in index_names:
+                op.drop_index(index_name, table_name="import_jobs")
+        op.drop_table("import_jobs")
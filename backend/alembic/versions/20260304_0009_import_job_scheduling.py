@@ -0,0 +1,43 @@
+"""add import job priority and target connection
+
+Revision ID: 20260304_0009
+Revises: 20260304_0008
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0009"
+down_revision: Union[str, None] = "20260304_0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    job_columns = {col["name"] for col in inspector.get_columns("import_jobs")}
+    if "priority" not in job_columns:
+        op.add_column("import_jobs", sa.Column("priority", sa.Integer(), nullable=False, server_default="0"))
+    if "connection_key" not in job_columns:
+        op.add_column(
+            "import_jobs",
+            sa.Column("connection_key", sa.String(length=255), nullable=False, server_default="primary"),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    job_columns = {col["name"] for col in inspector.get_columns("import_jobs")}
+    for column_name in ["connection_key", "priority"]:
+        if column_name in job_columns:
+            op.drop_column("import_jobs", column_name)
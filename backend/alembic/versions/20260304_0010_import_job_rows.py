@@ -0,0 +1,37 @@
+"""add processed rows to import jobs
+
+Revision ID: 20260304_0010
+Revises: 20260304_0009
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0010"
+down_revision: Union[str, None] = "20260304_0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    job_columns = {col["name"] for col in inspector.get_columns("import_jobs")}
+    if "rows_processed" not in job_columns:
+        op.add_column("import_jobs", sa.Column("rows_processed", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    job_columns = {col["name"] for col in inspector.get_columns("import_jobs")}
+    if "rows_processed" in job_columns:
+        op.drop_column("import_jobs", "rows_processed")
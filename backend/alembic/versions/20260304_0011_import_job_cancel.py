@@ -0,0 +1,48 @@
+"""add import job cancellation and retention index
+
+Revision ID: 20260304_0011
+Revises: 20260304_0010
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0011"
+down_revision: Union[str, None] = "20260304_0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    job_columns = {col["name"] for col in inspector.get_columns("import_jobs")}
+    if "cancel_requested" not in job_columns:
+        op.add_column(
+            "import_jobs",
+            sa.Column("cancel_requested", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    index_names = {idx["name"] for idx in inspector.get_indexes("import_jobs")}
+    if "ix_import_jobs_finished_at" not in index_names:
+        op.create_index("ix_import_jobs_finished_at", "import_jobs", ["finished_at"], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    index_names = {idx["name"] for idx in inspector.get_indexes("import_jobs")}
+    if "ix_import_jobs_finished_at" in index_names:
+        op.drop_index("ix_import_jobs_finished_at", table_name="import_jobs")
+
+    job_columns = {col["name"] for col in inspector.get_columns("import_jobs")}
+    if "cancel_requested" in job_columns:
+        op.drop_column("import_jobs", "cancel_requested")
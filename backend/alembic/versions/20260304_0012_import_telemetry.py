@@ -0,0 +1,39 @@
+"""add import telemetry
+
+Revision ID: 20260304_0012
+Revises: 20260304_0011
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0012"
+down_revision: Union[str, None] = "20260304_0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name in ["import_history", "import_jobs"]:
+        columns = {col["name"] for col in inspector.get_columns(table_name)}
+        if "telemetry" not in columns:
+            op.add_column(table_name, sa.Column("telemetry", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table_name in ["import_jobs", "import_history"]:
+        columns = {col["name"] for col in inspector.get_columns(table_name)}
+        if "telemetry" in columns:
+            op.drop_column(table_name, "telemetry")
@@ -0,0 +1,48 @@
+"""add table version kind for delta versions
+
+Revision ID: 20260304_0013
+Revises: 20260304_0012
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0013"
+down_revision: Union[str, None] = "20260304_0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    if "kind" not in version_columns:
+        op.add_column(
+            "table_versions",
+            sa.Column("kind", sa.String(length=20), nullable=False, server_default="snapshot"),
+        )
+        if bind.dialect.name == "postgresql":
+            has_archive = "version_data->>'archive_table' IS NOT NULL"
+        else:
+            has_archive = "json_extract(version_data, '$.archive_table') IS NOT NULL"
+        op.execute(f"UPDATE table_versions SET kind = 'archive' WHERE {has_archive}")
+        op.execute("UPDATE table_versions SET kind = 'marker' WHERE action = 'rollback_applied'")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    if "kind" in version_columns:
+        # Delta versions cannot be rolled back to without the kind
+        op.execute("DELETE FROM table_versions WHERE kind = 'delta'")
+        op.drop_column("table_versions", "kind")
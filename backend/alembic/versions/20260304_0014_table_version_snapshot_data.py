@@ -0,0 +1,56 @@
+"""add binary snapshot storage to table versions
+
+Revision ID: 20260304_0014
+Revises: 20260304_0013
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0014"
+down_revision: Union[str, None] = "20260304_0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    if "snapshot_data" not in version_columns:
+        op.add_column("table_versions", sa.Column("snapshot_data", sa.LargeBinary(), nullable=True))
+    if "message" not in version_columns:
+        op.add_column("table_versions", sa.Column("message", sa.Text(), nullable=True))
+    if "row_count" not in version_columns:
+        op.add_column("table_versions", sa.Column("row_count", sa.Integer(), nullable=True))
+        if bind.dialect.name == "postgresql":
+            op.execute(
+                "UPDATE table_versions SET row_count = (version_data->>'row_count')::integer, "
+                "message = version_data->>'message'"
+            )
+        else:
+            op.execute(
+                "UPDATE table_versions SET row_count = json_extract(version_data, '$.row_count'), "
+                "message = json_extract(version_data, '$.message')"
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    if "snapshot_data" in version_columns:
+        # Binary snapshots cannot be read back without the column
+        op.execute("DELETE FROM table_versions WHERE snapshot_data IS NOT NULL")
+        op.drop_column("table_versions", "snapshot_data")
+    for column_name in ["message", "row_count"]:
+        if column_name in version_columns:
+            op.drop_column("table_versions", column_name)
@@ -0,0 +1,69 @@
+"""promote table version metadata to columns
+
+Revision ID: 20260304_0015
+Revises: 20260304_0014
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0015"
+down_revision: Union[str, None] = "20260304_0014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    if "source_version_id" not in version_columns:
+        op.add_column("table_versions", sa.Column("source_version_id", sa.Integer(), nullable=True))
+        if bind.dialect.name == "postgresql":
+            op.execute(
+                "UPDATE table_versions SET source_version_id = (version_data->>'source_version_id')::integer "
+                "WHERE kind = 'marker'"
+            )
+        else:
+            op.execute(
+                "UPDATE table_versions SET source_version_id = json_extract(version_data, '$.source_version_id') "
+                "WHERE kind = 'marker'"
+            )
+    if "byte_size" not in version_columns:
+        op.add_column("table_versions", sa.Column("byte_size", sa.BigInteger(), nullable=True))
+        # Snapshot and archive tables live on the data connection and stay unmeasured here
+        if bind.dialect.name == "postgresql":
+            op.execute(
+                "UPDATE table_versions SET byte_size = COALESCE(octet_length(snapshot_data), "
+                "octet_length(version_data::text)) WHERE kind IN ('snapshot', 'delta')"
+            )
+        else:
+            op.execute(
+                "UPDATE table_versions SET byte_size = COALESCE(length(snapshot_data), "
+                "length(CAST(version_data AS BLOB))) WHERE kind IN ('snapshot', 'delta')"
+            )
+
+    index_names = {idx["name"] for idx in inspector.get_indexes("table_versions")}
+    if "ix_table_versions_table_name_id" not in index_names:
+        op.create_index("ix_table_versions_table_name_id", "table_versions", ["table_name", "id"], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    index_names = {idx["name"] for idx in inspector.get_indexes("table_versions")}
+    if "ix_table_versions_table_name_id" in index_names:
+        op.drop_index("ix_table_versions_table_name_id", table_name="table_versions")
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    for column_name in ["byte_size", "source_version_id"]:
+        if column_name in version_columns:
+            op.drop_column("table_versions", column_name)
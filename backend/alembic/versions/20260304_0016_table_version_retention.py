@@ -0,0 +1,63 @@
+"""add table version retention policies
+
+Revision ID: 20260304_0016
+Revises: 20260304_0015
+Create Date: 2026-03-04
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20260304_0016"
+down_revision: Union[str, None] = "20260304_0015"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    if "connection_id" not in version_columns:
+        # Existing snapshot and archive tables are taken to be on the primary connection
+        op.add_column("table_versions", sa.Column("connection_id", sa.Integer(), nullable=True))
+
+    if "table_version_policies" not in inspector.get_table_names():
+        op.create_table(
+            "table_version_policies",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("table_name", sa.String(length=255), nullable=False),
+            sa.Column("keep_last", sa.Integer(), nullable=True),
+            sa.Column("keep_days", sa.Integer(), nullable=True),
+            sa.Column("keep_daily_days", sa.Integer(), nullable=True),
+            sa.Column("keep_weekly_weeks", sa.Integer(), nullable=True),
+            sa.Column("updated_by", sa.Integer(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_table_version_policies_id", "table_version_policies", ["id"], unique=False)
+        op.create_index(
+            "ix_table_version_policies_table_name", "table_version_policies", ["table_name"], unique=True
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "table_version_policies" in inspector.get_table_names():
+        index_names = {idx["name"] for idx in inspector.get_indexes("table_version_policies")}
+        for index_name in ["ix_table_version_policies_table_name", "ix_table_version_policies_id"]:
+            if index_name in index_names:
+                op.drop_index(index_name, table_name="table_version_policies")
+        op.drop_table("table_version_policies")
+
+    version_columns = {col["name"] for col in inspector.get_columns("table_versions")}
+    if "connection_id" in version_columns:
+        op.drop_column("table_versions", "connection_id")
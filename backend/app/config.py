@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pydantic_settings import BaseSettings
 
 
@@ -8,6 +10,54 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # CSV import pipeline
+    IMPORT_READ_CHUNK_SIZE: int = 1024 * 1024
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_LOAD_METHOD: str = "auto"  # auto | copy | insert
+    IMPORT_VALIDATION_MODE: str = "row"  # row | columnar (needs pyarrow)
+    IMPORT_VALIDATION_WORKERS: int = 0  # process pool size, <= 1 validates in-process
+    IMPORT_VALIDATION_CHUNK_SIZE: int = 20000
+    IMPORT_ERROR_INLINE_LIMIT: int = 100  # errors kept in the response and history row
+    IMPORT_ERROR_EXAMPLES_PER_GROUP: int = 5
+    IMPORT_ERROR_REPORT_DIR: str = os.path.join(tempfile.gettempdir(), "csv_import", "reports")
+    IMPORT_ERROR_REPORT_TTL_SECONDS: int = 30 * 24 * 3600  # full error reports older than this are deleted
+    IMPORT_CHECKPOINT_ROWS: int = 100000  # rows per commit in resumable imports
+    IMPORT_STAGING_DIR: str = os.path.join(tempfile.gettempdir(), "csv_import", "staging")
+    IMPORT_STAGING_MEMORY_LIMIT: int = 1024 * 1024  # smaller async uploads are queued in memory
+    IMPORT_STAGING_QUOTA_BYTES: int = 20 * 1024 ** 3  # disk budget of all staged uploads
+    IMPORT_STAGING_TTL_SECONDS: int = 3 * 24 * 3600  # staged uploads older than this are purged
+    # Background import jobs; with "worker" they are run by `python -m app.worker`,
+    # which needs the same metadata DB and IMPORT_STAGING_DIR as the web process
+    IMPORT_JOB_RUNNER: str = "inline"  # inline (in the web process) | worker
+    IMPORT_WORKER_POLL_SECONDS: float = 1.0
+    IMPORT_INLINE_POLL_SECONDS: float = 5.0  # inline runner: seconds between checks for queued and stale jobs
+    IMPORT_JOB_STALE_SECONDS: int = 900  # running jobs without a heartbeat for this long are failed
+    IMPORT_JOB_HEARTBEAT_SECONDS: float = 30.0  # running jobs refresh their heartbeat at least this often
+    IMPORT_MAX_RUNNING_JOBS: int = 4
+    IMPORT_MAX_RUNNING_JOBS_PER_USER: int = 2
+    IMPORT_MAX_RUNNING_JOBS_PER_CONNECTION: int = 2  # per target data connection
+    IMPORT_MAX_QUEUED_JOBS: int = 100  # further async imports are rejected with 429
+    IMPORT_MAX_QUEUED_JOBS_PER_USER: int = 10
+    IMPORT_PROGRESS_STREAM_INTERVAL: float = 1.0  # min seconds between job checks shared by progress streams
+    IMPORT_QUEUE_STATUS_INTERVAL: float = 5.0  # seconds between queue position updates of a stream
+    IMPORT_JOB_TTL_SECONDS: int = 7 * 24 * 3600  # finished jobs are deleted after this
+    IMPORT_JOB_MAX_FINISHED: int = 10000  # and only the most recently finished ones are kept
+    IMPORT_JOB_RESULT_ERROR_LIMIT: int = 20  # errors kept in a job result, the rest stay in the history
+
+    # Table versions: row edits are stored as deltas, with a full snapshot every N of them
+    TABLE_VERSION_BASE_INTERVAL: int = 50
+    TABLE_VERSION_SNAPSHOT_CODEC: str = "auto"  # auto (zstd when installed) | zstd | zlib
+    # auto: snapshot copies as tables in the data database on PostgreSQL, encoded blobs otherwise
+    TABLE_VERSION_SNAPSHOT_BACKEND: str = "auto"  # auto | table | blob
+    # Retention defaults, overridable per table; versions outside all of them are deleted by compaction.
+    # Compaction is opt-in: it permanently drops rollback points, set an interval to enable it
+    TABLE_VERSION_KEEP_LAST: int = 20
+    TABLE_VERSION_KEEP_DAYS: int = 7
+    TABLE_VERSION_KEEP_DAILY_DAYS: int = 30
+    TABLE_VERSION_KEEP_WEEKLY_WEEKS: int = 12
+    TABLE_VERSION_COMPACTION_INTERVAL_SECONDS: int = 0  # 0 (default) disables background compaction, e.g. 3600
+    TABLE_VERSION_COMPACTION_BATCH: int = 200  # versions deleted per transaction
+
     class Config:
         env_file = ".env"
 
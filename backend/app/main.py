@@ -1,7 +1,14 @@
+import asyncio
+import logging
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from app.config import settings
 from app.models import Base, engine
 from app.routes import auth, tables, admin, connections
+from app.utils.version_retention import run_version_compaction
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -29,6 +36,38 @@ app.include_router(admin.router)
 app.include_router(connections.router)
 
 
+async def _compact_versions_periodically() -> None:
+    while True:
+        try:
+            await run_in_threadpool(run_version_compaction)
+        except Exception:
+            logger.exception("Failed to compact table versions")
+        await asyncio.sleep(settings.TABLE_VERSION_COMPACTION_INTERVAL_SECONDS)
+
+
+async def _run_import_jobs_periodically() -> None:
+    while True:
+        try:
+            await run_in_threadpool(tables.run_inline_import_jobs)
+        except Exception:
+            logger.exception("Failed to run queued import jobs")
+        await asyncio.sleep(settings.IMPORT_INLINE_POLL_SECONDS)
+
+
+@app.on_event("startup")
+async def start_import_jobs() -> None:
+    """With the inline import runner, jobs queued before a restart or held back by the caps are run from here"""
+    if settings.IMPORT_JOB_RUNNER == "inline":
+        app.state.import_jobs = asyncio.create_task(_run_import_jobs_periodically())
+
+
+@app.on_event("startup")
+async def start_version_compaction() -> None:
+    """With the inline import runner nothing else compacts versions, so the web process does"""
+    if settings.IMPORT_JOB_RUNNER == "inline" and settings.TABLE_VERSION_COMPACTION_INTERVAL_SECONDS > 0:
+        app.state.version_compaction = asyncio.create_task(_compact_versions_periodically())
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
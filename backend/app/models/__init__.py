@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, create_engine
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, JSON, LargeBinary, Index, create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred, sessionmaker
 from datetime import datetime
 from app.config import settings
 
@@ -30,9 +30,48 @@ class ImportHistory(Base):
     table_name = Column(String(255), nullable=False)
     file_name = Column(String(255), nullable=False)
     rows_imported = Column(Integer, default=0)
-    validation_errors = Column(JSON, nullable=True)
+    validation_errors = Column(JSON, nullable=True)  # first IMPORT_ERROR_INLINE_LIMIT errors
+    error_count = Column(Integer, default=0)
+    error_summary = Column(JSON, nullable=True)  # per column/kind counters
+    error_report_path = Column(String(1024), nullable=True)  # full gzip JSONL report
+    # Resumable imports: rows_imported counts committed rows
+    checkpoint_row = Column(Integer, nullable=True)  # next CSV row to process
+    checkpoint_offset = Column(BigInteger, nullable=True)  # byte offset of checkpoint_row
+    upload_path = Column(String(1024), nullable=True)  # retained upload
+    resume_state = Column(JSON, nullable=True)  # request parameters and error collector state
+    # Deduplication of repeated uploads
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded bytes and the import request
+    idempotency_key = Column(String(255), nullable=True, index=True)  # client Idempotency-Key header
+    telemetry = Column(JSON, nullable=True)  # per-stage time, rows, bytes and memory
     created_at = Column(DateTime, default=datetime.utcnow)
-    status = Column(String(50), default="success")  # success, failed, partial
+    status = Column(String(50), default="success")  # success, failed, partial, running, interrupted, cancelled
+
+
+class ImportJob(Base):
+    """Queued background import, claimed and run by an import worker"""
+    __tablename__ = "import_jobs"
+
+    id = Column(String(36), primary_key=True)  # job_id returned to the client
+    user_id = Column(Integer, nullable=False, index=True)
+    table_name = Column(String(255), nullable=False)
+    file_name = Column(String(255), nullable=False)
+    status = Column(String(50), nullable=False, default="queued", index=True)  # queued, running, completed, failed, cancelled
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    connection_key = Column(String(255), nullable=False, default="primary")  # target data connection
+    progress = Column(Integer, default=0)
+    message = Column(String(1024), nullable=True)
+    rows_processed = Column(BigInteger, nullable=True)
+    params = Column(JSON, nullable=False)  # parsed import request
+    upload_path = Column(String(1024), nullable=True)  # upload staged in IMPORT_STAGING_DIR
+    upload_data = Column(LargeBinary, nullable=True)  # small uploads are queued inline
+    result = Column(JSON, nullable=True)
+    worker_id = Column(String(255), nullable=True)
+    cancel_requested = Column(Integer, nullable=False, default=0)  # checked by the running import between batches
+    telemetry = Column(JSON, nullable=True)  # live per-stage timings of the import
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True, index=True)
 
 
 class TableSchema(Base):
@@ -71,9 +110,35 @@ class TableVersion(Base):
     user_id = Column(Integer, nullable=False, index=True)
     table_name = Column(String(255), nullable=False, index=True)
     action = Column(String(100), nullable=False)
-    version_data = Column(JSON, nullable=False)
+    kind = Column(String(20), nullable=False, default="snapshot")  # snapshot, table, archive, delta, marker
+    row_count = Column(Integer, nullable=True)  # rows in the table before the action
+    message = Column(Text, nullable=True)
+    byte_size = Column(BigInteger, nullable=True)  # storage taken by the payload or the snapshot table
+    source_version_id = Column(Integer, nullable=True)  # version a rollback marker restored
+    connection_id = Column(Integer, nullable=True)  # data connection of snapshot/archive tables, None for primary
+    # Payloads are only loaded when a version is replayed, never for listings
+    version_data = deferred(Column(JSON, nullable=False))  # delta/archive payload, codec stats of snapshots
+    snapshot_data = deferred(Column(LargeBinary, nullable=True))  # snapshot rows, see app.utils.snapshot_codec
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_table_versions_table_name_id", "table_name", "id"),  # keyset pagination per table
+    )
+
+
+class TableVersionPolicy(Base):
+    """Per-table version retention, unset limits fall back to the TABLE_VERSION_KEEP_* settings"""
+    __tablename__ = "table_version_policies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(255), nullable=False, unique=True, index=True)
+    keep_last = Column(Integer, nullable=True)  # newest versions always kept
+    keep_days = Column(Integer, nullable=True)  # all versions younger than this are kept
+    keep_daily_days = Column(Integer, nullable=True)  # then one per day up to this age
+    keep_weekly_weeks = Column(Integer, nullable=True)  # then one per week up to this age
+    updated_by = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 
 class AuditLog(Base):
     """Audit log records for user actions"""
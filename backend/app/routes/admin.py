@@ -13,8 +13,10 @@ from app.schemas.schemas import (
     PermissionUpdateRequest,
     TablePermissionResponse,
     UserSummaryResponse,
+    VersionCompactionResponse,
 )
 from app.utils.audit import log_audit_event
+from app.utils.version_retention import compact_table_versions
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -278,3 +280,21 @@ async def list_audit_logs(
         .limit(safe_limit)
         .all()
     )
+
+
+@router.post("/versions/compact", response_model=VersionCompactionResponse)
+def compact_versions(
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_from_header),
+):
+    """Run the table version compaction now instead of waiting for the background one"""
+    report = compact_table_versions(db)
+    log_audit_event(
+        db,
+        admin_user,
+        action="table_versions_compact",
+        entity_type="table_version",
+        details=report,
+    )
+    db.commit()
+    return report
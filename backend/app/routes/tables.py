@@ -1,24 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Header, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Header, Form, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from sqlalchemy import func
+from sqlalchemy.orm import Session, undefer
+from typing import List, Optional, Dict, Any, AsyncIterator, BinaryIO, Callable, Deque, Iterable, Iterator, Tuple
+from collections import deque
+import asyncio
 import csv
 import io
+import itertools
 import json
-import threading
+import logging
+import os
+import time
 import uuid
+from datetime import datetime
+from app.config import settings
 from app.schemas.schemas import (
-    CreateTableRequest, TableInfo, ImportResponse,
-    ImportHistoryResponse, RowCreateRequest, RowUpdateRequest, RowsDeleteRequest,
-    TableVersionResponse, RollbackResponse
+    CreateTableRequest, TableInfo, ImportResponse, ImportOptions, MergeStats, CSVValidationError,
+    ValidationErrorGroup, ImportHistoryResponse, ImportErrorsPage, RowCreateRequest, RowUpdateRequest, RowsDeleteRequest,
+    TableVersionResponse, RollbackResponse, VersionRetentionPolicy, VersionRetentionResponse
+)
+from app.models import (
+    get_db, ImportHistory, ImportJob, TableSchema, User, TablePermission, SessionLocal, TableVersion, TableVersionPolicy
 )
-from app.models import get_db, ImportHistory, TableSchema, User, TablePermission, SessionLocal, TableVersion
 from app.utils.db_manager import (
-    create_table, drop_table, get_table_info, get_all_tables, insert_rows,
+    create_table, drop_table, get_table_info, get_all_tables, bulk_load_rows, bulk_load_arrow,
     get_row_count, get_table_data, create_row, update_row, delete_rows,
-    get_table_snapshot, restore_table_snapshot
+    get_table_snapshot, restore_table_snapshot, has_unique_key, create_merge_staging, merge_staging,
+    create_shadow_table, copy_table_rows, swap_shadow_table, get_rows_by_ids, revert_row_changes,
+    create_snapshot_table, restore_from_snapshot_table, drop_version_tables, get_table_size
+)
+from app.utils.csv_handler import (
+    preview_csv, read_csv_stream, iter_row_batches, compile_validation_plan, plan_columns, validate_rows,
+    detect_encoding, peek_stream, is_ascii_compatible
+)
+from app.utils.columnar_validation import columnar_available, validate_rows_columnar
+from app.utils.parallel_validation import validate_batches
+from app.utils.import_errors import ImportErrorCollector, purge_expired_error_reports, read_error_report
+from app.utils.compressed_input import open_decompressed
+from app.utils.arrow_import import detect_arrow_format, read_arrow_stream, preview_arrow, validate_record_batch
+from app.utils.import_staging import (
+    retain_upload, stage_upload, open_retained_upload, discard_retained_upload, new_content_hash, hash_stream,
+    StagingQuotaExceeded
+)
+from app.utils.import_telemetry import ImportTelemetry
+from app.utils.import_job_watch import import_job_watcher
+from app.utils.snapshot_codec import encode_snapshot, decode_snapshot
+from app.utils.version_retention import get_retention_policy, POLICY_FIELDS
+from app.utils.import_queue import (
+    enqueue_import_job, claim_import_job, update_import_job, start_import_job_heartbeat, reap_stale_import_jobs,
+    check_import_admission, get_queue_status, get_job_throughput, ImportBacklogFull,
+    ImportCancelled, cancel_import_job, is_import_job_cancel_requested, purge_finished_import_jobs,
+    FINISHED_STATUSES
 )
-from app.utils.csv_handler import parse_csv, preview_csv, decode_csv_bytes, validate_csv_against_table_schema
 from app.routes.auth import get_current_user
 from app.utils.permissions import (
     get_user_by_username,
@@ -31,15 +67,24 @@ from app.utils.audit import log_audit_event
 from app.utils.connection_manager import resolve_data_session
 
 router = APIRouter(prefix="/api/tables", tags=["Tables"])
-import_jobs: Dict[str, Dict[str, Any]] = {}
-import_jobs_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
 
+def _uses_snapshot_tables(data_db: Session) -> bool:
+    backend = settings.TABLE_VERSION_SNAPSHOT_BACKEND
+    if backend == "auto":
+        return data_db.get_bind().dialect.name == "postgresql"
+    if backend not in ("table", "blob"):
+        raise ValueError(f"Unknown snapshot backend '{backend}'")
+    return backend == "table"
 
-def _set_import_job_state(job_id: str, **fields: Any) -> None:
-    with import_jobs_lock:
-        existing = import_jobs.get(job_id, {})
-        existing.update(fields)
-        import_jobs[job_id] = existing
+
+def _version_connection_id(meta_db: Session, data_db: Session, user_id: int) -> Optional[int]:
+    # Snapshot and archive tables live on the data connection, compaction drops them there
+    if data_db is meta_db:
+        return None
+    user = meta_db.get(User, user_id)
+    return user.active_connection_id if user is not None else None
 
 
 def _create_table_version_snapshot(
@@ -50,30 +95,220 @@ def _create_table_version_snapshot(
     action: str,
     message: Optional[str] = None,
 ) -> TableVersion:
-    snapshot_rows = get_table_snapshot(data_db, table_name)
+    started = time.perf_counter()
+    if _uses_snapshot_tables(data_db):
+        # The copy stays in the data database, only its name is recorded
+        snapshot_table, row_count = create_snapshot_table(data_db, table_name)
+        version = TableVersion(
+            user_id=user_id,
+            table_name=table_name,
+            action=action,
+            kind="table",
+            row_count=row_count,
+            message=message,
+            byte_size=get_table_size(data_db, snapshot_table),
+            connection_id=_version_connection_id(meta_db, data_db, user_id),
+            version_data={
+                "snapshot_table": snapshot_table,
+                "write_seconds": round(time.perf_counter() - started, 3),
+            },
+        )
+        meta_db.add(version)
+        return version
+
+    # Rows are stored column-wise and compressed, version_data keeps the codec stats
+    columns, rows = get_table_snapshot(data_db, table_name)
+    snapshot_data, stats = encode_snapshot(columns, rows)
+    version = TableVersion(
+        user_id=user_id,
+        table_name=table_name,
+        action=action,
+        kind="snapshot",
+        row_count=stats["rows"],
+        message=message,
+        byte_size=stats["stored_bytes"],
+        version_data={**stats, "write_seconds": round(time.perf_counter() - started, 3)},
+        snapshot_data=snapshot_data,
+    )
+    meta_db.add(version)
+    return version
+
+
+def _load_snapshot_rows(version: TableVersion) -> Optional[List[Dict[str, Any]]]:
+    # Snapshots taken before the binary format keep their rows in version_data
+    if version.snapshot_data is not None:
+        return decode_snapshot(version.snapshot_data)[1]
+    rows = (version.version_data or {}).get("rows")
+    return rows if isinstance(rows, list) else None
+
+
+def _add_archived_table_version(
+    meta_db: Session,
+    data_db: Session,
+    user_id: int,
+    table_name: str,
+    action: str,
+    archive_table: str,
+    row_count: int,
+    message: Optional[str] = None,
+) -> TableVersion:
+    # The replaced table itself is the snapshot, rollback copies it back
+    version = TableVersion(
+        user_id=user_id,
+        table_name=table_name,
+        action=action,
+        kind="archive",
+        row_count=row_count,
+        message=message,
+        byte_size=get_table_size(data_db, archive_table),
+        connection_id=_version_connection_id(meta_db, data_db, user_id),
+        version_data={"archive_table": archive_table},
+    )
+    meta_db.add(version)
+    return version
+
+
+_BASE_VERSION_KINDS = ("snapshot", "table", "archive")
+
+
+def _create_row_change_version(
+    meta_db: Session,
+    data_db: Session,
+    user_id: int,
+    table_name: str,
+    action: str,
+    row_ids: List[int],
+    message: Optional[str] = None,
+) -> TableVersion:
+    """
+    Version a row edit by the before-images of the rows it changes instead of
+    a full snapshot; ids of inserted rows are added with _record_inserted_rows.
+    Every TABLE_VERSION_BASE_INTERVAL deltas a full snapshot is taken instead,
+    which bounds the number of deltas a rollback has to undo.
+    """
+    last_base_id = meta_db.query(func.max(TableVersion.id)).filter(
+        TableVersion.table_name == table_name,
+        TableVersion.kind.in_(_BASE_VERSION_KINDS),
+    ).scalar()
+    deltas = meta_db.query(func.count(TableVersion.id)).filter(
+        TableVersion.table_name == table_name,
+        TableVersion.kind == "delta",
+        TableVersion.id > (last_base_id or 0),
+    ).scalar() or 0
+    if deltas >= settings.TABLE_VERSION_BASE_INTERVAL:
+        return _create_table_version_snapshot(meta_db, data_db, user_id, table_name, action, message=message)
+
     version = TableVersion(
         user_id=user_id,
         table_name=table_name,
         action=action,
-        version_data={
-            "rows": snapshot_rows,
-            "row_count": len(snapshot_rows),
-            "message": message,
-        },
+        kind="delta",
+        row_count=_current_row_count(meta_db, data_db, table_name),
+        message=message,
     )
+    _set_delta_payload(version, {
+        "before": jsonable_encoder(get_rows_by_ids(data_db, table_name, row_ids)),
+        "inserted_ids": [],
+    })
     meta_db.add(version)
     return version
 
 
+def _newest_version(meta_db: Session, table_name: str) -> Optional[Any]:
+    return (
+        meta_db.query(TableVersion.kind, TableVersion.row_count, TableVersion.version_data)
+        .filter(TableVersion.table_name == table_name)
+        .order_by(TableVersion.id.desc())
+        .first()
+    )
+
+
+def _current_row_count(meta_db: Session, data_db: Session, table_name: str) -> int:
+    """
+    Row count of a table from its newest version where possible, so a row edit
+    does not count the whole table: the count before a delta plus the rows its
+    edit added or removed, or the count a rollback restored. After a full
+    version (an import or a replace changed the table) the table is counted.
+    """
+    newest = _newest_version(meta_db, table_name)
+    if newest is not None and newest.row_count is not None:
+        change = (newest.version_data or {}).get("row_count_change") if newest.kind == "delta" else None
+        if change is not None:
+            return newest.row_count + change
+        if newest.kind == "marker":
+            return newest.row_count
+    return get_row_count(data_db, table_name)
+
+
+def _set_delta_payload(version: TableVersion, payload: Dict[str, Any]) -> None:
+    version.version_data = payload
+    version.byte_size = len(json.dumps(payload).encode("utf-8"))
+
+
+def _record_inserted_rows(version: TableVersion, row_ids: List[int]) -> None:
+    if version.kind == "delta":
+        _set_delta_payload(version, {**version.version_data, "inserted_ids": row_ids, "row_count_change": len(row_ids)})
+
+
+def _record_row_count_change(version: TableVersion, change: int) -> None:
+    if version.kind == "delta":
+        _set_delta_payload(version, {**version.version_data, "row_count_change": change})
+
+
+def _plan_version_replay(db: Session, version: TableVersion) -> Tuple[Optional[TableVersion], List[TableVersion]]:
+    """
+    How to bring a table back to its state before version: the full version
+    to restore first (None to start from the table as it is now) and the deltas
+    to undo after it, newest first. A snapshot or archive is restored directly;
+    for a delta the base is the first full version after it, since every change
+    between the two was recorded as a delta.
+    """
+    if version.kind in _BASE_VERSION_KINDS:
+        return version, []
+
+    base = (
+        db.query(TableVersion)
+        .filter(
+            TableVersion.table_name == version.table_name,
+            TableVersion.kind.in_(_BASE_VERSION_KINDS),
+            TableVersion.id > version.id,
+        )
+        .order_by(TableVersion.id.asc())
+        .first()
+    )
+    deltas = db.query(TableVersion).options(undefer(TableVersion.version_data)).filter(
+        TableVersion.table_name == version.table_name,
+        TableVersion.kind == "delta",
+        TableVersion.id >= version.id,
+    )
+    if base is not None:
+        deltas = deltas.filter(TableVersion.id < base.id)
+    return base, deltas.order_by(TableVersion.id.desc()).all()
+
+
+def _undo_row_changes(data_db: Session, table_name: str, deltas: List[TableVersion]) -> None:
+    for delta in deltas:
+        delta_data = delta.version_data or {}
+        revert_row_changes(data_db, table_name, delta_data.get("before") or [], delta_data.get("inserted_ids") or [])
+
+
+def _get_stream_size(stream: BinaryIO) -> int:
+    position = stream.tell()
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(position)
+    return size
+
+
 def _parse_import_request(
     table_name: Optional[str],
     request: Optional[str],
-) -> tuple[str, Dict[str, str], Optional[str], str, Optional[List[Dict[str, Any]]]]:
+) -> tuple[str, Dict[str, str], Optional[str], str, Optional[List[Dict[str, Any]]], ImportOptions]:
     request_table_name = table_name
     columns_mapping: Dict[str, str] = {}
     delimiter: Optional[str] = None
     encoding: str = "utf-8"
     edited_preview_rows: Optional[List[Dict[str, Any]]] = None
+    options = ImportOptions()
 
     if request:
         try:
@@ -105,13 +340,131 @@ def _parse_import_request(
             request_edited_rows = request_payload.get("edited_preview_rows")
             if isinstance(request_edited_rows, list):
                 edited_preview_rows = request_edited_rows
+            options = ImportOptions.model_validate({
+                key: value
+                for key, value in request_payload.items()
+                if key in ImportOptions.model_fields and value is not None
+            })
         except json.JSONDecodeError:
             raise ValueError("Invalid JSON in request field")
 
     if not request_table_name:
         raise ValueError("table_name is required")
 
-    return request_table_name, columns_mapping, delimiter, encoding, edited_preview_rows
+    return request_table_name, columns_mapping, delimiter, encoding, edited_preview_rows, options
+
+
+_DEDUP_OPTION_FIELDS = {"archive_member", "mode", "key_columns", "delete_missing"}
+
+
+def _import_request_hash(
+    content_hash: str,
+    columns_mapping: Dict[str, str],
+    delimiter: Optional[str],
+    encoding: Optional[str],
+    edited_preview_rows: Optional[List[Dict[str, Any]]],
+    options: ImportOptions,
+) -> str:
+    """
+    Deduplication key of an import: the upload's hash together with every
+    request field that changes what ends up in the table. Tuning options
+    (batch size, load method, priority, ...) are left out.
+    """
+    request = {
+        "columns_mapping": columns_mapping,
+        "delimiter": delimiter,
+        "encoding": encoding,
+        "edited_preview_rows": edited_preview_rows,
+        "options": options.model_dump(include=_DEDUP_OPTION_FIELDS),
+    }
+    digest = new_content_hash()
+    digest.update(content_hash.encode("ascii"))
+    digest.update(json.dumps(jsonable_encoder(request), sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _find_previous_import(
+    meta_db: Session,
+    user_id: int,
+    table_name: str,
+    content_hash: str,
+    idempotency_key: Optional[str],
+) -> Optional[ImportHistory]:
+    """
+    Find the user's finished import of the same upload into table_name.
+    An Idempotency-Key matches the user's earlier request with that key and must
+    come with the same content; without a key the content hash alone is used.
+    Other users' imports never match: the replayed response carries their
+    rejected cell values.
+    content_hash is the _import_request_hash, so the same file imported with a
+    different mapping, edited rows or mode is not a duplicate.
+    """
+    if idempotency_key:
+        previous = (
+            meta_db.query(ImportHistory)
+            .filter(
+                ImportHistory.user_id == user_id,
+                ImportHistory.table_name == table_name,
+                ImportHistory.idempotency_key == idempotency_key,
+            )
+            .order_by(ImportHistory.id.desc())
+            .first()
+        )
+        if previous and previous.content_hash != content_hash:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Idempotency-Key was already used for a different file or import settings",
+            )
+        if previous and previous.status in ("running", "interrupted"):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Import {previous.id} with this Idempotency-Key has not finished",
+            )
+        if previous and previous.status != "failed":
+            return previous
+
+    return (
+        meta_db.query(ImportHistory)
+        .filter(
+            ImportHistory.user_id == user_id,
+            ImportHistory.table_name == table_name,
+            ImportHistory.content_hash == content_hash,
+            ImportHistory.status.in_(["success", "partial"]),
+        )
+        .order_by(ImportHistory.id.desc())
+        .first()
+    )
+
+
+def _previous_import_response(history: ImportHistory) -> ImportResponse:
+    error_count = history.error_count or 0
+    return ImportResponse(
+        success=error_count == 0,
+        rows_imported=history.rows_imported or 0,
+        errors=[CSVValidationError(**error) for error in history.validation_errors or []],
+        error_count=error_count,
+        error_groups=[ValidationErrorGroup(**group) for group in history.error_summary or []],
+        import_id=history.id,
+        deduplicated=True,
+        warnings=["Nothing was imported, use the force option to import the file again"],
+        message=f"File was already imported into {history.table_name} (import {history.id})",
+    )
+
+
+def _save_import_checkpoint(
+    meta_db: Session,
+    history: ImportHistory,
+    next_row: int,
+    offset: Optional[int],
+    rows_committed: int,
+    errors: ImportErrorCollector,
+) -> None:
+    history.checkpoint_row = next_row
+    history.checkpoint_offset = offset
+    history.rows_imported = rows_committed
+    history.error_count = errors.count
+    history.resume_state = {**history.resume_state, "errors": errors.checkpoint()}
+    meta_db.commit()
 
 
 def _execute_import(
@@ -119,173 +472,622 @@ def _execute_import(
     data_db: Session,
     user_id: int,
     file_name: str,
-    content: bytes,
+    source: BinaryIO,
     request_table_name: str,
     columns_mapping: Dict[str, str],
     delimiter: Optional[str],
     encoding: str,
     edited_preview_rows: Optional[List[Dict[str, Any]]],
+    options: Optional[ImportOptions] = None,
     progress_callback: Optional[Any] = None,
+    upload_path: Optional[str] = None,
+    resume_history_id: Optional[int] = None,
+    content_hash: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    cancel_check: Optional[Callable[[bool], bool]] = None,
+    telemetry: Optional[ImportTelemetry] = None,
 ) -> ImportResponse:
-    if progress_callback:
-        progress_callback(10, "Подготовка данных")
-
-    file_content = decode_csv_bytes(content, encoding=encoding)
+    """
+    Validate and load a CSV (or Parquet/Arrow IPC) stream into a table.
+    Resumable imports (options.resumable with a retained upload_path) commit every
+    checkpoint_rows rows and record the next row and its byte offset on the
+    ImportHistory row; resume_history_id continues such an import from there.
+    content_hash and idempotency_key are recorded for deduplication.
+    cancel_check(final) is polled between batches, and with final=True once
+    more right before the commit; once it returns True the import raises
+    ImportCancelled and rolls back to its last checkpoint.
+    Stage timings are collected in telemetry (a new one when not given) and
+    stored on the ImportHistory row.
+    """
+    options = options or ImportOptions()
+    telemetry = telemetry or ImportTelemetry()
+    batch_size = options.batch_size or settings.IMPORT_BATCH_SIZE
+    load_method = options.load_method or settings.IMPORT_LOAD_METHOD
+    validation_mode = options.validation_mode or settings.IMPORT_VALIDATION_MODE
+    checkpoint_rows = options.checkpoint_rows or settings.IMPORT_CHECKPOINT_ROWS
+    validate_batch = validate_rows_columnar if validation_mode == "columnar" else validate_rows
+
+    history: Optional[ImportHistory] = None
+    start_row: Optional[int] = None
+    start_offset: Optional[int] = None
+    if resume_history_id is not None:
+        history = meta_db.query(ImportHistory).filter(ImportHistory.id == resume_history_id).first()
+        if not history or not history.resume_state:
+            raise ValueError("Import cannot be resumed")
+        start_row = history.checkpoint_row
+        start_offset = history.checkpoint_offset
+        upload_path = history.upload_path
 
     if progress_callback:
-        progress_callback(30, "Парсинг CSV")
-
-    headers, rows = parse_csv(file_content, delimiter=delimiter)
-
-    if not columns_mapping:
-        columns_mapping = {header: header for header in headers}
-
-    if edited_preview_rows is not None:
-        rows = edited_preview_rows
-
-    if not rows:
-        raise ValueError("CSV file is empty")
-
-    table_info = get_table_info(data_db, request_table_name)
-    columns_config = {col.name: col.type for col in table_info.columns}
+        progress_callback(10, "Подготовка данных")
 
-    if not all(csv_col in headers for csv_col in columns_mapping.keys()):
-        raise ValueError("Mapping contains CSV columns that are not present in file")
+    try:
+        with telemetry.stage("prepare"):
+            if options.resumable and (edited_preview_rows is not None or not upload_path):
+                raise ValueError("Resumable imports need the original file and cannot use edited preview rows")
+            if validation_mode == "columnar" and not columnar_available():
+                if options.validation_mode:
+                    raise ValueError("Columnar validation requires pyarrow to be installed")
+                logger.warning("IMPORT_VALIDATION_MODE=columnar requires pyarrow, validating rows instead")
+                validate_batch = validate_rows
+
+            # Progress is measured on the upload itself, offsets on the decompressed data
+            raw_source = source
+            total_bytes = _get_stream_size(raw_source)
+            source, _, _ = open_decompressed(raw_source, options.archive_member)
+            sample = peek_stream(source)
+            input_format = detect_arrow_format(sample)
+            # Parquet/Arrow rows are numbered from 1, CSV rows after the header line
+            first_row = 1 if input_format else 2
+            start_row = start_row or first_row
+            if input_format:
+                headers, batches = read_arrow_stream(source, input_format, batch_size=batch_size, start_row=start_row)
+            else:
+                encoding = detect_encoding(sample, encoding)
+                headers, batches = read_csv_stream(
+                    source,
+                    encoding=encoding,
+                    delimiter=delimiter,
+                    batch_size=batch_size,
+                    start_row=start_row,
+                    start_offset=start_offset,
+                )
+
+            if not columns_mapping:
+                columns_mapping = {header: header for header in headers}
+
+            load_batch = bulk_load_rows
+            if edited_preview_rows is not None:
+                batches = iter_row_batches(edited_preview_rows, batch_size)
+            elif input_format:
+                # Record batches are validated column-wise and loaded without row objects
+                validate_batch = validate_record_batch
+                load_batch = bulk_load_arrow
+            # Decompression and decoding are streamed, so they are part of parse
+            batches = telemetry.iterate("parse", batches)
+
+            first_batch = next(batches, None)
+            if first_batch is None and history is None:
+                raise ValueError("CSV file is empty")
+
+            table_info = get_table_info(data_db, request_table_name)
+            columns_config = {col.name: col.type for col in table_info.columns}
+
+            if not all(csv_col in headers for csv_col in columns_mapping.keys()):
+                raise ValueError("Mapping contains CSV columns that are not present in file")
+
+            if not all(db_col in columns_config for db_col in columns_mapping.values()):
+                raise ValueError("Mapping contains table columns that do not exist")
+
+            # Edited preview rows arrive as dicts keyed by CSV column, file rows as lists
+            validation_plan = compile_validation_plan(
+                columns_config,
+                columns_mapping,
+                headers=headers if edited_preview_rows is None else None,
+            )
+            load_columns = plan_columns(validation_plan)
+
+            merge = options.mode == "merge"
+            key_columns = options.key_columns or []
+            if merge:
+                if not key_columns or not set(key_columns) <= set(load_columns):
+                    raise ValueError("Merge imports need key_columns that are all mapped from the file")
+                if options.resumable:
+                    raise ValueError("Merge imports cannot be resumable")
+                if data_db.get_bind().dialect.name != "postgresql":
+                    raise ValueError("Merge imports require a PostgreSQL connection")
+                if not has_unique_key(data_db, request_table_name, key_columns):
+                    raise ValueError(f"Merge imports need a unique index on ({', '.join(key_columns)})")
+            replace = options.mode == "replace"
+            if replace:
+                if options.resumable:
+                    raise ValueError("Replace imports cannot be resumable")
+                if data_db.get_bind().dialect.name != "postgresql":
+                    raise ValueError("Replace imports require a PostgreSQL connection")
+    except Exception:
+        if upload_path and history is None:
+            discard_retained_upload(upload_path)
+        raise
 
-    if not all(db_col in columns_config for db_col in columns_mapping.values()):
-        raise ValueError("Mapping contains table columns that do not exist")
+    # Rolling back to a delta replays every change after it, so rows are only
+    # loaded on top of a committed full version. A resumed import needs a new
+    # one when rows were edited since it started.
+    newest = _newest_version(meta_db, request_table_name) if history is not None else None
+    if not replace and (history is None or (newest is not None and newest.kind == "delta")):
+        with telemetry.stage("snapshot"):
+            snapshot = _create_table_version_snapshot(
+                meta_db=meta_db,
+                data_db=data_db,
+                user_id=user_id,
+                table_name=request_table_name,
+                action="import_before",
+                message=f"Before CSV import: {file_name}" if history is None else f"Before resuming CSV import: {file_name}",
+            )
+            # The version may reference a snapshot table in the data database
+            data_db.commit()
+            meta_db.commit()
+        telemetry.record("snapshot", rows=snapshot.row_count, bytes_read=snapshot.version_data.get("stored_bytes"))
 
-    _create_table_version_snapshot(
-        meta_db=meta_db,
-        data_db=data_db,
-        user_id=user_id,
-        table_name=request_table_name,
-        action="import_before",
-        message=f"Before CSV import: {file_name}",
-    )
+    if options.resumable and history is None:
+        history = ImportHistory(
+            user_id=user_id,
+            table_name=request_table_name,
+            file_name=file_name,
+            rows_imported=0,
+            status="running",
+            checkpoint_row=start_row,
+            upload_path=upload_path,
+            content_hash=content_hash,
+            idempotency_key=idempotency_key,
+            resume_state={
+                "columns_mapping": columns_mapping,
+                "delimiter": delimiter,
+                "encoding": encoding,
+                "options": options.model_dump(),
+                "errors": None,
+            },
+        )
+        meta_db.add(history)
+        # The history references the snapshot, which may be a table in the data database
+        data_db.commit()
+        meta_db.commit()
+
+    # Merge imports stage rows in a temporary table and apply them in one statement,
+    # replace imports fill a shadow table that is swapped in at the end
+    with telemetry.stage("prepare"):
+        if merge:
+            load_table = create_merge_staging(data_db, request_table_name, load_columns)
+        elif replace:
+            load_table = create_shadow_table(data_db, request_table_name)
+        else:
+            load_table = request_table_name
 
     if progress_callback:
-        progress_callback(60, "Валидация строк")
-
-    valid_rows, errors = validate_csv_against_table_schema(
-        rows,
-        columns_config,
-        columns_mapping
-    )
-
-    inserted_count = 0
-    if valid_rows:
+        progress_callback(30, "Валидация и запись строк")
+
+    batch_ends: Deque[Tuple[int, Optional[int]]] = deque()
+    track_offsets = input_format is None and is_ascii_compatible(encoding)
+
+    def tracked_batches(row_batches: Iterable[Tuple[int, List[Any]]]) -> Iterator[Tuple[int, List[Any]]]:
+        # The reader never reads ahead of the batch it yields, so tell() is the
+        # offset of the row that follows it
+        for batch_start, rows in row_batches:
+            batch_ends.append((batch_start + len(rows), source.tell() if track_offsets else None))
+            yield batch_start, rows
+
+    if history is not None:
+        errors = ImportErrorCollector.restore(history.resume_state.get("errors"))
+        inserted_count = history.rows_imported or 0
+    else:
+        errors = ImportErrorCollector()
+        inserted_count = 0
+    processed_count = start_row - first_row
+    last_checkpoint_row = start_row
+    # A resumed plain CSV is read from the checkpoint offset on
+    bytes_skipped = start_offset if start_offset and source is raw_source else 0
+    loaded_count = 0
+    try:
+        row_batches = itertools.chain([first_batch] if first_batch else [], batches)
+        validated_chunks = telemetry.iterate("validate", validate_batches(
+            tracked_batches(row_batches) if history is not None else row_batches,
+            validation_plan,
+            validate_batch,
+        ))
+        for chunk_start, row_count, valid_rows, batch_errors in validated_chunks:
+            errors.add(batch_errors)
+            if valid_rows:
+                with telemetry.stage("insert"):
+                    loaded = load_batch(
+                        data_db,
+                        load_table,
+                        load_columns,
+                        valid_rows,
+                        method=load_method,
+                    )
+                inserted_count += loaded
+                loaded_count += loaded
+            processed_count += row_count
+            telemetry.record(
+                "parse",
+                rows=processed_count - (start_row - first_row),
+                bytes_read=raw_source.tell() - bytes_skipped if total_bytes else None,
+            )
+            telemetry.record("validate", rows=processed_count - (start_row - first_row))
+            telemetry.record("insert", rows=loaded_count)
+            if cancel_check and cancel_check(False):
+                raise ImportCancelled()
+
+            if history is not None:
+                # Checkpoints can only sit on batch boundaries, where the offset is known
+                next_row = chunk_start + row_count
+                while batch_ends and batch_ends[0][0] < next_row:
+                    batch_ends.popleft()
+                if batch_ends and batch_ends[0][0] == next_row and next_row - last_checkpoint_row >= checkpoint_rows:
+                    _, offset = batch_ends.popleft()
+                    with telemetry.stage("commit"):
+                        data_db.commit()
+                        _save_import_checkpoint(meta_db, history, next_row, offset, inserted_count, errors)
+                    last_checkpoint_row = next_row
+
+            if progress_callback and total_bytes:
+                progress_callback(
+                    30 + int(60 * min(raw_source.tell(), total_bytes) / total_bytes),
+                    f"Обработано строк: {processed_count}",
+                    processed_count,
+                )
+
+        merge_stats = None
+        if merge:
+            if progress_callback:
+                progress_callback(92, "Слияние с таблицей")
+            # Rows that failed validation are missing from staging but not from the file
+            delete_missing = bool(options.delete_missing) and not errors.count
+            with telemetry.stage("merge"):
+                merge_stats = MergeStats(**merge_staging(
+                    data_db,
+                    request_table_name,
+                    load_table,
+                    load_columns,
+                    key_columns,
+                    delete_missing=delete_missing,
+                ))
+            inserted_count = merge_stats.inserted + merge_stats.updated
+            telemetry.record("merge", rows=loaded_count)
+        if replace:
+            if progress_callback:
+                progress_callback(92, "Построение индексов и замена таблицы")
+            with telemetry.stage("swap"):
+                replaced_rows = get_row_count(data_db, request_table_name)
+                archive_table = swap_shadow_table(data_db, request_table_name, load_table)
+                _add_archived_table_version(
+                    meta_db,
+                    data_db,
+                    user_id,
+                    request_table_name,
+                    "import_before",
+                    archive_table,
+                    replaced_rows,
+                    message=f"Before CSV import: {file_name}",
+                )
+            telemetry.record("swap", rows=loaded_count)
+
+        if cancel_check and cancel_check(True):
+            raise ImportCancelled()
         if progress_callback:
-            progress_callback(85, "Запись в базу данных")
-        inserted_count = insert_rows(data_db, request_table_name, valid_rows)
+            progress_callback(95, "Фиксация транзакции")
+        with telemetry.stage("commit"):
+            data_db.commit()
+    except Exception as e:
+        data_db.rollback()
+        if history is None:
+            errors.discard()
+            raise
+        cancelled = isinstance(e, ImportCancelled)
+        # Keep the upload and the report up to the last checkpoint for resume;
+        # a cancelled import keeps its checkpointed rows but cannot be resumed
+        try:
+            meta_db.rollback()
+            history.status = "cancelled" if cancelled else "interrupted"
+            history.telemetry = telemetry.snapshot()
+            if cancelled:
+                history.upload_path = None
+                history.resume_state = None
+            meta_db.commit()
+        except Exception:
+            meta_db.rollback()
+        if cancelled and upload_path:
+            discard_retained_upload(upload_path)
+        raise
+    finally:
+        errors.close()
 
-    history = ImportHistory(
-        user_id=user_id,
-        table_name=request_table_name,
-        file_name=file_name,
-        rows_imported=inserted_count,
-        status="success" if not errors else "partial",
-        validation_errors=[{"row": e.row, "error": e.error} for e in errors]
-    )
-    meta_db.add(history)
+    error_groups = errors.groups()
+    if history is None:
+        history = ImportHistory(
+            user_id=user_id,
+            table_name=request_table_name,
+            file_name=file_name,
+            content_hash=content_hash,
+            idempotency_key=idempotency_key,
+        )
+        meta_db.add(history)
+    history.rows_imported = inserted_count
+    history.status = "success" if not errors.count else "partial"
+    history.validation_errors = [e.model_dump() for e in errors.inline]
+    history.error_count = errors.count
+    history.error_summary = error_groups or None
+    history.error_report_path = errors.report_path
+    history.upload_path = None
+    history.resume_state = None
+    history.telemetry = telemetry.snapshot()
     meta_db.commit()
+    if upload_path:
+        discard_retained_upload(upload_path)
 
     if progress_callback:
         progress_callback(100, "Импорт завершён")
 
+    warnings = [] if errors.count == 0 else [f"Found {errors.count} validation errors"]
+    if merge_stats is not None and options.delete_missing and errors.count:
+        warnings.append("delete_missing was skipped because some rows failed validation")
+
+    if merge_stats is not None:
+        message = (
+            f"Merged rows: {merge_stats.inserted} inserted, {merge_stats.updated} updated, "
+            f"{merge_stats.unchanged} unchanged, {merge_stats.deleted} deleted"
+        )
+    elif replace:
+        message = f"Table replaced with {inserted_count} rows"
+    else:
+        message = f"Successfully imported {inserted_count} rows" if inserted_count > 0 else "No rows imported"
+
     return ImportResponse(
-        success=len(errors) == 0,
+        success=errors.count == 0,
         rows_imported=inserted_count,
-        errors=errors,
-        warnings=[] if len(errors) == 0 else [f"Found {len(errors)} validation errors"],
-        message=f"Successfully imported {inserted_count} rows" if inserted_count > 0 else "No rows imported"
+        errors=errors.inline,
+        error_count=errors.count,
+        error_groups=error_groups,
+        import_id=history.id,
+        merge=merge_stats,
+        telemetry=history.telemetry,
+        warnings=warnings,
+        message=message,
     )
 
 
-def _run_import_job(
-    job_id: str,
-    user_id: int,
-    file_name: str,
-    content: bytes,
-    request_table_name: str,
+def _import_job_params(
     columns_mapping: Dict[str, str],
     delimiter: Optional[str],
     encoding: str,
     edited_preview_rows: Optional[List[Dict[str, Any]]],
-) -> None:
+    options: ImportOptions,
+    content_hash: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    resume_history_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    return {
+        "columns_mapping": columns_mapping,
+        "delimiter": delimiter,
+        "encoding": encoding,
+        "edited_preview_rows": edited_preview_rows,
+        "options": options.model_dump(),
+        "content_hash": content_hash,
+        "idempotency_key": idempotency_key,
+        "resume_history_id": resume_history_id,
+    }
+
+
+def run_import_job(job_id: str) -> None:
+    """
+    Run a claimed ImportJob and record its outcome on the job row.
+    The upload is read from the job (small ones) or its staged file; staged
+    files of non-resumable jobs are removed when the job ends. While it runs,
+    a background thread keeps its heartbeat fresh; its outcome is only
+    recorded if the job is still running on the worker that claimed it.
+    """
     meta_db = SessionLocal()
     data_db = None
     close_data_db = False
+    source = None
+    job = None
+    worker_id = None
+    stop_heartbeat = None
+    telemetry = ImportTelemetry()
     try:
-        _set_import_job_state(job_id, status="running", progress=5, message="Запуск задачи")
-
-        user = meta_db.query(User).filter(User.id == user_id).first()
+        job = meta_db.query(ImportJob).filter(ImportJob.id == job_id).first()
+        if job is None:
+            return  # purged or never queued
+        worker_id = job.worker_id
+        stop_heartbeat = start_import_job_heartbeat(job_id, worker_id)
+        params = job.params
+        telemetry = ImportTelemetry(params.get("telemetry"))
+        options = ImportOptions.model_validate(params.get("options") or {})
+        user = meta_db.query(User).filter(User.id == job.user_id).first()
         if not user:
             raise ValueError("User not found for import job")
 
         data_db, close_data_db, _ = resolve_data_session(meta_db, user)
-
-        def progress(progress_value: int, message: str) -> None:
-            _set_import_job_state(job_id, status="running", progress=progress_value, message=message)
+        if job.upload_data is not None:
+            source = io.BytesIO(job.upload_data)
+        else:
+            source = open_retained_upload(job.upload_path)
+
+        last_update = 0.0
+
+        def progress(progress_value: int, message: str, rows_processed: Optional[int] = None) -> None:
+            # Each update is a metadata DB write and doubles as the heartbeat
+            nonlocal last_update
+            now = time.monotonic()
+            if now - last_update >= 1:
+                last_update = now
+                fields: Dict[str, Any] = {
+                    "progress": progress_value,
+                    "message": message,
+                    "telemetry": telemetry.snapshot(),
+                }
+                if rows_processed is not None:
+                    fields["rows_processed"] = rows_processed
+                update_import_job(job_id, worker_id, **fields)
+
+        last_cancel_check = 0.0
+
+        def cancel_requested(final: bool) -> bool:
+            # Throttled between batches, but a cancel must never slip past the commit
+            nonlocal last_cancel_check
+            now = time.monotonic()
+            if now - last_cancel_check < 1 and not final:
+                return False
+            last_cancel_check = now
+            return is_import_job_cancel_requested(job_id)
 
         result = _execute_import(
             meta_db=meta_db,
             data_db=data_db,
-            user_id=user_id,
-            file_name=file_name,
-            content=content,
-            request_table_name=request_table_name,
-            columns_mapping=columns_mapping,
-            delimiter=delimiter,
-            encoding=encoding,
-            edited_preview_rows=edited_preview_rows,
+            user_id=job.user_id,
+            file_name=job.file_name,
+            source=source,
+            request_table_name=job.table_name,
+            columns_mapping=params.get("columns_mapping") or {},
+            delimiter=params.get("delimiter"),
+            encoding=params.get("encoding") or "utf-8",
+            edited_preview_rows=params.get("edited_preview_rows"),
+            options=options,
             progress_callback=progress,
+            upload_path=job.upload_path if options.resumable else None,
+            resume_history_id=params.get("resume_history_id"),
+            content_hash=params.get("content_hash"),
+            idempotency_key=params.get("idempotency_key"),
+            cancel_check=cancel_requested,
+            telemetry=telemetry,
         )
 
-        _set_import_job_state(
+        # The full error list stays in import_history, reachable through import_id
+        stored = result.model_dump(mode="json")
+        stored["errors"] = stored["errors"][:settings.IMPORT_JOB_RESULT_ERROR_LIMIT]
+        stored["error_groups"] = stored["error_groups"][:settings.IMPORT_JOB_RESULT_ERROR_LIMIT]
+        if not update_import_job(
             job_id,
+            worker_id,
             status="completed",
             progress=100,
             message="Импорт завершён",
-            result={
-                "success": result.success,
-                "rows_imported": result.rows_imported,
-                "errors": [e.model_dump() for e in result.errors],
-                "warnings": result.warnings,
-                "message": result.message,
-            },
+            result=stored,
+            telemetry=result.telemetry,
+        ):
+            logger.warning("Import job %s completed after it was no longer running on this worker", job_id)
+        log_audit_event(
+            meta_db,
+            user,
+            action="table_import_async_completed",
+            entity_type="table",
+            entity_name=job.table_name,
+            details={"rows_imported": result.rows_imported, "file_name": job.file_name},
         )
+        meta_db.commit()
+    except ImportCancelled:
+        meta_db.rollback()
+        update_import_job(job_id, worker_id, status="cancelled", message="Импорт отменён", telemetry=telemetry.snapshot())
+        user = meta_db.query(User).filter(User.id == job.user_id).first()
         if user:
             log_audit_event(
                 meta_db,
                 user,
-                action="table_import_async_completed",
+                action="table_import_async_cancelled",
                 entity_type="table",
-                entity_name=request_table_name,
-                details={"rows_imported": result.rows_imported, "file_name": file_name},
+                entity_name=job.table_name,
+                details={"file_name": job.file_name},
             )
             meta_db.commit()
     except Exception as e:
         meta_db.rollback()
-        _set_import_job_state(job_id, status="failed", message=str(e))
-        user = meta_db.query(User).filter(User.id == user_id).first()
+        if job is None:
+            logger.exception("Failed to load import job %s", job_id)
+            return
+        update_import_job(job_id, worker_id, status="failed", message=str(e), telemetry=telemetry.snapshot())
+        user = meta_db.query(User).filter(User.id == job.user_id).first()
         if user:
             log_audit_event(
                 meta_db,
                 user,
                 action="table_import_async_failed",
                 entity_type="table",
-                entity_name=request_table_name,
+                entity_name=job.table_name,
                 status="failed",
-                details={"error": str(e), "file_name": file_name},
+                details={"error": str(e), "file_name": job.file_name},
             )
             meta_db.commit()
     finally:
+        if stop_heartbeat is not None:
+            stop_heartbeat()
         if close_data_db and data_db is not None:
             data_db.close()
+        if source is not None:
+            source.close()
+        # Read from the raw params, the options may be what failed to validate
+        if job is not None and job.upload_path and not (job.params.get("options") or {}).get("resumable"):
+            discard_retained_upload(job.upload_path)
         meta_db.close()
 
 
+def run_inline_import_jobs() -> None:
+    """
+    IMPORT_JOB_RUNNER=inline: run jobs in this web process while the scheduler
+    admits them. Called after each async upload and periodically from main,
+    so jobs left queued by the caps or a restart are picked up as well.
+    """
+    worker_id = f"web:{os.getpid()}"
+    db = SessionLocal()
+    try:
+        reap_stale_import_jobs(db)
+        purge_finished_import_jobs(db)
+        purge_expired_error_reports(db)
+    finally:
+        db.close()
+    while True:
+        db = SessionLocal()
+        try:
+            job = claim_import_job(db, worker_id)
+            job_id = job.id if job is not None else None
+        finally:
+            db.close()
+        if job_id is None:
+            return
+        run_import_job(job_id)
+
+
+def _schedule_import_jobs(background_tasks: BackgroundTasks) -> None:
+    if settings.IMPORT_JOB_RUNNER == "inline":
+        background_tasks.add_task(run_inline_import_jobs)
+
+
+def _import_job_payload(db: Optional[Session], job: ImportJob, queue_status: bool = True) -> Dict[str, Any]:
+    payload = {
+        "job_id": job.id,
+        "status": job.status,
+        "progress": job.progress or 0,
+        "message": job.message or "",
+        "rows_processed": job.rows_processed,
+        "cancel_requested": bool(job.cancel_requested),
+        **get_job_throughput(job),
+        "telemetry": job.telemetry,
+        "result": job.result,
+    }
+    if queue_status and job.status == "queued":
+        payload.update(get_queue_status(db, job))
+    return payload
+
+
+def _import_connection_key(user: User) -> str:
+    # Jobs of users on the same data connection share its concurrency cap
+    return f"connection:{user.active_connection_id}" if user.active_connection_id else "primary"
+
+
+def _import_job_priority(user: User, options: ImportOptions) -> int:
+    # Anyone may lower the priority of their imports, only admins raise it
+    priority = options.priority or 0
+    return priority if is_admin(user) else min(priority, 0)
+
+
 def get_user_from_header(
     authorization: Optional[str] = Header(None),
     db: Session = Depends(get_db)
@@ -312,7 +1114,7 @@ async def create_new_table(
     """Create a new table in the database"""
     data_db, close_data_db, connection_name = resolve_data_session(db, current_user)
     try:
-        create_table(data_db, request.table_name, request.columns)
+        create_table(data_db, request.table_name, request.columns, key_columns=request.key_columns)
 
         schema = TableSchema(
             user_id=current_user.id,
@@ -390,15 +1192,14 @@ async def import_csv(
     file: UploadFile = File(...),
     table_name: Optional[str] = Form(None),
     request: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_user_from_header)
 ):
     """Import CSV file into table"""
     data_db, close_data_db, connection_name = resolve_data_session(db, current_user)
     try:
-        content = await file.read()
-
-        request_table_name, columns_mapping, delimiter, encoding, edited_preview_rows = _parse_import_request(
+        request_table_name, columns_mapping, delimiter, encoding, edited_preview_rows, options = _parse_import_request(
             table_name=table_name,
             request=request,
         )
@@ -414,19 +1215,57 @@ async def import_csv(
             details={"file_name": file.filename, "connection": connection_name},
         )
 
-        result = _execute_import(
-            meta_db=db,
-            data_db=data_db,
-            user_id=current_user.id,
-            file_name=file.filename,
-            content=content,
-            request_table_name=request_table_name,
-            columns_mapping=columns_mapping,
-            delimiter=delimiter,
-            encoding=encoding,
-            edited_preview_rows=edited_preview_rows,
+        if idempotency_key and len(idempotency_key) > 255:
+            raise ValueError("Idempotency-Key is too long")
+
+        telemetry = ImportTelemetry()
+        with telemetry.stage("upload"):
+            if options.resumable:
+                digest = new_content_hash()
+                upload_path = await retain_upload(file, digest)
+                content_hash = digest.hexdigest()
+            else:
+                upload_path = None
+                content_hash = hash_stream(file.file)
+        telemetry.record("upload", bytes_read=file.size)
+        content_hash = _import_request_hash(
+            content_hash, columns_mapping, delimiter, encoding, edited_preview_rows, options
         )
 
+        try:
+            previous = None if options.force else _find_previous_import(
+                db, current_user.id, request_table_name, content_hash, idempotency_key
+            )
+        except HTTPException:
+            discard_retained_upload(upload_path)
+            raise
+        if previous:
+            discard_retained_upload(upload_path)
+            return _previous_import_response(previous)
+
+        source = open_retained_upload(upload_path) if upload_path else file.file
+        try:
+            result = _execute_import(
+                meta_db=db,
+                data_db=data_db,
+                user_id=current_user.id,
+                file_name=file.filename,
+                source=source,
+                request_table_name=request_table_name,
+                columns_mapping=columns_mapping,
+                delimiter=delimiter,
+                encoding=encoding,
+                edited_preview_rows=edited_preview_rows,
+                options=options,
+                upload_path=upload_path,
+                content_hash=content_hash,
+                idempotency_key=idempotency_key,
+                telemetry=telemetry,
+            )
+        finally:
+            if upload_path:
+                source.close()
+
         log_audit_event(
             db,
             current_user,
@@ -439,6 +1278,11 @@ async def import_csv(
 
         return result
         
+    except StagingQuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -462,19 +1306,22 @@ async def start_import_csv_async(
     file: UploadFile = File(...),
     table_name: Optional[str] = Form(None),
     request: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_user_from_header)
 ):
     """Start CSV import as background job"""
     try:
-        content = await file.read()
-        request_table_name, columns_mapping, delimiter, encoding, edited_preview_rows = _parse_import_request(
+        request_table_name, columns_mapping, delimiter, encoding, edited_preview_rows, options = _parse_import_request(
             table_name=table_name,
             request=request,
         )
 
         require_table_permission(db, current_user, request_table_name, "write")
 
+        # Rejected before the upload is read
+        check_import_admission(db, current_user.id)
+
         resolved_data_db, should_close_resolved, connection_name = resolve_data_session(db, current_user)
         if should_close_resolved:
             resolved_data_db.close()
@@ -489,28 +1336,72 @@ async def start_import_csv_async(
         )
         db.commit()
 
-        job_id = str(uuid.uuid4())
-        _set_import_job_state(
-            job_id,
-            user_id=current_user.id,
-            table_name=request_table_name,
-            status="queued",
-            progress=0,
-            message="Задача поставлена в очередь",
+        if idempotency_key and len(idempotency_key) > 255:
+            raise ValueError("Idempotency-Key is too long")
+
+        # The queued job keeps a staged file path (or a small upload inline)
+        digest = new_content_hash()
+        telemetry = ImportTelemetry()
+        with telemetry.stage("upload"):
+            if options.resumable:
+                upload_data, upload_path = None, await retain_upload(file, digest)
+            else:
+                upload_data, upload_path = await stage_upload(file, digest)
+        telemetry.record("upload", bytes_read=file.size)
+        content_hash = _import_request_hash(
+            digest.hexdigest(), columns_mapping, delimiter, encoding, edited_preview_rows, options
         )
 
-        background_tasks.add_task(
-            _run_import_job,
-            job_id,
-            current_user.id,
-            file.filename,
-            content,
-            request_table_name,
-            columns_mapping,
-            delimiter,
-            encoding,
-            edited_preview_rows,
+        try:
+            previous = None if options.force else _find_previous_import(
+                db, current_user.id, request_table_name, content_hash, idempotency_key
+            )
+        except HTTPException:
+            discard_retained_upload(upload_path)
+            raise
+
+        job_id = str(uuid.uuid4())
+        params = _import_job_params(
+            columns_mapping, delimiter, encoding, edited_preview_rows, options, content_hash, idempotency_key
         )
+        # The job continues the telemetry of its upload
+        params["telemetry"] = telemetry.snapshot()["stages"]
+        if previous:
+            discard_retained_upload(upload_path)
+            # Same contract as a finished job so pollers need no special case
+            job = enqueue_import_job(db, job_id, current_user.id, request_table_name, file.filename, params)
+            job.status = "completed"
+            job.progress = 100
+            job.message = "Файл уже импортирован"
+            job.finished_at = datetime.utcnow()
+            job.result = _previous_import_response(previous).model_dump(mode="json")
+            db.commit()
+            return {
+                "job_id": job_id,
+                "status": "completed",
+                "progress": 100,
+                "message": "Файл уже импортирован",
+            }
+
+        try:
+            enqueue_import_job(
+                db,
+                job_id,
+                current_user.id,
+                request_table_name,
+                file.filename,
+                params,
+                upload_path=upload_path,
+                upload_data=upload_data,
+                priority=_import_job_priority(current_user, options),
+                connection_key=_import_connection_key(current_user),
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            discard_retained_upload(upload_path)
+            raise
+        _schedule_import_jobs(background_tasks)
 
         return {
             "job_id": job_id,
@@ -518,6 +1409,17 @@ async def start_import_csv_async(
             "progress": 0,
             "message": "Задача поставлена в очередь",
         }
+    except ImportBacklogFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except StagingQuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -532,28 +1434,224 @@ async def start_import_csv_async(
         )
 
 
+@router.post("/import-csv/{import_id}/resume")
+async def resume_import_csv(
+    import_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_user_from_header)
+):
+    """Continue an interrupted resumable import from its last checkpoint"""
+    history = db.query(ImportHistory).filter(ImportHistory.id == import_id).first()
+    if not history:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+
+    if not is_admin(current_user) and history.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this import")
+
+    require_table_permission(db, current_user, history.table_name, "write")
+
+    owner = db.query(User).filter(User.id == history.user_id).first()
+    if not owner:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import owner not found")
+
+    try:
+        check_import_admission(db, history.user_id)
+    except ImportBacklogFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    # Claim the import so two resume calls cannot run it concurrently
+    claimed = db.query(ImportHistory).filter(
+        ImportHistory.id == import_id,
+        ImportHistory.status == "interrupted",
+    ).update({"status": "running"}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Import is not interrupted")
+
+    db.refresh(history)
+    if not history.upload_path or not os.path.exists(history.upload_path):
+        history.status = "failed"
+        db.commit()
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Retained upload is no longer available")
+
+    resume_state = history.resume_state
+    log_audit_event(
+        db,
+        current_user,
+        action="table_import_resumed",
+        entity_type="table",
+        entity_name=history.table_name,
+        details={"file_name": history.file_name, "checkpoint_row": history.checkpoint_row},
+    )
+    db.commit()
+
+    job_id = str(uuid.uuid4())
+    resume_options = ImportOptions.model_validate(resume_state["options"])
+    # Run as the user who started the import so the same data connection is used
+    enqueue_import_job(
+        db,
+        job_id,
+        history.user_id,
+        history.table_name,
+        history.file_name,
+        _import_job_params(
+            resume_state["columns_mapping"],
+            resume_state["delimiter"],
+            resume_state["encoding"],
+            None,
+            resume_options,
+            history.content_hash,
+            history.idempotency_key,
+            resume_history_id=history.id,
+        ),
+        upload_path=history.upload_path,
+        priority=_import_job_priority(owner, resume_options),
+        connection_key=_import_connection_key(owner),
+    )
+    db.commit()
+    _schedule_import_jobs(background_tasks)
+
+    return {
+        "job_id": job_id,
+        "import_id": history.id,
+        "checkpoint_row": history.checkpoint_row,
+        "status": "queued",
+        "progress": 0,
+        "message": "Задача поставлена в очередь",
+    }
+
+
 @router.get("/import-csv/jobs/{job_id}")
 async def get_import_csv_job_status(
     job_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_user_from_header)
 ):
-    with import_jobs_lock:
-        job = import_jobs.get(job_id)
+    reap_stale_import_jobs(db)
+    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
 
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
 
-    if not is_admin(current_user) and job.get("user_id") != current_user.id:
+    if not is_admin(current_user) and job.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this import job")
 
-    return {
-        "job_id": job_id,
-        "status": job.get("status", "unknown"),
-        "progress": job.get("progress", 0),
-        "message": job.get("message", ""),
-        "result": job.get("result"),
-    }
+    return _import_job_payload(db, job)
+
+
+@router.post("/import-csv/jobs/{job_id}/cancel")
+async def cancel_import_csv_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_user_from_header)
+):
+    """
+    Cancel an import job. A queued job is cancelled right away; a running one
+    stops after its current batch and rolls back (a resumable import keeps the
+    rows committed at its checkpoints).
+    """
+    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+
+    if not is_admin(current_user) and job.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this import job")
+
+    job_status = cancel_import_job(db, job)
+    if job_status not in ("cancelled", "running"):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Import job is already {job_status}")
+
+    log_audit_event(
+        db,
+        current_user,
+        action="table_import_cancel_requested",
+        entity_type="table",
+        entity_name=job.table_name,
+        details={"job_id": job.id, "status": job_status},
+    )
+    db.commit()
+    db.refresh(job)
+    return _import_job_payload(db, job)
+
+
+@router.get("/import-csv/jobs/{job_id}/events")
+async def stream_import_csv_job(
+    job_id: str,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_user_from_header)
+):
+    """
+    Server-Sent Events stream of a job's state: a "progress" event with the
+    status payload whenever it changes, until the job finishes.
+    Authentication and reaping of stale jobs happen once when the stream is
+    opened. Job rows come from the process-wide import_job_watcher, which
+    reads the jobs of all open streams in one query per tick. The queue
+    position of a queued job is recomputed when the row changes and
+    otherwise every IMPORT_QUEUE_STATUS_INTERVAL seconds.
+    """
+    reap_stale_import_jobs(db)
+    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+
+    if not is_admin(current_user) and job.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this import job")
+
+    queue_state: Dict[str, Any] = {"job": None, "status": {}, "checked_at": 0.0}
+
+    def load_queue_status(current: ImportJob) -> Dict[str, Any]:
+        stream_db = SessionLocal()
+        try:
+            return get_queue_status(stream_db, current)
+        finally:
+            stream_db.close()
+
+    async def events() -> AsyncIterator[str]:
+        last_payload = None
+        last_sent = time.monotonic()
+        rows = import_job_watcher.watch(job_id)
+        try:
+            async for current in rows:
+                if current is None or await http_request.is_disconnected():
+                    return  # purged or closed
+                payload = _import_job_payload(None, current, queue_status=False)
+                if current.status == "queued":
+                    now = time.monotonic()
+                    if (
+                        payload != queue_state["job"]
+                        or now - queue_state["checked_at"] >= settings.IMPORT_QUEUE_STATUS_INTERVAL
+                    ):
+                        queue_state.update(
+                            job=dict(payload),
+                            status=await run_in_threadpool(load_queue_status, current),
+                            checked_at=now,
+                        )
+                    payload.update(queue_state["status"])
+                if payload != last_payload:
+                    last_payload = payload
+                    last_sent = time.monotonic()
+                    yield f"event: progress\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                    if payload["status"] in FINISHED_STATUSES:
+                        return
+                elif time.monotonic() - last_sent >= 15:
+                    # Comment line keeps proxies from closing an idle stream
+                    last_sent = time.monotonic()
+                    yield ": keep-alive\n\n"
+        finally:
+            await rows.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/import-csv/preview")
@@ -568,6 +1666,7 @@ async def preview_import_csv(
         encoding = "utf-8"
         delimiter = None
         preview_limit = 100
+        archive_member = None
 
         if request:
             try:
@@ -583,11 +1682,24 @@ async def preview_import_csv(
                         delimiter = payload_delimiter
                     if isinstance(payload_limit, int) and 1 <= payload_limit <= 1000:
                         preview_limit = payload_limit
+                    if isinstance(payload.get("archive_member"), str):
+                        archive_member = payload["archive_member"]
             except json.JSONDecodeError:
                 raise ValueError("Invalid JSON in request field")
 
-        content = await file.read()
-        preview = preview_csv(content, encoding=encoding, delimiter=delimiter, preview_limit=preview_limit)
+        source, compression, total_bytes = open_decompressed(file.file, archive_member)
+        input_format = detect_arrow_format(peek_stream(source))
+        if input_format:
+            preview = preview_arrow(source, input_format, preview_limit=preview_limit)
+        else:
+            preview = preview_csv(
+                source,
+                encoding=encoding,
+                delimiter=delimiter,
+                preview_limit=preview_limit,
+                total_bytes=total_bytes,
+            )
+        preview["compression"] = compression
 
         return preview
     except ValueError as e:
@@ -616,6 +1728,44 @@ async def get_import_history(
     return history
 
 
+@router.get("/history/{import_id}/errors", response_model=ImportErrorsPage)
+async def get_import_errors(
+    import_id: int,
+    offset: int = 0,
+    limit: int = 1000,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_user_from_header)
+):
+    """Page through the full validation error report of an import"""
+    if offset < 0 or not 1 <= limit <= 10000:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid offset or limit")
+
+    history = db.query(ImportHistory).filter(ImportHistory.id == import_id).first()
+    if not history:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+
+    if not is_admin(current_user) and history.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this import")
+
+    if history.error_report_path:
+        try:
+            errors = read_error_report(history.error_report_path, offset=offset, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    else:
+        # Small error sets never spill and live inline on the history row
+        errors = (history.validation_errors or [])[offset:offset + limit]
+
+    return ImportErrorsPage(
+        import_id=history.id,
+        total=history.error_count or len(history.validation_errors or []),
+        offset=offset,
+        limit=limit,
+        # Rows written before error reports only kept row and error
+        errors=[{"suggested_fix": "", **error} for error in errors],
+    )
+
+
 @router.get("/{table_name}/data")
 async def get_table_data_endpoint(
     table_name: str,
@@ -649,20 +1799,22 @@ async def get_table_data_endpoint(
 async def get_table_versions(
     table_name: str,
     limit: int = 20,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_user_from_header)
 ):
-    """Get latest table versions for rollback"""
+    """
+    Get table versions for rollback, newest first. Pages are keyed by id:
+    pass the last id of a page as before_id to get the next one.
+    """
     require_table_permission(db, current_user, table_name, "read")
 
     safe_limit = max(1, min(100, limit))
-    versions = (
-        db.query(TableVersion)
-        .filter(TableVersion.table_name == table_name)
-        .order_by(TableVersion.id.desc())
-        .limit(safe_limit)
-        .all()
-    )
+    # Payload columns are deferred, the listing reads metadata columns only
+    versions = db.query(TableVersion).filter(TableVersion.table_name == table_name)
+    if before_id is not None:
+        versions = versions.filter(TableVersion.id < before_id)
+    versions = versions.order_by(TableVersion.id.desc()).limit(safe_limit).all()
 
     return [
         TableVersionResponse(
@@ -670,14 +1822,70 @@ async def get_table_versions(
             user_id=version.user_id,
             table_name=version.table_name,
             action=version.action,
-            row_count=int((version.version_data or {}).get("row_count", 0)),
-            message=(version.version_data or {}).get("message"),
+            kind=version.kind,
+            row_count=version.row_count or 0,
+            message=version.message,
+            byte_size=version.byte_size,
+            source_version_id=version.source_version_id,
             created_at=version.created_at,
         )
         for version in versions
     ]
 
 
+def _retention_response(db: Session, table_name: str) -> VersionRetentionResponse:
+    policy = db.query(TableVersionPolicy).filter(TableVersionPolicy.table_name == table_name).first()
+    return VersionRetentionResponse(
+        table_name=table_name,
+        policy=VersionRetentionPolicy(**{field: getattr(policy, field, None) for field in POLICY_FIELDS}),
+        effective=get_retention_policy(db, table_name),
+    )
+
+
+@router.get("/{table_name}/versions/retention", response_model=VersionRetentionResponse)
+async def get_table_version_retention(
+    table_name: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_user_from_header)
+):
+    """Get the version retention policy of a table"""
+    require_table_permission(db, current_user, table_name, "read")
+    return _retention_response(db, table_name)
+
+
+@router.put("/{table_name}/versions/retention", response_model=VersionRetentionResponse)
+async def set_table_version_retention(
+    table_name: str,
+    request: VersionRetentionPolicy,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_user_from_header)
+):
+    """
+    Set how long versions of a table are kept; versions outside the policy
+    are deleted by the next background compaction
+    """
+    require_table_permission(db, current_user, table_name, "alter")
+
+    policy = db.query(TableVersionPolicy).filter(TableVersionPolicy.table_name == table_name).first()
+    if policy is None:
+        policy = TableVersionPolicy(table_name=table_name)
+        db.add(policy)
+    for field in POLICY_FIELDS:
+        setattr(policy, field, getattr(request, field))
+    policy.updated_by = current_user.id
+    policy.updated_at = datetime.utcnow()
+    log_audit_event(
+        db,
+        current_user,
+        action="table_version_retention_update",
+        entity_type="table",
+        entity_name=table_name,
+        details=request.model_dump(),
+    )
+    db.commit()
+    return _retention_response(db, table_name)
+
+
 @router.post("/{table_name}/rollback/{version_id}", response_model=RollbackResponse)
 async def rollback_table_to_version(
     table_name: str,
@@ -698,31 +1906,67 @@ async def rollback_table_to_version(
         if not version:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
 
-        version_data = version.version_data or {}
-        snapshot_rows = version_data.get("rows")
-        if not isinstance(snapshot_rows, list):
+        base, deltas = _plan_version_replay(db, version)
+        base_data = (base.version_data or {}) if base is not None else {}
+        archive_table = base_data.get("archive_table")
+        snapshot_table = base_data.get("snapshot_table")
+        snapshot_rows = None
+        snapshot_read_seconds = None
+        if base is not None and not archive_table and not snapshot_table:
+            started = time.perf_counter()
+            snapshot_rows = _load_snapshot_rows(base)
+            snapshot_read_seconds = round(time.perf_counter() - started, 3)
+        if archive_table:
+            # Rebuild from the archived table and swap, the current one is archived in turn
+            current_rows = get_row_count(data_db, table_name)
+            shadow_table = create_shadow_table(data_db, table_name)
+            copy_table_rows(data_db, archive_table, shadow_table)
+            _undo_row_changes(data_db, shadow_table, deltas)
+            restored_rows = get_row_count(data_db, shadow_table)
+            _add_archived_table_version(
+                db,
+                data_db,
+                current_user.id,
+                table_name,
+                "rollback_before",
+                swap_shadow_table(data_db, table_name, shadow_table),
+                current_rows,
+                message=f"Before rollback to version {version_id}",
+            )
+            data_db.commit()
+        elif base is None or snapshot_table or snapshot_rows is not None:
+            _create_table_version_snapshot(
+                meta_db=db,
+                data_db=data_db,
+                user_id=current_user.id,
+                table_name=table_name,
+                action="rollback_before",
+                message=f"Before rollback to version {version_id}",
+            )
+            try:
+                if snapshot_table:
+                    # Set-based, the rows are copied back inside the data database
+                    restore_from_snapshot_table(data_db, table_name, snapshot_table)
+                elif base is not None:
+                    restore_table_snapshot(data_db, table_name, snapshot_rows, commit=False)
+                _undo_row_changes(data_db, table_name, deltas)
+                restored_rows = get_row_count(data_db, table_name)
+                data_db.commit()
+            except Exception as e:
+                data_db.rollback()
+                raise ValueError(f"Failed to roll back: {str(e)}")
+        else:
             raise ValueError("Version data does not contain valid rows snapshot")
 
-        _create_table_version_snapshot(
-            meta_db=db,
-            data_db=data_db,
-            user_id=current_user.id,
-            table_name=table_name,
-            action="rollback_before",
-            message=f"Before rollback to version {version_id}",
-        )
-
-        restored_rows = restore_table_snapshot(data_db, table_name, snapshot_rows)
-
         db.add(TableVersion(
             user_id=current_user.id,
             table_name=table_name,
             action="rollback_applied",
-            version_data={
-                "source_version_id": version_id,
-                "row_count": restored_rows,
-                "message": f"Rollback applied from version {version_id}",
-            },
+            kind="marker",
+            row_count=restored_rows,
+            message=f"Rollback applied from version {version_id}",
+            source_version_id=version_id,
+            version_data={},
         ))
         log_audit_event(
             db,
@@ -730,7 +1974,12 @@ async def rollback_table_to_version(
             action="table_rollback",
             entity_type="table",
             entity_name=table_name,
-            details={"source_version_id": version_id, "restored_rows": restored_rows, "connection": connection_name},
+            details={
+                "source_version_id": version_id,
+                "restored_rows": restored_rows,
+                "snapshot_read_seconds": snapshot_read_seconds,
+                "connection": connection_name,
+            },
         )
         db.commit()
 
@@ -764,15 +2013,17 @@ async def create_table_row(
     data_db, close_data_db, connection_name = resolve_data_session(db, current_user)
     try:
         require_table_permission(db, current_user, table_name, "write")
-        _create_table_version_snapshot(
+        version = _create_row_change_version(
             meta_db=db,
             data_db=data_db,
             user_id=current_user.id,
             table_name=table_name,
             action="row_create_before",
+            row_ids=[],
             message="Before creating a row",
         )
         row_id = create_row(data_db, table_name, request.values)
+        _record_inserted_rows(version, [row_id])
         log_audit_event(
             db,
             current_user,
@@ -805,15 +2056,17 @@ async def update_table_row(
     data_db, close_data_db, connection_name = resolve_data_session(db, current_user)
     try:
         require_table_permission(db, current_user, table_name, "write")
-        _create_table_version_snapshot(
+        version = _create_row_change_version(
             meta_db=db,
             data_db=data_db,
             user_id=current_user.id,
             table_name=table_name,
             action="row_update_before",
+            row_ids=[row_id],
             message=f"Before updating row {row_id}",
         )
         updated = update_row(data_db, table_name, row_id, request.values)
+        _record_row_count_change(version, 0)
         if not updated:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Row not found")
         log_audit_event(
@@ -847,15 +2100,17 @@ async def delete_table_rows(
     data_db, close_data_db, connection_name = resolve_data_session(db, current_user)
     try:
         require_table_permission(db, current_user, table_name, "write")
-        _create_table_version_snapshot(
+        version = _create_row_change_version(
             meta_db=db,
             data_db=data_db,
             user_id=current_user.id,
             table_name=table_name,
             action="row_delete_before",
+            row_ids=request.row_ids,
             message=f"Before deleting rows: {request.row_ids}",
         )
         deleted = delete_rows(data_db, table_name, request.row_ids)
+        _record_row_count_change(version, -deleted)
         log_audit_event(
             db,
             current_user,
@@ -886,11 +2141,22 @@ async def delete_table_endpoint(
     data_db, close_data_db, connection_name = resolve_data_session(db, current_user)
     try:
         require_table_permission(db, current_user, table_name, "delete")
+        # Snapshot copies and archived tables of its versions go with it
+        version_tables = []
+        for (version_data,) in db.query(TableVersion.version_data).filter(
+            TableVersion.table_name == table_name,
+            TableVersion.kind.in_(("table", "archive")),
+        ):
+            version_table = (version_data or {}).get("snapshot_table") or (version_data or {}).get("archive_table")
+            if version_table:
+                version_tables.append(version_table)
+        drop_version_tables(data_db, version_tables)
         drop_table(data_db, table_name)
 
         db.query(TablePermission).filter(TablePermission.table_name == table_name).delete()
         db.query(TableSchema).filter(TableSchema.table_name == table_name).delete()
         db.query(TableVersion).filter(TableVersion.table_name == table_name).delete()
+        db.query(TableVersionPolicy).filter(TableVersionPolicy.table_name == table_name).delete()
         log_audit_event(
             db,
             current_user,
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Literal
 
 
 # ----- Authentication schemas -----
@@ -49,12 +49,15 @@ class ColumnDefinition(BaseModel):
 class CreateTableRequest(BaseModel):
     table_name: str = Field(..., min_length=1, max_length=100)
     columns: List[ColumnDefinition]
+    key_columns: Optional[List[str]] = None  # unique index used by merge imports
 
 
 class CSVValidationError(BaseModel):
     row: int
     error: str
     suggested_fix: str
+    column: Optional[str] = None
+    kind: Optional[str] = None  # invalid_<type>, missing_column
 
 
 class CSVImportRequest(BaseModel):
@@ -62,14 +65,57 @@ class CSVImportRequest(BaseModel):
     columns_mapping: Dict[str, str]  # CSV column -> DB column
 
 
+class ImportOptions(BaseModel):
+    """Per-import pipeline tuning passed alongside the mapping"""
+    batch_size: Optional[int] = Field(default=None, ge=1, le=100000)
+    load_method: Optional[Literal["auto", "copy", "insert"]] = None
+    validation_mode: Optional[Literal["row", "columnar"]] = None
+    resumable: Optional[bool] = None  # commit in checkpoints and keep the upload for resume
+    checkpoint_rows: Optional[int] = Field(default=None, ge=1)
+    archive_member: Optional[str] = None  # file to import from a zip upload
+    mode: Optional[Literal["append", "merge", "replace"]] = None  # replace: load a shadow table and swap it in
+    key_columns: Optional[List[str]] = None  # table columns matched by merge imports
+    delete_missing: Optional[bool] = None  # merge: delete rows whose key is not in the file
+    force: Optional[bool] = None  # import even if the same file was already imported into the table
+    priority: Optional[int] = Field(default=None, ge=-10, le=10)  # async queue priority, raising it is admin only
+
+
+class ValidationErrorGroup(BaseModel):
+    column: Optional[str] = None
+    kind: Optional[str] = None
+    count: int
+    example_rows: List[int] = []
+
+
+class MergeStats(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
 class ImportResponse(BaseModel):
     success: bool
     rows_imported: int
-    errors: List[CSVValidationError] = []
+    errors: List[CSVValidationError] = []  # first IMPORT_ERROR_INLINE_LIMIT errors
+    error_count: int = 0
+    error_groups: List[ValidationErrorGroup] = []
+    import_id: Optional[int] = None
+    merge: Optional[MergeStats] = None
+    deduplicated: bool = False  # result of an earlier import of the same upload, nothing was loaded
+    telemetry: Optional[Dict[str, Any]] = None  # per-stage timings, see ImportTelemetry
     warnings: List[str] = []
     message: str
 
 
+class ImportErrorsPage(BaseModel):
+    import_id: int
+    total: int
+    offset: int
+    limit: int
+    errors: List[CSVValidationError] = []
+
+
 class ColumnInfo(BaseModel):
     name: str
     type: str
@@ -88,7 +134,10 @@ class ImportHistoryResponse(BaseModel):
     table_name: str
     file_name: str
     rows_imported: int
+    error_count: Optional[int] = 0
+    checkpoint_row: Optional[int] = None
     status: str
+    telemetry: Optional[Dict[str, Any]] = None
     created_at: datetime
 
     class Config:
@@ -150,14 +199,39 @@ class TableVersionResponse(BaseModel):
     user_id: int
     table_name: str
     action: str
+    kind: str = "snapshot"
     row_count: int = 0
     message: Optional[str] = None
+    byte_size: Optional[int] = None
+    source_version_id: Optional[int] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class VersionRetentionPolicy(BaseModel):
+    """Per-table version retention, unset limits use the server defaults"""
+    keep_last: Optional[int] = Field(default=None, ge=0)  # newest versions always kept
+    keep_days: Optional[int] = Field(default=None, ge=0)  # all versions younger than this are kept
+    keep_daily_days: Optional[int] = Field(default=None, ge=0)  # then one per day up to this age
+    keep_weekly_weeks: Optional[int] = Field(default=None, ge=0)  # then one per week up to this age
+
+
+class VersionRetentionResponse(BaseModel):
+    table_name: str
+    policy: VersionRetentionPolicy
+    effective: Dict[str, int]  # the policy with defaults applied
+
+
+class VersionCompactionResponse(BaseModel):
+    tables: int
+    deleted_versions: int
+    dropped_tables: int
+    reclaimed_bytes: int
+    failed_tables: List[str] = []
+
+
 class RollbackResponse(BaseModel):
     success: bool
     table_name: str
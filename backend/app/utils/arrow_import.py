@@ -0,0 +1,160 @@
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.schemas.schemas import CSVValidationError
+from app.utils.csv_handler import ValidationPlan, value_error
+from app.utils.columnar_validation import convert_column
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # listed in requirements.txt; Parquet/Arrow uploads are rejected without it
+    pa = None
+    pc = None
+    pq = None
+
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_FILE_MAGIC = b"ARROW1"
+_ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+
+def detect_arrow_format(sample: bytes) -> Optional[str]:
+    """Detect Parquet or Arrow IPC (file or stream) input from its first bytes"""
+    if sample.startswith(_PARQUET_MAGIC):
+        return "parquet"
+    if sample.startswith(_ARROW_FILE_MAGIC) or sample.startswith(_ARROW_STREAM_MAGIC):
+        return "arrow"
+    return None
+
+
+def _open_batches(stream: BinaryIO, input_format: str) -> Tuple[Any, Iterator[Any], Optional[int]]:
+    """Return (schema, record batch iterator, total rows when known)"""
+    if pa is None:
+        raise ValueError("Parquet and Arrow imports require pyarrow to be installed")
+    try:
+        if input_format == "parquet":
+            parquet_file = pq.ParquetFile(stream)
+            return parquet_file.schema_arrow, parquet_file.iter_batches(), parquet_file.metadata.num_rows
+        if stream.read(len(_ARROW_FILE_MAGIC)) == _ARROW_FILE_MAGIC:
+            stream.seek(0)
+            reader = pa.ipc.open_file(stream)
+            batches = (reader.get_batch(idx) for idx in range(reader.num_record_batches))
+            return reader.schema, batches, None
+        stream.seek(0)
+        reader = pa.ipc.open_stream(stream)
+        return reader.schema, iter(reader), None
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f"Failed to read {input_format} file: {str(e)}")
+
+
+def read_arrow_stream(
+    stream: BinaryIO,
+    input_format: str,
+    batch_size: int = 5000,
+    start_row: int = 1,
+) -> Tuple[List[str], Iterator[Tuple[int, Any]]]:
+    """
+    Open a Parquet/Arrow IPC stream for batched reading.
+    Returns column names and a generator of (first row number, RecordBatch) with
+    rows numbered from 1; batches are zero-copy slices of what the file holds.
+    Rows before start_row are skipped to continue an earlier read.
+    """
+    schema, batches, _ = _open_batches(stream, input_format)
+
+    def iter_batches() -> Iterator[Tuple[int, Any]]:
+        row_no = 1
+        for batch in batches:
+            skip = min(max(start_row - row_no, 0), batch.num_rows)
+            for offset in range(skip, batch.num_rows, batch_size):
+                yield row_no + offset, batch.slice(offset, batch_size)
+            row_no += batch.num_rows
+
+    return list(schema.names), iter_batches()
+
+
+def preview_arrow(stream: BinaryIO, input_format: str, preview_limit: int = 100) -> Dict[str, Any]:
+    """Prepare preview payload for a Parquet/Arrow upload, reading only the first batches"""
+    schema, batches, total_rows = _open_batches(stream, input_format)
+    rows: List[Dict[str, Any]] = []
+    for batch in batches:
+        rows.extend(batch.slice(0, preview_limit - len(rows)).to_pylist())
+        if len(rows) >= preview_limit:
+            break
+    else:
+        total_rows = len(rows)
+
+    return {
+        "headers": list(schema.names),
+        "rows": rows,
+        "format": input_format,
+        "column_types": {field.name: str(field.type) for field in schema},
+        "preview_count": len(rows),
+        "estimated_total_rows": total_rows,
+    }
+
+
+def _native_matches(arrow_type: Any, data_type: str) -> bool:
+    """Whether a column can be loaded as is, without per-value conversion"""
+    if pa.types.is_null(arrow_type):
+        return True
+    if data_type == "integer":
+        return pa.types.is_integer(arrow_type)
+    if data_type == "decimal":
+        return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type)
+    if data_type == "date":
+        return pa.types.is_date(arrow_type)
+    if data_type == "boolean":
+        return pa.types.is_boolean(arrow_type)
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+
+_FALLBACK_TYPES = {
+    "integer": "int64",
+    "decimal": "float64",
+    "date": "string",  # the database parses dates, as for CSV input
+    "boolean": "bool",
+    "varchar": "string",
+}
+
+
+def validate_record_batch(
+    batch: Any,
+    plan: ValidationPlan,
+    start_row: int = 1,
+) -> Tuple[Any, List[CSVValidationError]]:
+    """
+    Validate a RecordBatch against a plan whose keys are column positions.
+    Columns whose Arrow type already fits the target are kept as is (zero-copy);
+    others are cast to strings and run through the same converters as CSV input.
+    Returns a RecordBatch of the valid rows in plan order and the errors.
+    """
+    arrays = []
+    cell_errors: List[Tuple[int, int, CSVValidationError]] = []
+    for position, (column_idx, db_col, data_type, convert) in enumerate(plan):
+        column = batch.column(column_idx)
+        if _native_matches(column.type, data_type):
+            arrays.append(column)
+            continue
+        if data_type == "varchar":
+            arrays.append(pc.cast(column, pa.string()))
+            continue
+
+        try:
+            values = pc.cast(column, pa.string()).to_pylist()
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ValueError(f"Column of type {column.type} cannot be imported into {data_type} column '{db_col}'")
+        converted, column_errors = convert_column(values, data_type, convert)
+        arrays.append(pa.array(converted, type=pa.type_for_alias(_FALLBACK_TYPES[data_type])))
+        for idx, exc in column_errors:
+            cell_errors.append((idx, position, value_error(start_row + idx, db_col, data_type, values[idx], exc)))
+
+    validated = pa.RecordBatch.from_arrays(arrays, names=[db_col for _, db_col, _, _ in plan])
+    if not cell_errors:
+        return validated, []
+
+    cell_errors.sort(key=lambda item: (item[0], item[1]))
+    keep = [True] * batch.num_rows
+    for idx, _, _ in cell_errors:
+        keep[idx] = False
+    return validated.filter(pa.array(keep)), [error for _, _, error in cell_errors]
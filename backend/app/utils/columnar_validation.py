@@ -0,0 +1,137 @@
+from itertools import compress
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.schemas.schemas import CSVValidationError
+from app.utils.csv_handler import (
+    FALSE_VALUES,
+    TRUE_VALUES,
+    ValidationPlan,
+    validate_rows,
+    value_error,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # listed in requirements.txt; columnar validation is rejected or falls back to rows without it
+    pa = None
+    pc = None
+
+# Values matching these patterns are cast by Arrow; anything else non-empty goes
+# through the row-path converter so accepted input and error text stay identical.
+_INTEGER_PATTERN = r"^-?[0-9]+$"
+_DECIMAL_PATTERN = r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$"
+_DATE_PATTERN = r"^[0-9]{4}-[0-9]{2}-[0-9]{2}$"
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+def _nonzero(mask) -> List[int]:
+    return pc.indices_nonzero(mask).to_pylist()
+
+
+def convert_column(
+    values: Sequence[Optional[str]],
+    data_type: str,
+    convert: Any,
+) -> Tuple[List[Any], List[Tuple[int, Exception]]]:
+    """
+    Convert one column of strings in bulk.
+    Returns converted python values (None for empty or null cells) and (position, error) pairs.
+    """
+    raw = pa.array(values, type=pa.string())
+    trimmed = pc.utf8_trim_whitespace(raw)
+    null_mask = pc.fill_null(pc.equal(trimmed, ""), True)
+
+    if data_type == "varchar":
+        converted = list(values)
+        for idx in _nonzero(null_mask):
+            converted[idx] = None
+        return converted, []
+
+    if data_type == "integer":
+        candidate_mask = pc.match_substring_regex(trimmed, _INTEGER_PATTERN)
+        target_type = pa.int64()
+    elif data_type == "decimal":
+        candidate_mask = pc.match_substring_regex(trimmed, _DECIMAL_PATTERN)
+        target_type = pa.float64()
+    elif data_type == "date":
+        candidate_mask = pc.match_substring_regex(raw, _DATE_PATTERN)
+        target_type = None
+    else:  # boolean
+        lowered = pc.utf8_lower(raw)
+        true_mask = pc.is_in(lowered, value_set=pa.array(sorted(TRUE_VALUES)))
+        false_mask = pc.is_in(lowered, value_set=pa.array(sorted(FALSE_VALUES)))
+        candidate_mask = pc.or_(true_mask, false_mask)
+        target_type = None
+
+    candidate_mask = pc.and_(pc.fill_null(candidate_mask, False), pc.invert(null_mask))
+    if data_type == "boolean":
+        converted = pc.if_else(candidate_mask, true_mask, pa.scalar(None, pa.bool_())).to_pylist()
+    elif target_type is not None:
+        try:
+            converted = pc.cast(
+                pc.if_else(candidate_mask, trimmed, pa.scalar(None, pa.string())),
+                target_type,
+            ).to_pylist()
+        except (pa.ArrowInvalid, OverflowError):
+            # e.g. integers beyond int64: let the row converter decide every cell
+            candidate_mask = pa.array([False] * len(values))
+            converted = [None] * len(values)
+    else:
+        converted = pc.if_else(candidate_mask, raw, pa.scalar(None, pa.string())).to_pylist()
+
+    errors: List[Tuple[int, Exception]] = []
+    leftover_mask = pc.invert(pc.or_(candidate_mask, null_mask))
+    for idx in _nonzero(leftover_mask):
+        try:
+            converted[idx] = convert(values[idx])
+        except ValueError as e:
+            errors.append((idx, e))
+    return converted, errors
+
+
+def validate_rows_columnar(
+    rows: List[Any],
+    plan: ValidationPlan,
+    start_row: int = 2,
+) -> Tuple[List[Tuple[Any, ...]], List[CSVValidationError]]:
+    """
+    Columnar variant of validate_rows: transposes a batch of csv.reader rows into
+    Arrow arrays and casts whole columns at once.
+    Falls back to validate_rows when pyarrow is missing, rows are dicts or some
+    lines are shorter than the mapped columns.
+    """
+    if not rows:
+        return [], []
+    if pa is None or not all(isinstance(csv_key, int) for csv_key, _, _, _ in plan):
+        return validate_rows(rows, plan, start_row=start_row)
+
+    width = max(csv_key for csv_key, _, _, _ in plan) + 1
+    if min(map(len, rows)) < width:
+        return validate_rows(rows, plan, start_row=start_row)
+
+    columns = list(zip(*rows))
+    converted_columns: List[List[Any]] = []
+    cell_errors: List[Tuple[int, int, CSVValidationError]] = []
+    for position, (csv_key, db_col, data_type, convert) in enumerate(plan):
+        converted, column_errors = convert_column(columns[csv_key], data_type, convert)
+        converted_columns.append(converted)
+        for idx, exc in column_errors:
+            cell_errors.append((
+                idx,
+                position,
+                value_error(start_row + idx, db_col, data_type, columns[csv_key][idx], exc),
+            ))
+
+    if not cell_errors:
+        return list(zip(*converted_columns)), []
+
+    cell_errors.sort(key=lambda item: (item[0], item[1]))
+    keep = [True] * len(rows)
+    for idx, _, _ in cell_errors:
+        keep[idx] = False
+    valid_rows = list(compress(zip(*converted_columns), keep))
+    return valid_rows, [error for _, _, error in cell_errors]
@@ -0,0 +1,95 @@
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+from typing import BinaryIO, List, Optional, Tuple
+
+# Magic bytes of supported compressed inputs
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"PK\x03\x04", "zip"),
+)
+_CSV_EXTENSIONS = (".csv", ".tsv", ".txt")
+_DEFLATE_MAX_RATIO = 1032  # deflate never expands data more than this
+
+# (readable stream, compression or None, uncompressed size when cheaply known)
+DecompressedInput = Tuple[BinaryIO, Optional[str], Optional[int]]
+
+
+def detect_compression(sample: bytes) -> Optional[str]:
+    """Detect the compression format from the first bytes of an upload"""
+    for magic, compression in _MAGIC:
+        if sample.startswith(magic):
+            return compression
+    return None
+
+
+def list_archive_members(archive: zipfile.ZipFile) -> List[str]:
+    return [
+        info.filename
+        for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+    ]
+
+
+def _select_member(archive: zipfile.ZipFile, member: Optional[str]) -> zipfile.ZipInfo:
+    names = list_archive_members(archive)
+    if member:
+        if member not in names:
+            raise ValueError(f"File '{member}' not found in archive")
+        return archive.getinfo(member)
+
+    candidates = [name for name in names if name.lower().endswith(_CSV_EXTENSIONS)] or names
+    if not candidates:
+        raise ValueError("Archive is empty")
+    if len(candidates) > 1:
+        raise ValueError(f"Archive contains several files, choose one with archive_member: {', '.join(candidates)}")
+    return archive.getinfo(candidates[0])
+
+
+def _gzip_size(stream: BinaryIO) -> Optional[int]:
+    # ISIZE trailer of the last member, modulo 2**32 like the format defines it;
+    # unknown once the compressed size allows a decompressed size of 4 GB or more
+    position = stream.tell()
+    end = stream.seek(0, io.SEEK_END)
+    if (end - position) * _DEFLATE_MAX_RATIO >= 2 ** 32:
+        stream.seek(position)
+        return None
+    stream.seek(max(end - 4, 0))
+    size = int.from_bytes(stream.read(4), "little")
+    stream.seek(position)
+    return size
+
+
+def open_decompressed(stream: BinaryIO, member: Optional[str] = None) -> DecompressedInput:
+    """
+    Wrap a seekable upload stream so it reads decompressed bytes.
+    gzip, bz2 and xz are decompressed on the fly; for zip archives the single
+    CSV member (or the one named by member) is opened. Uncompressed uploads are
+    returned as is. All wrappers support the readline/seek/tell calls the CSV
+    reader relies on and keep only their decompression buffers in memory.
+    """
+    position = stream.tell()
+    compression = detect_compression(stream.read(8))
+    stream.seek(position)
+
+    try:
+        if compression is None:
+            size = stream.seek(0, io.SEEK_END) - position
+            stream.seek(position)
+            return stream, None, size
+        if compression == "gzip":
+            return gzip.GzipFile(fileobj=stream, mode="rb"), compression, _gzip_size(stream)
+        if compression == "bz2":
+            return bz2.BZ2File(stream, mode="rb"), compression, None
+        if compression == "xz":
+            return lzma.LZMAFile(stream, mode="rb"), compression, None
+
+        archive = zipfile.ZipFile(stream)
+        info = _select_member(archive, member)
+        return archive.open(info), compression, info.file_size
+    except (OSError, EOFError, lzma.LZMAError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Failed to open {compression} upload: {str(e)}")
@@ -1,8 +1,29 @@
+import codecs
 import csv
 import io
-from typing import List, Dict, Any, Tuple
+import itertools
+import re
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, BinaryIO, Optional, Callable
 from app.schemas.schemas import CSVValidationError
 
+SAMPLE_SIZE = 64 * 1024
+
+TRUE_VALUES = frozenset({"true", "1", "yes", "y"})
+FALSE_VALUES = frozenset({"false", "0", "no", "n"})
+_BOOLEANS = {**{value: True for value in TRUE_VALUES}, **{value: False for value in FALSE_VALUES}}
+_DATE_MATCH = re.compile(r"\d{4}-\d{2}-\d{2}").fullmatch
+_TYPE_ALIASES = {
+    "integer": "integer", "int": "integer", "int4": "integer", "int8": "integer",
+    "bigint": "integer", "smallint": "integer", "serial": "integer",
+    "decimal": "decimal", "numeric": "decimal", "real": "decimal", "float": "decimal",
+    "double precision": "decimal",
+    "date": "date",
+    "boolean": "boolean", "bool": "boolean",
+}
+
+# ((csv key, db column, data type, converter), ...) built once per import
+ValidationPlan = Tuple[Tuple[Any, str, str, Callable[[str], Any]], ...]
+
 
 def detect_delimiter(file_content: str) -> str:
     """Detect CSV delimiter from content sample"""
@@ -14,21 +35,244 @@ def detect_delimiter(file_content: str) -> str:
         return ","
 
 
-def decode_csv_bytes(file_bytes: bytes, encoding: str = "utf-8") -> str:
-    """Decode CSV bytes with selected encoding and fallbacks"""
-    encodings_to_try = [encoding, "utf-8", "cp1251", "latin-1"]
-    seen = set()
-    for candidate in encodings_to_try:
-        if candidate in seen:
-            continue
-        seen.add(candidate)
-        try:
-            return file_bytes.decode(candidate)
-        except Exception:
+def _encoding_candidates(encoding: str) -> List[str]:
+    candidates = []
+    for candidate in [encoding, "utf-8", "cp1251", "latin-1"]:
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    try:
+        # final=False tolerates a multi-byte sequence cut at the sample boundary
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+def _guess_single_byte_encoding(sample: bytes) -> str:
+    """
+    Tell cp1251 from latin-1 by byte frequencies.
+    Cyrillic words are runs of 0xC0-0xFF bytes and punctuation lives in 0x80-0xBF,
+    while latin-1 text has isolated accented letters between ASCII ones and
+    no printable characters in 0x80-0x9F at all.
+    """
+    if not _decodes(sample, "cp1251"):
+        return "latin-1"
+    high = adjacent = c1 = 0
+    previous_high = False
+    for byte in sample:
+        if byte >= 0xC0:
+            high += 1
+            if previous_high:
+                adjacent += 1
+            previous_high = True
             continue
+        previous_high = False
+        if 0x80 <= byte <= 0x9F:
+            c1 += 1
+    if c1 or (high and adjacent * 2 >= high):
+        return "cp1251"
+    return "latin-1"
+
+
+def detect_encoding(sample: bytes, encoding: str = "utf-8") -> str:
+    """
+    Pick the encoding of a CSV from a bounded sample of its first bytes.
+    A byte order mark wins; an explicitly requested non-UTF-8 encoding is kept
+    while it decodes the sample; otherwise UTF-8 is used when the sample is valid
+    UTF-8 and cp1251/latin-1 is guessed from byte frequencies. UTF-8 from an
+    ASCII-only sample is only a provisional choice, see is_undecided_encoding.
+    """
+    for bom, bom_encoding in _BOMS:
+        if sample.startswith(bom):
+            return bom_encoding
+
+    requested = (encoding or "").lower().replace("_", "-")
+    if requested not in ("", "auto", "utf-8", "utf8") and _decodes(sample, encoding):
+        return encoding
+    if _decodes(sample, "utf-8"):
+        return "utf-8"
+    return _guess_single_byte_encoding(sample)
+
+
+def is_undecided_encoding(sample: bytes, detected: str) -> bool:
+    """
+    True when UTF-8 was picked from an ASCII-only sample, which says nothing
+    about the bytes after it: a cp1251 file may only have Cyrillic further on.
+    """
+    return detected == "utf-8" and sample.isascii()
+
+
+def decode_csv_bytes(file_bytes: bytes, encoding: str = "utf-8") -> str:
+    """Decode CSV bytes with the encoding detected from their first bytes"""
+    detected = detect_encoding(file_bytes[:SAMPLE_SIZE], encoding)
+    try:
+        return file_bytes.decode(detected)
+    except UnicodeDecodeError:
+        # The sample looked fine but a later byte did not; latin-1 always decodes
+        for candidate in _encoding_candidates(encoding):
+            if candidate == detected:
+                continue
+            try:
+                return file_bytes.decode(candidate)
+            except Exception:
+                continue
     raise ValueError("Failed to decode CSV with provided encoding")
 
 
+def peek_stream(stream: BinaryIO, size: int = SAMPLE_SIZE) -> bytes:
+    """Read a sample from a seekable stream without moving its position"""
+    position = stream.tell()
+    sample = stream.read(size)
+    stream.seek(position)
+    return sample
+
+
+def is_ascii_compatible(encoding: str) -> bool:
+    """True when lines can be split on raw bytes, so stream offsets map to line starts"""
+    return "\n".encode(encoding) == b"\n"
+
+
+def _is_single_byte_text(line: bytes) -> bool:
+    """
+    Whether a line that is not valid UTF-8 is single-byte text rather than
+    UTF-8 with a corrupt byte: several bytes do not decode, and they outnumber
+    the valid multi-byte characters.
+    """
+    decoded = line.decode("utf-8", errors="replace")
+    invalid = decoded.count("\ufffd")
+    valid = sum(1 for char in decoded if not char.isascii()) - invalid
+    return invalid >= 2 and invalid > valid
+
+
+def iter_decoded_lines(
+    stream: BinaryIO,
+    encoding: str,
+    fallback: bool = False,
+    on_fallback: Optional[Callable[[str], None]] = None,
+) -> Iterator[str]:
+    """
+    Decode a binary stream line by line, never holding more than one line.
+    With fallback, the first line that is not valid in encoding but looks like
+    single-byte text switches the decoding of it and the rest of the stream to
+    cp1251 or latin-1, guessed from that line, and on_fallback is called with
+    that encoding. A line that is UTF-8 apart from a corrupt byte still fails.
+    """
+    try:
+        if not is_ascii_compatible(encoding):
+            # Not ASCII-compatible (utf-16 etc.): byte-level line splitting is unsafe
+            wrapper = io.TextIOWrapper(stream, encoding=encoding, newline="")
+            try:
+                # Not "yield from": closing the generator would close the wrapper and the stream
+                for line in wrapper:
+                    yield line
+            finally:
+                wrapper.detach()
+            return
+
+        decoder = codecs.getincrementaldecoder(encoding)()
+        readline = stream.readline
+        while True:
+            raw_line = readline()
+            if not raw_line:
+                break
+            try:
+                line = decoder.decode(raw_line)
+            except UnicodeDecodeError:
+                if not fallback or not _is_single_byte_text(raw_line):
+                    raise
+                # Lines end on a newline, so no partial character is left in the old decoder
+                fallback = False
+                encoding = _guess_single_byte_encoding(raw_line)
+                decoder = codecs.getincrementaldecoder(encoding)()
+                line = decoder.decode(raw_line)
+                if on_fallback is not None:
+                    on_fallback(encoding)
+            yield line
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Failed to decode CSV with encoding '{encoding}': {str(e)}")
+
+
+def iter_row_batches(
+    rows: Iterable[Any],
+    batch_size: int,
+    start_row: int = 2,
+) -> Iterator[Tuple[int, List[Any]]]:
+    """
+    Group rows into fixed-size batches.
+    Yields (row number of the first row in batch, rows); row 1 is the header.
+    """
+    batch: List[Any] = []
+    batch_start = start_row
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch_start, batch
+                batch_start += len(batch)
+                batch = []
+    except csv.Error as e:
+        raise ValueError(f"Failed to parse CSV near row {batch_start + len(batch)}: {str(e)}")
+    if batch:
+        yield batch_start, batch
+
+
+def read_csv_stream(
+    stream: BinaryIO,
+    encoding: str = "utf-8",
+    delimiter: Optional[str] = None,
+    batch_size: int = 5000,
+    start_row: int = 2,
+    start_offset: Optional[int] = None,
+) -> Tuple[List[str], Iterator[Tuple[int, List[List[str]]]]]:
+    """
+    Open a binary CSV stream for batched reading.
+    Returns headers and a generator of (first row number, rows) batches where
+    rows are csv.reader lists, so only one batch is materialised at a time.
+    To continue an earlier read from start_row, the stream is moved to
+    start_offset (the byte offset of that row) when given, otherwise the rows
+    before it are parsed and skipped.
+    """
+    sample = peek_stream(stream)
+    resolved_encoding = detect_encoding(sample, encoding)
+    resolved_delimiter = delimiter or detect_delimiter(sample.decode(resolved_encoding, errors="ignore"))
+    fallback = is_undecided_encoding(sample, resolved_encoding)
+
+    try:
+        lines = iter_decoded_lines(stream, resolved_encoding, fallback=fallback)
+        reader = csv.reader(lines, delimiter=resolved_delimiter)
+        headers = next(reader, [])
+        if start_row > 2 and start_offset is not None:
+            lines.close()
+            stream.seek(start_offset)
+            reader = csv.reader(
+                iter_decoded_lines(stream, resolved_encoding, fallback=fallback),
+                delimiter=resolved_delimiter,
+            )
+        elif start_row > 2:
+            for _ in itertools.islice(reader, start_row - 2):
+                pass
+    except csv.Error as e:
+        raise ValueError(f"Failed to parse CSV: {str(e)}")
+
+    return headers, iter_row_batches(reader, batch_size, start_row=start_row)
+
+
 def parse_csv(file_content: str, delimiter: str = None, max_rows: int = None) -> Tuple[List[str], List[Dict[str, Any]]]:
     """
     Parse CSV file content and return headers and data
@@ -47,69 +291,250 @@ def parse_csv(file_content: str, delimiter: str = None, max_rows: int = None) ->
         raise ValueError(f"Failed to parse CSV: {str(e)}")
 
 
-def preview_csv(file_bytes: bytes, encoding: str = "utf-8", delimiter: str = None, preview_limit: int = 100):
-    """Prepare preview payload for CSV import wizard"""
-    file_content = decode_csv_bytes(file_bytes, encoding=encoding)
-    resolved_delimiter = delimiter or detect_delimiter(file_content)
-    headers, rows = parse_csv(file_content, delimiter=resolved_delimiter, max_rows=preview_limit)
+def preview_csv(
+    stream: BinaryIO,
+    encoding: str = "utf-8",
+    delimiter: str = None,
+    preview_limit: int = 100,
+    total_bytes: Optional[int] = None,
+):
+    """
+    Prepare preview payload for CSV import wizard.
+    Reads only the sniffing sample and the first preview_limit rows of the stream;
+    the total row count is extrapolated from the average byte size of those rows
+    and total_bytes, the size of the decoded input. Without total_bytes the
+    estimate is only given when the preview reaches the end of the input.
+    """
+    sample = peek_stream(stream)
+    resolved_encoding = detect_encoding(sample, encoding)
+    resolved_delimiter = delimiter or detect_delimiter(sample.decode(resolved_encoding, errors="ignore"))
+
+    # Count consumed bytes by re-encoding the decoded lines: stream.tell() is
+    # meaningless for codecs that are read through a buffered text wrapper
+    encoder = codecs.getincrementalencoder(resolved_encoding)()
+    consumed_bytes = 0
+    fallback = is_undecided_encoding(sample, resolved_encoding)
+
+    def switch_encoding(encoding: str) -> None:
+        # Later rows are counted, and the import should be run, in the fallback encoding
+        nonlocal encoder, resolved_encoding
+        encoder = codecs.getincrementalencoder(encoding)()
+        resolved_encoding = encoding
+
+    def counted_lines() -> Iterator[str]:
+        nonlocal consumed_bytes
+        for line in iter_decoded_lines(stream, resolved_encoding, fallback=fallback, on_fallback=switch_encoding):
+            consumed_bytes += len(encoder.encode(line))
+            yield line
+
+    rows = []
+    lines = counted_lines()
+    try:
+        reader = csv.DictReader(lines, delimiter=resolved_delimiter)
+        headers = reader.fieldnames or []
+        header_bytes = consumed_bytes
+        for row in reader:
+            rows.append(row)
+            if len(rows) >= preview_limit:
+                break
+    except csv.Error as e:
+        raise ValueError(f"Failed to parse CSV: {str(e)}")
+    finally:
+        lines.close()
+
+    rows_bytes = consumed_bytes - header_bytes
+    if len(rows) < preview_limit or (total_bytes is not None and consumed_bytes >= total_bytes):
+        estimated_total_rows = len(rows)
+    elif total_bytes is None or not rows_bytes:
+        estimated_total_rows = None
+    else:
+        estimated_total_rows = round((total_bytes - header_bytes) * len(rows) / rows_bytes)
+
     return {
         "headers": headers,
         "rows": rows,
-        "encoding": encoding,
+        "encoding": resolved_encoding,
         "delimiter": resolved_delimiter,
         "preview_count": len(rows),
+        "estimated_total_rows": estimated_total_rows,
     }
 
 
+def normalize_column_type(data_type: str) -> str:
+    """Map a column type (varchar, INTEGER, NUMERIC(10, 2), ...) to a validation type"""
+    base_type = (data_type or "varchar").lower().split("(")[0].strip()
+    return _TYPE_ALIASES.get(base_type, "varchar")
+
+
+# Converters return None for empty cells and raise ValueError for bad values
+def _convert_integer(value: str) -> Optional[int]:
+    return int(value) if value else None
+
+
+def _convert_decimal(value: str) -> Optional[float]:
+    return float(value) if value else None
+
+
+def _convert_date(value: str) -> Optional[str]:
+    if not value:
+        return None
+    if _DATE_MATCH(value) is None:
+        raise ValueError("Date must be in YYYY-MM-DD format")
+    return value
+
+
+def _convert_boolean(value: str) -> Optional[bool]:
+    if not value:
+        return None
+    try:
+        return _BOOLEANS[value.lower()]
+    except KeyError:
+        raise ValueError("Boolean must be true/false") from None
+
+
+def _convert_varchar(value: str) -> Optional[str]:
+    if not value or value.isspace():
+        return None
+    return value
+
+
+_CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "integer": _convert_integer,
+    "decimal": _convert_decimal,
+    "date": _convert_date,
+    "boolean": _convert_boolean,
+    "varchar": _convert_varchar,
+}
+
+
+def compile_validation_plan(
+    columns_config: Dict[str, str],
+    mapping: Dict[str, str],
+    headers: Optional[List[str]] = None,
+) -> ValidationPlan:
+    """
+    Build a per-import validation plan: ((csv key, db column, data type, converter), ...)
+    With headers the csv key is the column position (rows are lists from csv.reader),
+    otherwise the CSV column name (rows are dicts).
+    """
+    positions = {header: idx for idx, header in enumerate(headers)} if headers is not None else None
+    csv_column_by_db_column: Dict[str, str] = {}
+    for csv_col, db_col in mapping.items():
+        csv_column_by_db_column[db_col] = csv_col
+
+    plan = []
+    for db_col, csv_col in csv_column_by_db_column.items():
+        if positions is not None:
+            if csv_col not in positions:
+                raise ValueError(f"Column '{csv_col}' not found in CSV")
+            csv_key: Any = positions[csv_col]
+        else:
+            csv_key = csv_col
+        data_type = normalize_column_type(columns_config.get(db_col, "varchar"))
+        plan.append((csv_key, db_col, data_type, _CONVERTERS[data_type]))
+    return tuple(plan)
+
+
+def plan_columns(plan: ValidationPlan) -> List[str]:
+    """DB columns in the order validated rows are produced"""
+    return [db_col for _, db_col, _, _ in plan]
+
+
+def value_error(row_idx: int, db_col: str, data_type: str, value: str, exc: Exception) -> CSVValidationError:
+    """Build the error reported for a cell that failed type conversion"""
+    return CSVValidationError.model_construct(
+        row=row_idx,
+        error=f"Invalid {data_type} value '{value}' in column '{db_col}': {str(exc)}",
+        suggested_fix=f"Ensure value is a valid {data_type}",
+        column=db_col,
+        kind=f"invalid_{data_type}",
+    )
+
+
+def _validate_row_slow(
+    row: Any,
+    row_idx: int,
+    plan: ValidationPlan,
+    errors: List[CSVValidationError],
+) -> Optional[List[Any]]:
+    """Cell-by-cell validation that reports every bad cell of a row"""
+    new_error = CSVValidationError.model_construct
+    values: List[Any] = []
+    error_found = False
+    for csv_key, db_col, data_type, convert in plan:
+        try:
+            value = row[csv_key]
+        except IndexError:
+            value = None  # short line, same as csv.DictReader restval
+        except KeyError:
+            errors.append(new_error(
+                row=row_idx,
+                error=f"Column '{csv_key}' not found in CSV",
+                suggested_fix=f"Check CSV header, expected column '{csv_key}'",
+                column=str(csv_key),
+                kind="missing_column",
+            ))
+            error_found = True
+            continue
+
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        if not value or value.isspace():
+            values.append(None)
+            continue
+
+        try:
+            values.append(convert(value))
+        except ValueError as e:
+            errors.append(value_error(row_idx, db_col, data_type, value, e))
+            error_found = True
+
+    return None if error_found else values
+
+
+def validate_rows(
+    rows: Iterable[Any],
+    plan: ValidationPlan,
+    start_row: int = 2,
+) -> Tuple[List[List[Any]], List[CSVValidationError]]:
+    """
+    Validate rows against a compiled plan.
+    Returns valid rows as value lists ordered like plan_columns(plan) and the errors found.
+    Clean rows take a single-expression fast path; any failure re-runs the row
+    cell by cell to build precise errors.
+    """
+    errors: List[CSVValidationError] = []
+    valid_rows: List[List[Any]] = []
+    append_valid = valid_rows.append
+    fast_plan = tuple((csv_key, convert) for csv_key, _, _, convert in plan)
+
+    for row_idx, row in enumerate(rows, start=start_row):
+        try:
+            append_valid([convert(row[csv_key]) for csv_key, convert in fast_plan])
+        except Exception:
+            values = _validate_row_slow(row, row_idx, plan, errors)
+            if values is not None:
+                append_valid(values)
+
+    return valid_rows, errors
+
+
 def validate_csv_against_table_schema(
     rows: List[Dict[str, Any]], 
     columns_config: Dict[str, str],
-    mapping: Dict[str, str]
+    mapping: Dict[str, str],
+    start_row: int = 2,
 ) -> Tuple[List[Dict[str, Any]], List[CSVValidationError]]:
     """
     Validate CSV data against table schema
     columns_config: {db_column: data_type}
     mapping: {csv_column: db_column}
+    start_row: file row number of rows[0] (header is row 1)
     """
-    errors = []
-    valid_rows = []
-    
-    for row_idx, row in enumerate(rows, start=2):  # Start from 2 (header is row 1)
-        try:
-            valid_row = {}
-            error_found = False
-            
-            for csv_col, db_col in mapping.items():
-                if csv_col not in row:
-                    errors.append(CSVValidationError(
-                        row=row_idx,
-                        error=f"Column '{csv_col}' not found in CSV",
-                        suggested_fix=f"Check CSV header, expected column '{csv_col}'"
-                    ))
-                    error_found = True
-                    continue
-                
-                value = row[csv_col]
-                data_type = columns_config.get(db_col, "varchar")
-                
-                # Type validation
-                validated_value = validate_value(value, data_type, row_idx, db_col, errors)
-                if validated_value is not None or (not value and data_type != "required"):
-                    valid_row[db_col] = validated_value
-                else:
-                    error_found = True
-            
-            if not error_found:
-                valid_rows.append(valid_row)
-                
-        except Exception as e:
-            errors.append(CSVValidationError(
-                row=row_idx,
-                error=str(e),
-                suggested_fix="Check data types and formatting"
-            ))
-    
-    return valid_rows, errors
+    plan = compile_validation_plan(columns_config, mapping)
+    valid_rows, errors = validate_rows(rows, plan, start_row=start_row)
+    columns = plan_columns(plan)
+    return [dict(zip(columns, values)) for values in valid_rows], errors
 
 
 def validate_value(value: Any, data_type: str, row: int, column: str, errors: List[CSVValidationError]) -> Any:
@@ -117,29 +542,15 @@ def validate_value(value: Any, data_type: str, row: int, column: str, errors: Li
     if not value or value.strip() == "":
         return None
     
+    normalized_type = normalize_column_type(data_type)
     try:
-        if data_type == "integer":
-            return int(value)
-        elif data_type == "decimal":
-            return float(value)
-        elif data_type == "date":
-            # Basic date validation (YYYY-MM-DD)
-            if len(value) != 10 or value[4] != '-' or value[7] != '-':
-                raise ValueError("Date must be in YYYY-MM-DD format")
-            return value
-        elif data_type == "boolean":
-            if value.lower() in ["true", "1", "yes", "y"]:
-                return True
-            elif value.lower() in ["false", "0", "no", "n"]:
-                return False
-            else:
-                raise ValueError("Boolean must be true/false")
-        else:  # varchar
-            return str(value)
+        return _CONVERTERS[normalized_type](value)
     except ValueError as e:
         errors.append(CSVValidationError(
             row=row,
-            error=f"Invalid {data_type} value '{value}' in column '{column}': {str(e)}",
-            suggested_fix=f"Ensure value is a valid {data_type}"
+            error=f"Invalid {normalized_type} value '{value}' in column '{column}': {str(e)}",
+            suggested_fix=f"Ensure value is a valid {normalized_type}",
+            column=column,
+            kind=f"invalid_{normalized_type}",
         ))
         return None
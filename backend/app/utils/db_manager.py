@@ -1,12 +1,27 @@
-from sqlalchemy import text, inspect
+import io
+import re
+import uuid
+from sqlalchemy import bindparam, text, inspect
 from sqlalchemy.orm import Session
 from app.schemas.schemas import ColumnDefinition, TableInfo, ColumnInfo
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
 
+LOAD_METHODS = ("auto", "copy", "insert")
+MAX_INSERT_PARAMS = 30000
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+VERSION_SCHEMA = "data_versions"  # replaced tables and snapshot copies are kept here for rollback
+_VERSION_TABLE_NAME = re.compile(rf"^{VERSION_SCHEMA}\.[sv]_[0-9a-f]{{32}}$")
 
-def create_table(db: Session, table_name: str, columns: List[ColumnDefinition]) -> bool:
+
+def create_table(
+    db: Session,
+    table_name: str,
+    columns: List[ColumnDefinition],
+    key_columns: Optional[List[str]] = None,
+) -> bool:
     """
     Create a table dynamically in the database
+    key_columns declares a unique index used as the conflict target of merge imports
     """
     if not is_valid_table_name(table_name):
         raise ValueError("Invalid table name")
@@ -46,9 +61,18 @@ def create_table(db: Session, table_name: str, columns: List[ColumnDefinition])
     column_defs.append("id SERIAL PRIMARY KEY")
     
     sql = f"CREATE TABLE {table_name} (\n  " + ",\n  ".join(column_defs) + "\n)"
+
+    if key_columns:
+        missing_keys = [key for key in key_columns if key not in seen_columns]
+        if missing_keys:
+            raise ValueError(f"Key columns not defined in table: {', '.join(missing_keys)}")
+        if len(set(key_columns)) != len(key_columns):
+            raise ValueError("Duplicate key column")
     
     try:
         db.execute(text(sql))
+        if key_columns:
+            db.execute(text(f"CREATE UNIQUE INDEX {table_name}_key ON {table_name} ({', '.join(key_columns)})"))
         db.commit()
         return True
     except Exception as e:
@@ -74,9 +98,9 @@ def drop_table(db: Session, table_name: str) -> bool:
 
 
 def table_exists(db: Session, table_name: str) -> bool:
-    """Check if table exists"""
+    """Check if table exists, tables created in the session's open transaction included"""
     try:
-        inspector = inspect(db.get_bind())
+        inspector = inspect(db.connection())
         return table_name in inspector.get_table_names()
     except:
         return False
@@ -117,8 +141,11 @@ def get_all_tables(db: Session) -> List[str]:
         return []
 
 
-def insert_rows(db: Session, table_name: str, rows: List[Dict[str, Any]]) -> int:
-    """Insert rows into table"""
+def insert_rows(db: Session, table_name: str, rows: List[Dict[str, Any]], commit: bool = True) -> int:
+    """
+    Insert rows into table
+    commit=False leaves the transaction open so batched imports commit once
+    """
     if not table_exists(db, table_name):
         raise ValueError(f"Table '{table_name}' does not exist")
     
@@ -148,13 +175,480 @@ def insert_rows(db: Session, table_name: str, rows: List[Dict[str, Any]]) -> int
             db.execute(sql, values)
             inserted_count += 1
         
-        db.commit()
+        if commit:
+            db.commit()
         return inserted_count
     except Exception as e:
         db.rollback()
         raise ValueError(f"Failed to insert rows: {str(e)}")
 
 
+def supports_copy(db: Session) -> bool:
+    """COPY FROM STDIN needs a PostgreSQL psycopg2 connection"""
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def _format_copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _copy_rows(db: Session, table_name: str, columns: List[str], rows: Iterable[Sequence[Any]]) -> int:
+    """Stream rows through COPY ... FROM STDIN (text format) inside the session transaction"""
+    buffer = io.StringIO()
+    row_count = 0
+    for row in rows:
+        buffer.write("\t".join([_format_copy_value(value) for value in row]))
+        buffer.write("\n")
+        row_count += 1
+    if row_count == 0:
+        return 0
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+    return row_count
+
+
+def _insert_rows_multivalues(db: Session, table_name: str, columns: List[str], rows: Iterable[Sequence[Any]]) -> int:
+    """Insert rows with multi-row VALUES statements, bounded by MAX_INSERT_PARAMS"""
+    rows_per_statement = max(1, min(1000, MAX_INSERT_PARAMS // len(columns)))
+    col_names = ", ".join(columns)
+    statements: Dict[int, Any] = {}
+
+    def build_statement(row_count: int):
+        if row_count not in statements:
+            values_sql = ", ".join(
+                "(" + ", ".join(f":p{row_idx}_{col_idx}" for col_idx in range(len(columns))) + ")"
+                for row_idx in range(row_count)
+            )
+            statements[row_count] = text(f"INSERT INTO {table_name} ({col_names}) VALUES {values_sql}")
+        return statements[row_count]
+
+    inserted_count = 0
+    chunk: List[Sequence[Any]] = []
+
+    def flush() -> None:
+        params = {
+            f"p{row_idx}_{col_idx}": value
+            for row_idx, row in enumerate(chunk)
+            for col_idx, value in enumerate(row)
+        }
+        db.execute(build_statement(len(chunk)), params)
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= rows_per_statement:
+            flush()
+            inserted_count += len(chunk)
+            chunk = []
+    if chunk:
+        flush()
+        inserted_count += len(chunk)
+    return inserted_count
+
+
+def _copy_arrow_batch(db: Session, table_name: str, batch: Any) -> int:
+    """COPY a pyarrow RecordBatch through its CSV encoding, without materialising rows"""
+    import pyarrow.csv as pa_csv
+
+    if batch.num_rows == 0:
+        return 0
+    buffer = io.BytesIO()
+    # Strings are always quoted and nulls written as bare empty fields, which is
+    # exactly how COPY's CSV format tells NULL from an empty string
+    pa_csv.write_csv(batch, buffer, pa_csv.WriteOptions(include_header=False))
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(batch.schema.names)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+    return batch.num_rows
+
+
+def _use_copy(db: Session, table_name: str, columns: List[str], method: str) -> bool:
+    """Validate a bulk load target and tell whether COPY should be used"""
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Unknown load method '{method}'")
+    if not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+    for col in columns:
+        if not is_valid_column_name(col):
+            raise ValueError(f"Invalid column name '{col}'")
+
+    use_copy = method == "copy" or (method == "auto" and supports_copy(db))
+    if use_copy and not supports_copy(db):
+        raise ValueError("COPY load method requires a PostgreSQL (psycopg2) connection")
+    return use_copy
+
+
+def bulk_load_rows(
+    db: Session,
+    table_name: str,
+    columns: List[str],
+    rows: Iterable[Sequence[Any]],
+    method: str = "auto",
+    commit: bool = False,
+) -> int:
+    """
+    Bulk load positional rows (values ordered like columns).
+    method: copy (COPY FROM STDIN), insert (multi-row INSERT) or auto (copy when available).
+    Table existence is expected to be checked by the caller once per import.
+    """
+    if not columns:
+        return 0
+    use_copy = _use_copy(db, table_name, columns, method)
+
+    try:
+        if use_copy:
+            loaded_count = _copy_rows(db, table_name, columns, rows)
+        else:
+            loaded_count = _insert_rows_multivalues(db, table_name, columns, rows)
+        if commit:
+            db.commit()
+        return loaded_count
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to load rows: {str(e)}")
+
+
+def bulk_load_arrow(
+    db: Session,
+    table_name: str,
+    columns: List[str],
+    batch: Any,
+    method: str = "auto",
+    commit: bool = False,
+) -> int:
+    """
+    Bulk load a pyarrow RecordBatch whose columns are ordered like columns.
+    COPY receives the batch CSV-encoded by Arrow; the INSERT fallback reads it
+    column by column into positional tuples, never into per-row dicts.
+    """
+    if not columns:
+        return 0
+    use_copy = _use_copy(db, table_name, columns, method)
+    batch = batch.rename_columns(columns)
+
+    try:
+        if use_copy:
+            loaded_count = _copy_arrow_batch(db, table_name, batch)
+        else:
+            rows = zip(*(column.to_pylist() for column in batch.columns))
+            loaded_count = _insert_rows_multivalues(db, table_name, columns, rows)
+        if commit:
+            db.commit()
+        return loaded_count
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to load rows: {str(e)}")
+
+
+def has_unique_key(db: Session, table_name: str, key_columns: List[str]) -> bool:
+    """Whether a unique index or constraint covers exactly key_columns (an ON CONFLICT target)"""
+    inspector = inspect(db.get_bind())
+    keys = [constraint["column_names"] for constraint in inspector.get_unique_constraints(table_name)]
+    keys += [index["column_names"] for index in inspector.get_indexes(table_name) if index.get("unique")]
+    keys.append(inspector.get_pk_constraint(table_name).get("constrained_columns") or [])
+    return any(set(key) == set(key_columns) for key in keys)
+
+
+def create_merge_staging(db: Session, table_name: str, columns: List[str]) -> str:
+    """
+    Create a temporary staging table shaped like columns of table_name.
+    It lives in the session's transaction (ON COMMIT DROP) and numbers rows in
+    load order so the merge can keep the last row of duplicated keys.
+    """
+    if not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+    for col in columns:
+        if not is_valid_column_name(col):
+            raise ValueError(f"Invalid column name '{col}'")
+
+    staging_name = f"merge_{uuid.uuid4().hex}"
+    try:
+        db.execute(text(
+            f"CREATE TEMPORARY TABLE {staging_name} ON COMMIT DROP AS "
+            f"SELECT {', '.join(columns)} FROM {table_name} WITH NO DATA"
+        ))
+        db.execute(text(f"ALTER TABLE {staging_name} ADD COLUMN merge_seq BIGSERIAL"))
+        return staging_name
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to create merge staging table: {str(e)}")
+
+
+def merge_staging(
+    db: Session,
+    table_name: str,
+    staging_name: str,
+    columns: List[str],
+    key_columns: List[str],
+    delete_missing: bool = False,
+) -> Dict[str, int]:
+    """
+    Apply a staging table to table_name with one set-based statement.
+    Rows are matched on key_columns (last staged row wins), inserted when new,
+    updated only when a value differs and left alone otherwise; with
+    delete_missing, rows whose key is absent from the staging table are deleted.
+    Returns inserted, updated, unchanged and deleted counts. The caller commits.
+    """
+    for col in [*columns, *key_columns]:
+        if not is_valid_column_name(col):
+            raise ValueError(f"Invalid column name '{col}'")
+    col_names = ", ".join(columns)
+    key_names = ", ".join(key_columns)
+    value_columns = [col for col in columns if col not in key_columns]
+
+    if value_columns:
+        assignments = ", ".join(f"{col} = EXCLUDED.{col}" for col in value_columns)
+        changed = " OR ".join(f"{table_name}.{col} IS DISTINCT FROM EXCLUDED.{col}" for col in value_columns)
+        conflict_action = f"DO UPDATE SET {assignments} WHERE {changed}"
+    else:
+        conflict_action = "DO NOTHING"
+
+    try:
+        deleted = 0
+        if delete_missing:
+            # Runs first so rows inserted below are never compared against themselves
+            key_match = " AND ".join(f"staged.{key} = target.{key}" for key in key_columns)
+            deleted = db.execute(text(
+                f"DELETE FROM {table_name} AS target "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {staging_name} AS staged WHERE {key_match})"
+            )).rowcount
+
+        # xmax is 0 only for tuples created by this statement's INSERT branch
+        source_rows, inserted, updated = db.execute(text(f"""
+            WITH source AS (
+                SELECT DISTINCT ON ({key_names}) {col_names}
+                FROM {staging_name}
+                ORDER BY {key_names}, merge_seq DESC
+            ), applied AS (
+                INSERT INTO {table_name} ({col_names})
+                SELECT {col_names} FROM source
+                ON CONFLICT ({key_names}) {conflict_action}
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+                (SELECT count(*) FROM source),
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted)
+            FROM applied
+        """)).one()
+        return {
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": source_rows - inserted - updated,
+            "deleted": deleted,
+        }
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to merge rows: {str(e)}")
+
+
+def create_shadow_table(db: Session, table_name: str) -> str:
+    """
+    Create an empty table shaped like table_name to load a full replacement into.
+    Columns, defaults (the id sequence included) and checks are copied, indexes
+    are not: swap_shadow_table builds them once the data is in. The shadow is
+    created in the session's transaction and stays invisible until it is swapped.
+    """
+    if not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+    if not table_exists(db, table_name):
+        raise ValueError(f"Table '{table_name}' does not exist")
+
+    shadow_name = f"shadow_{uuid.uuid4().hex}"
+    try:
+        db.execute(text(
+            f"CREATE TABLE {shadow_name} "
+            f"(LIKE {table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+        ))
+        return shadow_name
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to create shadow table: {str(e)}")
+
+
+def copy_table_rows(db: Session, source_table: str, target_table: str) -> int:
+    """
+    Copy rows (ids included) of source_table into target_table using the
+    columns both have, e.g. from an archived version into a shadow table.
+    source_table may be qualified with VERSION_SCHEMA. The caller commits.
+    """
+    schema, _, name = source_table.rpartition(".")
+    if schema not in ("", VERSION_SCHEMA) or not is_valid_table_name(name) or not is_valid_table_name(target_table):
+        raise ValueError("Invalid table name")
+
+    # The session's own connection sees the uncommitted shadow table
+    inspector = inspect(db.connection())
+    source_columns = {col["name"] for col in inspector.get_columns(name, schema=schema or None)}
+    columns = [col["name"] for col in inspector.get_columns(target_table) if col["name"] in source_columns]
+    col_names = ", ".join(columns)
+    try:
+        copied = db.execute(text(
+            f"INSERT INTO {target_table} ({col_names}) SELECT {col_names} FROM {source_table}"
+        )).rowcount
+        sequence_name = db.execute(
+            text("SELECT pg_get_serial_sequence(:table_name, 'id')"),
+            {"table_name": target_table}
+        ).scalar()
+        if sequence_name:
+            # Explicit ids bypass the sequence; never hand them out again
+            db.execute(
+                text(f"SELECT setval(:sequence_name, GREATEST((SELECT MAX(id) FROM {target_table}), "
+                     f"(SELECT last_value FROM {sequence_name}), 1), true)"),
+                {"sequence_name": sequence_name}
+            )
+        return copied
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to copy rows: {str(e)}")
+
+
+def swap_shadow_table(db: Session, table_name: str, shadow_name: str) -> str:
+    """
+    Build the indexes of table_name on a loaded shadow table and swap the two.
+    Index builds run before the target is locked; the swap itself is a handful
+    of catalog renames under an ACCESS EXCLUSIVE lock, so once the caller
+    commits readers move from the old rows to the new ones in one step. The old
+    table is moved to VERSION_SCHEMA and its qualified name returned.
+    """
+    if not is_valid_table_name(table_name) or not is_valid_table_name(shadow_name):
+        raise ValueError("Invalid table name")
+
+    archive_name = f"v_{uuid.uuid4().hex}"
+    try:
+        indexes = db.execute(text("""
+            SELECT index_class.relname, pg_get_indexdef(i.indexrelid), pg_get_constraintdef(c.oid)
+            FROM pg_index i
+            JOIN pg_class index_class ON index_class.oid = i.indexrelid
+            LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+            WHERE i.indrelid = CAST(:table_name AS regclass)
+            ORDER BY index_class.relname
+        """), {"table_name": table_name}).fetchall()
+
+        renames = []
+        for position, (index_name, index_def, constraint_def) in enumerate(indexes):
+            temp_name = f"{shadow_name}_{position}"
+            if constraint_def:
+                db.execute(text(f"ALTER TABLE {shadow_name} ADD CONSTRAINT {temp_name} {constraint_def}"))
+            else:
+                db.execute(text(re.sub(
+                    r"^(CREATE (?:UNIQUE )?INDEX )\S+( ON (?:ONLY )?)\S+",
+                    lambda match: f"{match.group(1)}{temp_name}{match.group(2)}{shadow_name}",
+                    index_def,
+                )))
+            renames.append((index_name, temp_name))
+        db.execute(text(f"ANALYZE {shadow_name}"))
+
+        db.execute(text(f"LOCK TABLE {table_name} IN ACCESS EXCLUSIVE MODE"))
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {VERSION_SCHEMA}"))
+        sequence_name = db.execute(
+            text("SELECT pg_get_serial_sequence(:table_name, 'id')"),
+            {"table_name": table_name}
+        ).scalar()
+        if sequence_name:
+            # The sequence follows the live table; the archive keeps plain ids
+            db.execute(text(f"ALTER SEQUENCE {sequence_name} OWNED BY {shadow_name}.id"))
+            db.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN id DROP DEFAULT"))
+        # Index names are unique per schema, so the archived ones are renamed first
+        for position, (index_name, _) in enumerate(renames):
+            db.execute(text(f"ALTER INDEX {index_name} RENAME TO {archive_name}_{position}"))
+        db.execute(text(f"ALTER TABLE {table_name} RENAME TO {archive_name}"))
+        db.execute(text(f"ALTER TABLE {archive_name} SET SCHEMA {VERSION_SCHEMA}"))
+        db.execute(text(f"ALTER TABLE {shadow_name} RENAME TO {table_name}"))
+        for index_name, temp_name in renames:
+            db.execute(text(f"ALTER INDEX {temp_name} RENAME TO {index_name}"))
+        return f"{VERSION_SCHEMA}.{archive_name}"
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to swap tables: {str(e)}")
+
+
+def create_snapshot_table(db: Session, table_name: str) -> Tuple[str, int]:
+    """
+    Copy table_name into a new table in VERSION_SCHEMA with CREATE TABLE AS,
+    so the rows never leave the database. The copy is made in the session's
+    transaction; returns its qualified name and row count. The caller commits.
+    """
+    if not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+    if not table_exists(db, table_name):
+        raise ValueError(f"Table '{table_name}' does not exist")
+
+    snapshot_name = f"{VERSION_SCHEMA}.s_{uuid.uuid4().hex}"
+    try:
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {VERSION_SCHEMA}"))
+        copied = db.execute(text(f"CREATE TABLE {snapshot_name} AS SELECT * FROM {table_name}")).rowcount
+        return snapshot_name, copied
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to create snapshot table: {str(e)}")
+
+
+def restore_from_snapshot_table(db: Session, table_name: str, snapshot_table: str) -> int:
+    """
+    Replace the rows of table_name with those of a snapshot or archived table
+    in VERSION_SCHEMA: TRUNCATE and one INSERT ... SELECT, in the session's
+    transaction. The table keeps its indexes, grants and dependent objects.
+    """
+    if not _VERSION_TABLE_NAME.match(snapshot_table) or not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+    if not table_exists(db, table_name):
+        raise ValueError(f"Table '{table_name}' does not exist")
+
+    try:
+        db.execute(text(f"TRUNCATE TABLE {table_name}"))
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to restore snapshot: {str(e)}")
+    return copy_table_rows(db, snapshot_table, table_name)
+
+
+def get_table_size(db: Session, table_name: str) -> int:
+    """Bytes a table takes on disk, indexes and TOAST included; may be qualified with VERSION_SCHEMA"""
+    if not _VERSION_TABLE_NAME.match(table_name) and not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+    try:
+        return db.execute(
+            text("SELECT pg_total_relation_size(CAST(:table_name AS regclass))"),
+            {"table_name": table_name}
+        ).scalar() or 0
+    except Exception as e:
+        raise ValueError(f"Failed to get table size: {str(e)}")
+
+
+def drop_version_tables(db: Session, table_names: Iterable[str]) -> int:
+    """Drop snapshot and archived tables in VERSION_SCHEMA that still exist. The caller commits."""
+    table_names = list(table_names)
+    if not all(_VERSION_TABLE_NAME.match(name) for name in table_names):
+        raise ValueError("Invalid table name")
+    if not table_names:
+        return 0
+
+    try:
+        db.execute(text(f"DROP TABLE IF EXISTS {', '.join(table_names)}"))
+        return len(table_names)
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"Failed to drop version tables: {str(e)}")
+
+
 def is_valid_table_name(table_name: str) -> bool:
     """Validate table name (prevent SQL injection)"""
     import re
@@ -317,8 +811,8 @@ def delete_rows(db: Session, table_name: str, row_ids: List[int]) -> int:
         raise ValueError(f"Failed to delete rows: {str(e)}")
 
 
-def get_table_snapshot(db: Session, table_name: str) -> List[Dict[str, Any]]:
-    """Get full table snapshot ordered by id asc"""
+def get_table_snapshot(db: Session, table_name: str) -> Tuple[List[str], List[Sequence[Any]]]:
+    """Get full table snapshot ordered by id asc: column names and row tuples"""
     if not table_exists(db, table_name):
         raise ValueError(f"Table '{table_name}' does not exist")
     if not is_valid_table_name(table_name):
@@ -326,16 +820,12 @@ def get_table_snapshot(db: Session, table_name: str) -> List[Dict[str, Any]]:
 
     try:
         result = db.execute(text(f"SELECT * FROM {table_name} ORDER BY id ASC"))
-        rows = []
-        for row in result.fetchall():
-            row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(zip(result.keys(), row))
-            rows.append(row_dict)
-        return rows
+        return list(result.keys()), result.fetchall()
     except Exception as e:
         raise ValueError(f"Failed to build table snapshot: {str(e)}")
 
 
-def restore_table_snapshot(db: Session, table_name: str, rows: List[Dict[str, Any]]) -> int:
+def restore_table_snapshot(db: Session, table_name: str, rows: List[Dict[str, Any]], commit: bool = True) -> int:
     """Replace table data with snapshot rows"""
     if not table_exists(db, table_name):
         raise ValueError(f"Table '{table_name}' does not exist")
@@ -384,9 +874,57 @@ def restore_table_snapshot(db: Session, table_name: str, rows: List[Dict[str, An
                     {"sequence_name": sequence_name}
                 )
 
-        db.commit()
+        if commit:
+            db.commit()
         return restored_count
     except Exception as e:
         db.rollback()
         raise ValueError(f"Failed to restore snapshot: {str(e)}")
 
+
+def get_rows_by_ids(db: Session, table_name: str, row_ids: List[int]) -> List[Dict[str, Any]]:
+    """Rows with the given ids, ordered by id"""
+    if not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+    if not row_ids:
+        return []
+
+    try:
+        sql = text(f"SELECT * FROM {table_name} WHERE id IN :row_ids ORDER BY id ASC").bindparams(
+            bindparam("row_ids", expanding=True)
+        )
+        return [dict(row._mapping) for row in db.execute(sql, {"row_ids": list(row_ids)})]
+    except Exception as e:
+        raise ValueError(f"Failed to read rows: {str(e)}")
+
+
+def revert_row_changes(
+    db: Session,
+    table_name: str,
+    before_rows: List[Dict[str, Any]],
+    inserted_ids: List[int],
+) -> None:
+    """
+    Undo a row changeset without committing: remove the rows it inserted and
+    put back the before-images of the rows it updated or deleted.
+    """
+    if not is_valid_table_name(table_name):
+        raise ValueError("Invalid table name")
+
+    row_ids = set(inserted_ids or []) | {row["id"] for row in before_rows}
+    if row_ids:
+        sql = text(f"DELETE FROM {table_name} WHERE id IN :row_ids").bindparams(
+            bindparam("row_ids", expanding=True)
+        )
+        db.execute(sql, {"row_ids": sorted(row_ids)})
+
+    if before_rows:
+        columns = list(before_rows[0].keys())
+        for col in columns:
+            if not is_valid_column_name(col):
+                raise ValueError(f"Invalid snapshot column '{col}'")
+        sql = text(
+            f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(f':{col}' for col in columns)})"
+        )
+        db.execute(sql, [{col: row.get(col) for col in columns} for row in before_rows])
+
@@ -0,0 +1,183 @@
+import gzip
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import ImportHistory
+from app.schemas.schemas import CSVValidationError
+
+
+class ImportErrorCollector:
+    """
+    Aggregate validation errors of one import in bounded memory.
+    Keeps per-(column, kind) counters with a few example rows and the first
+    inline_limit errors; once that limit is exceeded every error is streamed to a
+    gzip JSON-lines report on disk instead of being held in memory.
+    """
+
+    def __init__(
+        self,
+        inline_limit: Optional[int] = None,
+        examples_per_group: Optional[int] = None,
+        report_dir: Optional[str] = None,
+    ):
+        self.inline_limit = settings.IMPORT_ERROR_INLINE_LIMIT if inline_limit is None else inline_limit
+        self.examples_per_group = (
+            settings.IMPORT_ERROR_EXAMPLES_PER_GROUP if examples_per_group is None else examples_per_group
+        )
+        self.report_dir = report_dir or settings.IMPORT_ERROR_REPORT_DIR
+        self.count = 0
+        self.inline: List[CSVValidationError] = []
+        self.report_path: Optional[str] = None
+        self._report = None
+        self._groups: Dict[Tuple[Optional[str], Optional[str]], Dict[str, Any]] = {}
+
+    def add(self, errors: Iterable[CSVValidationError]) -> None:
+        for error in errors:
+            self.count += 1
+            group = self._groups.get((error.column, error.kind))
+            if group is None:
+                group = {"column": error.column, "kind": error.kind, "count": 0, "example_rows": []}
+                self._groups[(error.column, error.kind)] = group
+            group["count"] += 1
+            if len(group["example_rows"]) < self.examples_per_group:
+                group["example_rows"].append(error.row)
+
+            if self._report is not None:
+                self._write(error)
+            elif len(self.inline) < self.inline_limit:
+                self.inline.append(error)
+            else:
+                self._open_report()
+                self._write(error)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Seal the report written so far and return a JSON-serialisable state.
+        Each checkpoint ends a gzip member, so restore() can cut the report back
+        to exactly the errors of committed rows.
+        """
+        report_size = None
+        if self._report is not None:
+            self._report.close()
+            report_size = os.path.getsize(self.report_path)
+            self._report = gzip.open(self.report_path, "at", encoding="utf-8", compresslevel=6)
+        return {
+            "count": self.count,
+            "inline": [error.model_dump() for error in self.inline],
+            "groups": [{**group, "example_rows": list(group["example_rows"])} for group in self.groups()],
+            "report_path": self.report_path,
+            "report_size": report_size,
+        }
+
+    @classmethod
+    def restore(cls, state: Optional[Dict[str, Any]]) -> "ImportErrorCollector":
+        """Continue collecting from a checkpoint() state"""
+        collector = cls()
+        if not state:
+            return collector
+        collector.count = state["count"]
+        collector.inline = [CSVValidationError(**error) for error in state["inline"]]
+        collector._groups = {(group["column"], group["kind"]): group for group in state["groups"]}
+        collector.report_path = state.get("report_path")
+        if collector.report_path:
+            if not os.path.exists(collector.report_path):
+                raise ValueError("Error report of the interrupted import is no longer available")
+            with open(collector.report_path, "r+b") as report:
+                report.truncate(state["report_size"])
+            collector._report = gzip.open(collector.report_path, "at", encoding="utf-8", compresslevel=6)
+        return collector
+
+    def groups(self) -> List[Dict[str, Any]]:
+        """Error counters ordered by frequency"""
+        return sorted(self._groups.values(), key=lambda group: -group["count"])
+
+    def close(self) -> None:
+        if self._report is not None:
+            self._report.close()
+            self._report = None
+
+    def discard(self) -> None:
+        """Close and delete the report, used when the import is rolled back"""
+        self.close()
+        if self.report_path and os.path.exists(self.report_path):
+            os.remove(self.report_path)
+        self.report_path = None
+
+    def _open_report(self) -> None:
+        os.makedirs(self.report_dir, exist_ok=True)
+        self.report_path = os.path.join(self.report_dir, f"{uuid.uuid4().hex}.jsonl.gz")
+        self._report = gzip.open(self.report_path, "wt", encoding="utf-8", compresslevel=6)
+        # The report holds the full stream, inline errors included
+        for error in self.inline:
+            self._write(error)
+
+    def _write(self, error: CSVValidationError) -> None:
+        self._report.write(json.dumps(error.model_dump(), ensure_ascii=False))
+        self._report.write("\n")
+
+
+def read_error_report(
+    report_path: str,
+    offset: int = 0,
+    limit: int = 1000,
+) -> List[Dict[str, Any]]:
+    """Read one page of a gzip JSON-lines error report"""
+    if not os.path.exists(report_path):
+        raise ValueError("Error report is no longer available")
+
+    page: List[Dict[str, Any]] = []
+    with gzip.open(report_path, "rt", encoding="utf-8") as report:
+        for line_no, line in enumerate(report):
+            if line_no < offset:
+                continue
+            if len(page) >= limit:
+                break
+            page.append(json.loads(line))
+    return page
+
+
+def purge_expired_error_reports(db: Session) -> int:
+    """
+    Delete error reports not written to for IMPORT_ERROR_REPORT_TTL_SECONDS
+    and clear them from import_history, which keeps the inline errors.
+    Reports of imports that may still be resumed are kept. Files no history
+    row refers to (e.g. after a crash) are purged the same way. Returns the
+    number of reports deleted.
+    """
+    report_dir = settings.IMPORT_ERROR_REPORT_DIR
+    if not os.path.isdir(report_dir):
+        return 0
+
+    in_use = set()
+    resumable = db.query(ImportHistory.resume_state).filter(
+        ImportHistory.status.in_(("running", "interrupted")),
+        ImportHistory.resume_state.isnot(None),
+    )
+    for (resume_state,) in resumable:
+        report_path = (resume_state.get("errors") or {}).get("report_path")
+        if report_path:
+            in_use.add(os.path.abspath(report_path))
+
+    deadline = time.time() - settings.IMPORT_ERROR_REPORT_TTL_SECONDS
+    expired: List[str] = []
+    for entry in os.scandir(report_dir):
+        if not entry.name.endswith(".jsonl.gz") or os.path.abspath(entry.path) in in_use:
+            continue
+        try:
+            if entry.stat().st_mtime >= deadline:
+                continue
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+        expired.append(entry.path)
+
+    if expired:
+        db.query(ImportHistory).filter(ImportHistory.error_report_path.in_(expired)).update(
+            {"error_report_path": None}, synchronize_session=False
+        )
+        db.commit()
+    return len(expired)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import select
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import defer
+from app.config import settings
+from app.models import ImportJob, SessionLocal, engine
+from app.utils.import_queue import NOTIFY_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+_NOTIFY_RECHECK_SECONDS = 5.0  # with LISTEN/NOTIFY, watched jobs are still re-read this often
+
+
+def load_import_jobs(job_ids: List[str]) -> Dict[str, Optional[ImportJob]]:
+    """Detached rows of the given jobs, None for the ones that no longer exist"""
+    db = SessionLocal()
+    try:
+        jobs = db.query(ImportJob).options(defer(ImportJob.upload_data)).filter(ImportJob.id.in_(job_ids)).all()
+    finally:
+        db.close()
+    rows: Dict[str, Optional[ImportJob]] = dict.fromkeys(job_ids)
+    rows.update((job.id, job) for job in jobs)
+    return rows
+
+
+class _JobListener:
+    """A dedicated metadata DB connection LISTENing for job changes (PostgreSQL only)"""
+
+    def __init__(self):
+        connection = engine.raw_connection()
+        connection.detach()  # LISTEN must not leak into the pool
+        self._connection = connection.dbapi_connection
+        self._connection.autocommit = True
+        with self._connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+    def wait(self, timeout: float) -> None:
+        """Block until a job changes or timeout seconds pass"""
+        if select.select([self._connection], [], [], timeout)[0]:
+            self._connection.poll()
+            self._connection.notifies.clear()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class ImportJobWatcher:
+    """
+    One poller shared by all progress streams of the process. Every tick it
+    reads all watched jobs in a single query and wakes the streams. On
+    PostgreSQL a tick follows a NOTIFY from the job's runner (and a recheck
+    every few seconds); elsewhere ticks come every
+    IMPORT_PROGRESS_STREAM_INTERVAL seconds. Ticks are never closer than that
+    interval, and the poller only runs while a stream is open.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._watched: Dict[str, int] = {}
+        self._rows: Dict[str, Optional[ImportJob]] = {}
+        self._tick: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listener: Optional[_JobListener] = None
+
+    async def watch(self, job_id: str) -> AsyncIterator[Optional[ImportJob]]:
+        """The job's row right away and after every tick; None once it is gone"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Events and tasks belong to one loop (a new one per test client)
+            self._loop, self._tick, self._task, self._rows = loop, asyncio.Event(), None, {}
+        self._watched[job_id] = self._watched.get(job_id, 0) + 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            yield (await run_in_threadpool(load_import_jobs, [job_id]))[job_id]
+            while True:
+                tick = self._tick
+                await tick.wait()
+                if job_id in self._rows:
+                    yield self._rows[job_id]
+        finally:
+            self._watched[job_id] -= 1
+            if not self._watched[job_id]:
+                del self._watched[job_id]
+                self._rows.pop(job_id, None)
+
+    async def _run(self) -> None:
+        while self._watched:
+            started = self._loop.time()
+            try:
+                self._rows = await run_in_threadpool(load_import_jobs, list(self._watched))
+                tick, self._tick = self._tick, asyncio.Event()
+                tick.set()
+            except Exception:
+                logger.exception("Failed to read watched import jobs")
+            await self._wait_for_change()
+            elapsed = self._loop.time() - started
+            if elapsed < settings.IMPORT_PROGRESS_STREAM_INTERVAL:
+                await asyncio.sleep(settings.IMPORT_PROGRESS_STREAM_INTERVAL - elapsed)
+        self._close_listener()
+
+    async def _wait_for_change(self) -> None:
+        if engine.dialect.name != "postgresql":
+            return
+        try:
+            if self._listener is None:
+                self._listener = await run_in_threadpool(_JobListener)
+            await run_in_threadpool(self._listener.wait, _NOTIFY_RECHECK_SECONDS)
+        except Exception:
+            # Polling goes on at the stream interval until LISTEN works again
+            logger.exception("Failed to listen for import job changes")
+            self._close_listener()
+
+    def _close_listener(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            try:
+                listener.close()
+            except Exception:
+                pass
+
+
+import_job_watcher = ImportJobWatcher()
@@ -0,0 +1,350 @@
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import ImportJob, ImportHistory, SessionLocal
+from app.utils.import_staging import discard_retained_upload
+
+logger = logging.getLogger(__name__)
+
+_SCHEDULER_LOCK_KEY = 7210531  # pg advisory lock serialising claims
+_SCHEDULER_WINDOW = 200  # queued jobs considered per claim
+_DURATION_SAMPLE = 20  # finished jobs averaged for wait estimates
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+NOTIFY_CHANNEL = "import_jobs"  # PostgreSQL channel progress streams LISTEN on
+
+
+class ImportCancelled(Exception):
+    """Raised inside a running import once its job was asked to cancel"""
+
+
+class ImportBacklogFull(ValueError):
+    """The import queue (or the user's share of it) is full"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def notify_import_job_changed(db: Session, job_id: str) -> None:
+    """Wake the progress streams of a job once db commits (PostgreSQL only)"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, :job_id)"), {"channel": NOTIFY_CHANNEL, "job_id": job_id})
+
+
+def _average_job_seconds(db: Session) -> Optional[float]:
+    recent = (
+        db.query(ImportJob.started_at, ImportJob.finished_at)
+        .filter(ImportJob.status == "completed", ImportJob.started_at.isnot(None))
+        .order_by(ImportJob.finished_at.desc())
+        .limit(_DURATION_SAMPLE)
+        .all()
+    )
+    durations = [(finished - started).total_seconds() for started, finished in recent if finished]
+    return sum(durations) / len(durations) if durations else None
+
+
+def check_import_admission(db: Session, user_id: int) -> None:
+    """Reject a new async import up front when the backlog limits are reached"""
+    queued = db.query(func.count(ImportJob.id)).filter(ImportJob.status == "queued").scalar() or 0
+    user_queued = db.query(func.count(ImportJob.id)).filter(
+        ImportJob.status == "queued",
+        ImportJob.user_id == user_id,
+    ).scalar() or 0
+    if queued < settings.IMPORT_MAX_QUEUED_JOBS and user_queued < settings.IMPORT_MAX_QUEUED_JOBS_PER_USER:
+        return
+
+    retry_after = max(int(_average_job_seconds(db) or 60), 1)
+    if queued >= settings.IMPORT_MAX_QUEUED_JOBS:
+        raise ImportBacklogFull("Import queue is full, try again later", retry_after)
+    raise ImportBacklogFull(
+        f"Too many queued imports (limit {settings.IMPORT_MAX_QUEUED_JOBS_PER_USER}), wait for them to finish",
+        retry_after,
+    )
+
+
+def enqueue_import_job(
+    db: Session,
+    job_id: str,
+    user_id: int,
+    table_name: str,
+    file_name: str,
+    params: Dict[str, Any],
+    upload_path: Optional[str] = None,
+    upload_data: Optional[bytes] = None,
+    priority: int = 0,
+    connection_key: str = "primary",
+) -> ImportJob:
+    """Persist a queued import; the caller commits"""
+    job = ImportJob(
+        id=job_id,
+        user_id=user_id,
+        table_name=table_name,
+        file_name=file_name,
+        status="queued",
+        priority=priority,
+        connection_key=connection_key,
+        progress=0,
+        message="Задача поставлена в очередь",
+        params=params,
+        upload_path=upload_path,
+        upload_data=upload_data,
+    )
+    db.add(job)
+    return job
+
+
+def claim_import_job(db: Session, worker_id: str) -> Optional[ImportJob]:
+    """
+    Claim the next job the scheduler admits and mark it running for worker_id.
+    At most IMPORT_MAX_RUNNING_JOBS run at once, with per-user and per-connection
+    caps on top. Among the queued jobs that fit, the highest priority wins, then
+    the user with the fewest running jobs (fair share), then the oldest job.
+    On PostgreSQL claims are serialised with an advisory lock so the caps hold
+    across workers, and FOR UPDATE SKIP LOCKED skips rows other sessions hold;
+    the status-guarded UPDATE keeps the claim exclusive elsewhere.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SCHEDULER_LOCK_KEY})
+
+    running = db.query(ImportJob.user_id, ImportJob.connection_key).filter(ImportJob.status == "running").all()
+    if len(running) >= settings.IMPORT_MAX_RUNNING_JOBS:
+        db.rollback()
+        return None
+    running_by_user = Counter(user_id for user_id, _ in running)
+    running_by_connection = Counter(connection_key for _, connection_key in running)
+
+    queued = (
+        db.query(ImportJob.id, ImportJob.user_id, ImportJob.connection_key, ImportJob.priority, ImportJob.created_at)
+        .filter(ImportJob.status == "queued")
+        .order_by(ImportJob.priority.desc(), ImportJob.created_at, ImportJob.id)
+        .limit(_SCHEDULER_WINDOW)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    eligible = [
+        job for job in queued
+        if running_by_user[job.user_id] < settings.IMPORT_MAX_RUNNING_JOBS_PER_USER
+        and running_by_connection[job.connection_key] < settings.IMPORT_MAX_RUNNING_JOBS_PER_CONNECTION
+    ]
+    if not eligible:
+        db.rollback()
+        return None
+    candidate = min(
+        eligible,
+        key=lambda job: (-(job.priority or 0), running_by_user[job.user_id], job.created_at, job.id),
+    )
+
+    now = datetime.utcnow()
+    claimed = db.query(ImportJob).filter(
+        ImportJob.id == candidate.id,
+        ImportJob.status == "queued",
+    ).update({
+        "status": "running",
+        "progress": 5,
+        "message": "Запуск задачи",
+        "worker_id": worker_id,
+        "started_at": now,
+        "heartbeat_at": now,
+    }, synchronize_session=False)
+    if claimed:
+        notify_import_job_changed(db, candidate.id)
+    db.commit()
+    if not claimed:
+        return None
+    return db.query(ImportJob).filter(ImportJob.id == candidate.id).first()
+
+
+def get_queue_status(db: Session, job: ImportJob) -> Dict[str, Any]:
+    """
+    Position of a queued job (jobs scheduled before it) and a rough wait estimate
+    from recent job durations, assuming all IMPORT_MAX_RUNNING_JOBS slots are used.
+    """
+    position = db.query(func.count(ImportJob.id)).filter(
+        ImportJob.status == "queued",
+        (ImportJob.priority > job.priority)
+        | ((ImportJob.priority == job.priority) & (ImportJob.created_at < job.created_at)),
+    ).scalar() or 0
+    running = db.query(func.count(ImportJob.id)).filter(ImportJob.status == "running").scalar() or 0
+
+    average = _average_job_seconds(db)
+    estimated_wait = None
+    if average is not None:
+        waves = (running + position) // max(settings.IMPORT_MAX_RUNNING_JOBS, 1)
+        estimated_wait = int(average * waves)
+    return {"queue_position": position + 1, "estimated_wait_seconds": estimated_wait}
+
+
+def get_job_throughput(job: ImportJob) -> Dict[str, Any]:
+    """
+    Rows per second and a remaining time estimate of a running job as of its
+    last heartbeat, so they only change when the job reports progress.
+    Rows are loaded between 30% and 90% progress in proportion to bytes read.
+    """
+    if job.status != "running" or not job.started_at or not job.heartbeat_at:
+        return {"rows_per_second": None, "eta_seconds": None}
+    elapsed = (job.heartbeat_at - job.started_at).total_seconds()
+    rows_per_second = round(job.rows_processed / elapsed, 1) if job.rows_processed and elapsed > 0 else None
+
+    eta = None
+    loaded = ((job.progress or 0) - 30) / 60
+    if 0 < loaded < 1 and elapsed > 0:
+        eta = int(elapsed * (1 - loaded) / loaded)
+    return {"rows_per_second": rows_per_second, "eta_seconds": eta}
+
+
+def update_import_job(job_id: str, worker_id: Optional[str] = None, **fields: Any) -> bool:
+    """
+    Record job state from the process running it, in a session of its own so
+    the import's metadata transaction is not committed along with it.
+    With worker_id the update only applies while the job is still running on
+    that worker, so a job the reaper failed is not brought back. Returns
+    whether the job was updated.
+    """
+    fields["heartbeat_at"] = datetime.utcnow()
+    if fields.get("status") in FINISHED_STATUSES:
+        fields["finished_at"] = fields["heartbeat_at"]
+        fields["upload_data"] = None
+    db = SessionLocal()
+    try:
+        query = db.query(ImportJob).filter(ImportJob.id == job_id)
+        if worker_id is not None:
+            query = query.filter(ImportJob.status == "running", ImportJob.worker_id == worker_id)
+        updated = query.update(fields, synchronize_session=False)
+        if updated:
+            notify_import_job_changed(db, job_id)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def start_import_job_heartbeat(job_id: str, worker_id: Optional[str]) -> Callable[[], None]:
+    """
+    Refresh the heartbeat of a running job from a background thread every
+    IMPORT_JOB_HEARTBEAT_SECONDS, so steps that report no progress for long
+    (snapshots, merges, index builds, lock waits) are not taken for a dead
+    worker. Returns the function that stops it.
+    """
+    stopped = threading.Event()
+
+    def beat() -> None:
+        while not stopped.wait(settings.IMPORT_JOB_HEARTBEAT_SECONDS):
+            try:
+                update_import_job(job_id, worker_id)
+            except Exception:
+                logger.exception("Failed to record the heartbeat of import job %s", job_id)
+
+    thread = threading.Thread(target=beat, name=f"import-heartbeat-{job_id}", daemon=True)
+    thread.start()
+
+    def stop() -> None:
+        stopped.set()
+        thread.join()
+
+    return stop
+
+
+def reap_stale_import_jobs(db: Session) -> int:
+    """
+    Fail running jobs whose worker stopped sending heartbeats (killed or
+    restarted). Resumable imports are marked interrupted so they can be resumed;
+    staged uploads of the others are removed. Returns the number of jobs failed.
+    """
+    deadline = datetime.utcnow() - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    stale_jobs = db.query(ImportJob).filter(
+        ImportJob.status == "running",
+        ImportJob.heartbeat_at < deadline,
+    ).all()
+    for job in stale_jobs:
+        job.status = "failed"
+        job.message = "Import worker stopped responding"
+        job.finished_at = datetime.utcnow()
+        job.upload_data = None
+        if (job.params.get("options") or {}).get("resumable"):
+            db.query(ImportHistory).filter(
+                ImportHistory.upload_path == job.upload_path,
+                ImportHistory.status == "running",
+            ).update({"status": "interrupted"}, synchronize_session=False)
+        else:
+            discard_retained_upload(job.upload_path)
+        notify_import_job_changed(db, job.id)
+    if stale_jobs:
+        db.commit()
+    return len(stale_jobs)
+
+
+def cancel_import_job(db: Session, job: ImportJob) -> str:
+    """
+    Cancel a queued job right away, or flag a running one so its import stops
+    at the next batch and rolls back. Returns the job's status afterwards;
+    finished jobs are left as they are.
+    """
+    now = datetime.utcnow()
+    cancelled = db.query(ImportJob).filter(
+        ImportJob.id == job.id,
+        ImportJob.status == "queued",
+    ).update({
+        "status": "cancelled",
+        "message": "Импорт отменён",
+        "finished_at": now,
+        "upload_data": None,
+    }, synchronize_session=False)
+    if cancelled:
+        resume_history_id = job.params.get("resume_history_id")
+        if resume_history_id:
+            # The resume claimed the import, hand it back
+            db.query(ImportHistory).filter(
+                ImportHistory.id == resume_history_id,
+                ImportHistory.status == "running",
+            ).update({"status": "interrupted"}, synchronize_session=False)
+        elif job.upload_path:
+            discard_retained_upload(job.upload_path)
+        notify_import_job_changed(db, job.id)
+        db.commit()
+        return "cancelled"
+
+    flagged = db.query(ImportJob).filter(
+        ImportJob.id == job.id,
+        ImportJob.status == "running",
+    ).update({"cancel_requested": 1}, synchronize_session=False)
+    if flagged:
+        notify_import_job_changed(db, job.id)
+    db.commit()
+    db.refresh(job)
+    return "running" if flagged else job.status
+
+
+def is_import_job_cancel_requested(job_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        return bool(db.query(ImportJob.cancel_requested).filter(ImportJob.id == job_id).scalar())
+    finally:
+        db.close()
+
+
+def purge_finished_import_jobs(db: Session) -> int:
+    """
+    Delete finished jobs older than IMPORT_JOB_TTL_SECONDS and all but the
+    IMPORT_JOB_MAX_FINISHED most recently finished ones. Import results stay
+    in import_history. Returns the number of jobs deleted.
+    """
+    finished = db.query(ImportJob).filter(ImportJob.status.in_(FINISHED_STATUSES))
+    deadline = datetime.utcnow() - timedelta(seconds=settings.IMPORT_JOB_TTL_SECONDS)
+    deleted = finished.filter(ImportJob.finished_at < deadline).delete(synchronize_session=False)
+
+    oldest_kept = (
+        finished.with_entities(ImportJob.finished_at)
+        .order_by(ImportJob.finished_at.desc())
+        .offset(settings.IMPORT_JOB_MAX_FINISHED)
+        .limit(1)
+        .scalar()
+    )
+    if oldest_kept is not None:
+        deleted += finished.filter(ImportJob.finished_at <= oldest_kept).delete(synchronize_session=False)
+    db.commit()
+    return deleted
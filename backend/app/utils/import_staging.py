@@ -0,0 +1,156 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+from fastapi import UploadFile
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows, reservations are then only serialised within the process
+    fcntl = None
+
+_UPLOAD_SUFFIX = ".upload"
+_LOCK_FILE = ".quota.lock"
+_RESERVATION_STEP = 16 * 1024 * 1024  # quota reserved by an upload at a time
+_process_lock = threading.Lock()
+
+
+class StagingQuotaExceeded(ValueError):
+    """Staging the upload would take IMPORT_STAGING_DIR over IMPORT_STAGING_QUOTA_BYTES"""
+
+
+def new_content_hash() -> Any:
+    return hashlib.sha256()
+
+
+def hash_stream(stream: BinaryIO) -> str:
+    """Hash the rest of a seekable stream chunk by chunk and rewind it"""
+    position = stream.tell()
+    digest = new_content_hash()
+    while True:
+        chunk = stream.read(settings.IMPORT_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    stream.seek(position)
+    return digest.hexdigest()
+
+
+def purge_expired_uploads(max_age: Optional[int] = None) -> int:
+    """
+    Delete staged uploads older than max_age seconds (IMPORT_STAGING_TTL_SECONDS).
+    Files still open by a running job stay readable until it closes them;
+    an interrupted import whose upload expired can no longer be resumed.
+    Returns the number of bytes still staged.
+    """
+    max_age = settings.IMPORT_STAGING_TTL_SECONDS if max_age is None else max_age
+    if not os.path.isdir(settings.IMPORT_STAGING_DIR):
+        return 0
+
+    deadline = time.time() - max_age
+    usage = 0
+    with os.scandir(settings.IMPORT_STAGING_DIR) as entries:
+        for entry in entries:
+            if not entry.name.endswith(_UPLOAD_SUFFIX) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+                if stat.st_mtime < deadline:
+                    os.remove(entry.path)
+                else:
+                    usage += stat.st_size
+            except FileNotFoundError:
+                continue  # removed concurrently
+    return usage
+
+
+@contextmanager
+def _staging_lock() -> Iterator[None]:
+    """Serialise quota reservations of all processes sharing IMPORT_STAGING_DIR"""
+    with _process_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(settings.IMPORT_STAGING_DIR, _LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _reserve(retained: BinaryIO, reserved: int, needed: int) -> int:
+    """
+    Grow the reservation of a staged upload to at least needed bytes and
+    return its new size. The reservation is the size of the file itself,
+    extended ahead of the data, so uploads being written concurrently count
+    against the quota with everything they may still write.
+    """
+    with _staging_lock():
+        available = settings.IMPORT_STAGING_QUOTA_BYTES - purge_expired_uploads() + reserved
+        if needed > available:
+            raise StagingQuotaExceeded("Import staging area is full, try again later")
+        reserved = min(max(needed, reserved + _RESERVATION_STEP), available)
+        retained.truncate(reserved)
+    return reserved
+
+
+async def _write_staged(file: UploadFile, head: bytes, digest: Optional[Any]) -> str:
+    os.makedirs(settings.IMPORT_STAGING_DIR, exist_ok=True)
+    path = os.path.join(settings.IMPORT_STAGING_DIR, f"{uuid.uuid4().hex}{_UPLOAD_SUFFIX}")
+    written = reserved = 0
+    try:
+        with open(path, "wb") as retained:
+            chunk = head
+            while chunk:
+                if written + len(chunk) > reserved:
+                    reserved = _reserve(retained, reserved, written + len(chunk))
+                retained.write(chunk)
+                written += len(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+                chunk = await file.read(settings.IMPORT_READ_CHUNK_SIZE)
+            # Give back the part of the reservation the upload did not use
+            retained.truncate(written)
+        return path
+    except Exception:
+        discard_retained_upload(path)
+        raise
+
+
+async def retain_upload(file: UploadFile, digest: Optional[Any] = None) -> str:
+    """
+    Copy an upload into IMPORT_STAGING_DIR and return its path.
+    Retained uploads outlive the request so an interrupted import can be resumed.
+    digest, when given, is updated with the copied chunks.
+    """
+    return await _write_staged(file, await file.read(settings.IMPORT_READ_CHUNK_SIZE), digest)
+
+
+async def stage_upload(file: UploadFile, digest: Optional[Any] = None) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Stage an upload for a background job: (content, None) when it fits
+    IMPORT_STAGING_MEMORY_LIMIT, otherwise (None, path in IMPORT_STAGING_DIR)
+    so the queued job holds no more than a path.
+    """
+    head = await file.read(settings.IMPORT_STAGING_MEMORY_LIMIT + 1)
+    if len(head) <= settings.IMPORT_STAGING_MEMORY_LIMIT:
+        if digest is not None:
+            digest.update(head)
+        return head, None
+    return None, await _write_staged(file, head, digest)
+
+
+def open_retained_upload(path: str) -> BinaryIO:
+    if not path or not os.path.exists(path):
+        raise ValueError("Retained upload is no longer available")
+    return open(path, "rb")
+
+
+def discard_retained_upload(path: str) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
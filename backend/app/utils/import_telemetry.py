@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+T = TypeVar("T")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def max_rss() -> Optional[int]:
+    """Lifetime peak resident set size of this process in bytes"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, the lifetime peak where the current one is unknown"""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    return max_rss()
+
+
+class ImportTelemetry:
+    """
+    Wall time, rows, bytes and resident memory per import stage.
+    Time is charged to the innermost open stage only, so a stage that pulls
+    from another (validate pulling parsed batches) reports its own time.
+    Memory is the peak process RSS while a stage was open: when the lifetime
+    peak (ru_maxrss) rose during the stage that is its peak, otherwise the
+    larger of the RSS sampled when the stage was entered and left. Validation
+    running in a process pool is not included.
+    """
+
+    def __init__(self, stages: Optional[List[Dict[str, Any]]] = None):
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        for stage in stages or []:
+            self._stages[stage["name"]] = {
+                "seconds": stage.get("seconds") or 0.0,
+                "rows": stage.get("rows"),
+                "bytes": stage.get("bytes"),
+                "peak_rss_bytes": stage.get("peak_rss_bytes"),
+            }
+        self._earlier_seconds = sum(stage["seconds"] for stage in self._stages.values())
+        self._started = time.perf_counter()
+        self._mark = self._started
+        self._open: List[str] = []
+        self._open_rss: List[Any] = []  # (max_rss, current_rss) when each open stage was entered
+
+    def _get(self, name: str) -> Dict[str, Any]:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = {"seconds": 0.0, "rows": None, "bytes": None, "peak_rss_bytes": None}
+            self._stages[name] = stage
+        return stage
+
+    def _charge(self) -> None:
+        now = time.perf_counter()
+        if self._open:
+            self._stages[self._open[-1]]["seconds"] += now - self._mark
+        self._mark = now
+
+    def _enter(self, name: str) -> None:
+        self._get(name)
+        self._charge()
+        self._open.append(name)
+        self._open_rss.append((max_rss(), current_rss()))
+
+    def _exit(self) -> None:
+        self._charge()
+        stage = self._stages[self._open.pop()]
+        entered_max, entered_rss = self._open_rss.pop()
+        peak = max_rss()
+        if peak is None or entered_max is None or peak <= entered_max:
+            # The lifetime peak was reached before the stage, only its samples are known
+            samples = [rss for rss in (entered_rss, current_rss()) if rss is not None]
+            peak = max(samples) if samples else None
+        if peak is not None and (stage["peak_rss_bytes"] is None or peak > stage["peak_rss_bytes"]):
+            stage["peak_rss_bytes"] = peak
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from iterable, charging the time spent producing each item to name"""
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def record(self, name: str, rows: Optional[int] = None, bytes_read: Optional[int] = None) -> None:
+        """Set the rows and bytes a stage has handled so far"""
+        stage = self._get(name)
+        if rows is not None:
+            stage["rows"] = rows
+        if bytes_read is not None:
+            stage["bytes"] = bytes_read
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable state, in the order stages were first entered"""
+        self._charge()
+        stages = []
+        for name, stage in self._stages.items():
+            seconds = stage["seconds"]
+            stages.append({
+                "name": name,
+                "seconds": round(seconds, 3),
+                "rows": stage["rows"],
+                "bytes": stage["bytes"],
+                "rows_per_second": round(stage["rows"] / seconds, 1) if stage["rows"] and seconds > 0 else None,
+                "bytes_per_second": round(stage["bytes"] / seconds) if stage["bytes"] and seconds > 0 else None,
+                "peak_rss_bytes": stage["peak_rss_bytes"],
+            })
+        peaks = [stage["peak_rss_bytes"] for stage in self._stages.values() if stage["peak_rss_bytes"]]
+        return {
+            "total_seconds": round(self._earlier_seconds + time.perf_counter() - self._started, 3),
+            "current_stage": self._open[-1] if self._open else None,
+            "peak_rss_bytes": max(peaks) if peaks else None,
+            "stages": stages,
+        }
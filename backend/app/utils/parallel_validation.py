@@ -0,0 +1,73 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.schemas.schemas import CSVValidationError
+from app.utils.csv_handler import ValidationPlan, validate_rows
+
+# (first row number, rows in chunk, valid rows, errors)
+ValidatedChunk = Tuple[int, int, List[Any], List[CSVValidationError]]
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_validation_executor() -> Optional[ProcessPoolExecutor]:
+    """Shared process pool for validation, None when IMPORT_VALIDATION_WORKERS <= 1"""
+    global _executor
+    if settings.IMPORT_VALIDATION_WORKERS <= 1:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded web worker can deadlock on inherited locks
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMPORT_VALIDATION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _iter_chunks(
+    batches: Iterable[Tuple[int, List[Any]]],
+    chunk_size: int,
+) -> Iterator[Tuple[int, List[Any]]]:
+    for start_row, rows in batches:
+        for offset in range(0, len(rows), chunk_size):
+            yield start_row + offset, rows[offset:offset + chunk_size]
+
+
+def validate_batches(
+    batches: Iterable[Tuple[int, List[Any]]],
+    plan: ValidationPlan,
+    validate_batch: Callable[..., Tuple[List[Any], List[CSVValidationError]]] = validate_rows,
+) -> Iterator[ValidatedChunk]:
+    """
+    Validate (first row number, rows) batches, in a process pool when configured.
+    Chunks keep their original row offsets and results are yielded in file order,
+    so CSVValidationError.row numbers match the sequential path. At most two
+    chunks per worker are in flight to keep memory bounded.
+    """
+    executor = get_validation_executor()
+    if executor is None:
+        for start_row, rows in batches:
+            valid_rows, errors = validate_batch(rows, plan, start_row=start_row)
+            yield start_row, len(rows), valid_rows, errors
+        return
+
+    max_in_flight = settings.IMPORT_VALIDATION_WORKERS * 2
+    pending: Deque[Tuple[int, int, Future]] = deque()
+    try:
+        for start_row, rows in _iter_chunks(batches, settings.IMPORT_VALIDATION_CHUNK_SIZE):
+            pending.append((start_row, len(rows), executor.submit(validate_batch, rows, plan, start_row=start_row)))
+            if len(pending) >= max_in_flight:
+                chunk_start, row_count, future = pending.popleft()
+                yield (chunk_start, row_count, *future.result())
+        while pending:
+            chunk_start, row_count, future = pending.popleft()
+            yield (chunk_start, row_count, *future.result())
+    finally:
+        for _, _, future in pending:
+            future.cancel()
@@ -0,0 +1,174 @@
+import json
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, snapshots are zlib-compressed without it
+    zstandard = None
+
+SNAPSHOT_MAGIC = b"TVS1"
+_CODECS = {"zlib": 1, "zstd": 2}
+_CODEC_NAMES = {code: name for name, code in _CODECS.items()}
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _column_type(values: List[Any]) -> str:
+    """i (int64), f (float64), b (bool) or s (text) for a column's non-null values"""
+    kinds = {type(value) for value in values if value is not None}
+    if kinds == {bool}:
+        return "b"
+    if kinds == {int} and all(_INT64_MIN <= value <= _INT64_MAX for value in values if value is not None):
+        return "i"
+    if kinds == {float}:
+        return "f"
+    return "s"
+
+
+def _bytea_text(value: Any) -> str:
+    return "\\x" + bytes(value).hex()  # bytea input format
+
+
+def _text_converter(values: List[Any]) -> Any:
+    kinds = {type(value) for value in values if value is not None}
+    if kinds <= {str}:
+        return None
+    if kinds <= {bytes, memoryview}:
+        return _bytea_text
+    return str
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_column(values: List[Any], column_type: str) -> bytes:
+    nulls = bytes([value is None for value in values])
+    if column_type == "i":
+        data = _little_endian(array("q", (0 if value is None else value for value in values)))
+    elif column_type == "f":
+        data = _little_endian(array("d", (0.0 if value is None else value for value in values)))
+    elif column_type == "b":
+        data = bytes(bool(value) for value in values)
+    else:
+        convert = _text_converter(values)
+        if convert is not None:
+            values = [None if value is None else convert(value) for value in values]
+        encoded = [b"" if value is None else value.encode("utf-8") for value in values]
+        data = _little_endian(array("I", map(len, encoded))) + b"".join(encoded)
+    return nulls + data
+
+
+def _decode_column(payload: memoryview, offset: int, row_count: int, column_type: str) -> Tuple[List[Any], int]:
+    nulls = payload[offset:offset + row_count]
+    offset += row_count
+    if column_type in ("i", "f"):
+        typecode = "q" if column_type == "i" else "d"
+        size = row_count * 8
+        values = _from_little_endian(typecode, payload[offset:offset + size]).tolist()
+        offset += size
+    elif column_type == "b":
+        values = [bool(flag) for flag in payload[offset:offset + row_count]]
+        offset += row_count
+    else:
+        lengths = _from_little_endian("I", payload[offset:offset + row_count * 4])
+        offset += row_count * 4
+        values = []
+        for length in lengths:
+            values.append(str(payload[offset:offset + length], "utf-8"))
+            offset += length
+    return [None if null else value for null, value in zip(nulls, values)], offset
+
+
+def _codec(codec: Optional[str]) -> str:
+    codec = codec or settings.TABLE_VERSION_SNAPSHOT_CODEC
+    if codec == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if codec not in _CODECS:
+        raise ValueError(f"Unknown snapshot codec '{codec}'")
+    if codec == "zstd" and zstandard is None:
+        raise ValueError("The zstd snapshot codec requires zstandard to be installed")
+    return codec
+
+
+def encode_snapshot(
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    codec: Optional[str] = None,
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Encode table rows (value sequences in column order) column by column:
+    a JSON header with the column names and types, then per column a null
+    map and the values as int64/float64/bool arrays or length-prefixed UTF-8.
+    Values without an exact binary type (Decimal, dates, ...) are stored as
+    their text form, which the database parses back on restore.
+    Returns the compressed blob and its stats (rows, raw and stored bytes).
+    """
+    codec = _codec(codec)
+    rows = rows if isinstance(rows, list) else list(rows)
+    row_count = len(rows)
+    column_values: List[List[Any]] = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+
+    column_types = [_column_type(values) for values in column_values]
+    header = json.dumps({
+        "columns": list(columns),
+        "types": column_types,
+        "rows": row_count,
+    }).encode("utf-8")
+    raw = b"".join(
+        [struct.pack("<I", len(header)), header]
+        + [_encode_column(values, column_type) for values, column_type in zip(column_values, column_types)]
+    )
+
+    if codec == "zstd":
+        compressed = zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        compressed = zlib.compress(raw, 3)
+    blob = SNAPSHOT_MAGIC + bytes([_CODECS[codec]]) + compressed
+    return blob, {"codec": codec, "rows": row_count, "raw_bytes": len(raw), "stored_bytes": len(blob)}
+
+
+def decode_snapshot(blob: bytes) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Column names and row dicts of an encode_snapshot blob"""
+    blob = bytes(blob)
+    if not blob.startswith(SNAPSHOT_MAGIC) or len(blob) <= len(SNAPSHOT_MAGIC):
+        raise ValueError("Not a table snapshot")
+    codec = _CODEC_NAMES.get(blob[len(SNAPSHOT_MAGIC)])
+    compressed = blob[len(SNAPSHOT_MAGIC) + 1:]
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("The snapshot is zstd-compressed and zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(compressed)
+    elif codec == "zlib":
+        raw = zlib.decompress(compressed)
+    else:
+        raise ValueError("Unknown snapshot codec")
+
+    payload = memoryview(raw)
+    header_size = struct.unpack_from("<I", payload)[0]
+    header = json.loads(bytes(payload[4:4 + header_size]))
+    offset = 4 + header_size
+    column_values = []
+    for column_type in header["types"]:
+        values, offset = _decode_column(payload, offset, header["rows"], column_type)
+        column_values.append(values)
+
+    columns = header["columns"]
+    if not columns:
+        return columns, [{} for _ in range(header["rows"])]
+    return columns, [dict(zip(columns, values)) for values in zip(*column_values)]
@@ -0,0 +1,201 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import DatabaseConnection, SessionLocal, TableVersion, TableVersionPolicy
+from app.utils.connection_manager import get_connection_sessionmaker
+from app.utils.db_manager import drop_version_tables
+
+logger = logging.getLogger(__name__)
+
+_COMPACTION_LOCK_KEY = 7210532  # pg advisory lock serialising compaction batches
+_BASE_KINDS = ("snapshot", "table", "archive")
+_TABLE_KINDS = ("table", "archive")  # versions whose snapshot is a table in the data database
+POLICY_FIELDS = ("keep_last", "keep_days", "keep_daily_days", "keep_weekly_weeks")
+
+
+def get_retention_policy(db: Session, table_name: str) -> Dict[str, int]:
+    """The table's retention limits, settings defaults for the ones it does not set"""
+    policy = db.query(TableVersionPolicy).filter(TableVersionPolicy.table_name == table_name).first()
+    limits = {field: getattr(settings, f"TABLE_VERSION_{field.upper()}") for field in POLICY_FIELDS}
+    if policy is not None:
+        for field in POLICY_FIELDS:
+            if getattr(policy, field) is not None:
+                limits[field] = getattr(policy, field)
+    return limits
+
+
+def select_expired_versions(
+    versions: Sequence[Tuple[int, str, datetime]],
+    policy: Dict[str, int],
+    now: Optional[datetime] = None,
+) -> List[int]:
+    """
+    Ids of the (id, kind, created_at) versions of one table the policy no
+    longer keeps. Kept are the keep_last newest versions, every version
+    younger than keep_days, then the newest one per day up to keep_daily_days
+    and per ISO week up to keep_weekly_weeks. Rolling back to a delta undoes
+    every later delta on top of the next full version, so a kept delta or
+    marker keeps that whole chain as well.
+    """
+    now = now or datetime.utcnow()
+    versions = sorted(versions)
+    kept: Set[int] = set()
+    if policy["keep_last"] > 0:
+        kept.update(version_id for version_id, _, _ in versions[-policy["keep_last"]:])
+
+    recent = now - timedelta(days=policy["keep_days"])
+    daily = now - timedelta(days=max(policy["keep_daily_days"], policy["keep_days"]))
+    weekly = now - timedelta(weeks=policy["keep_weekly_weeks"])
+    buckets: Dict[Tuple[str, Any], int] = {}
+    for version_id, _, created_at in versions:
+        created_at = created_at or now
+        if created_at >= recent:
+            kept.add(version_id)
+        elif created_at >= daily:
+            buckets[("day", created_at.date())] = version_id  # ascending, the newest one wins
+        elif created_at >= weekly:
+            buckets[("week", created_at.isocalendar()[:2])] = version_id
+    kept.update(buckets.values())
+
+    needs_chain = False
+    for version_id, kind, _ in versions:
+        if kind in _BASE_KINDS:
+            if needs_chain:
+                kept.add(version_id)
+            needs_chain = False
+        elif needs_chain:
+            kept.add(version_id)
+        elif version_id in kept:
+            needs_chain = True
+    return [version_id for version_id, _, _ in versions if version_id not in kept]
+
+
+def _drop_snapshot_tables(db: Session, connection_id: Optional[int], table_names: List[str]) -> bool:
+    """Drop version tables in their data database; False when its connection no longer exists"""
+    if connection_id is None:
+        # The primary data database is the metadata one, the drop commits with the deletes
+        drop_version_tables(db, table_names)
+        return True
+    connection = db.query(DatabaseConnection).filter(DatabaseConnection.id == connection_id).first()
+    if connection is None:
+        return False
+    data_db = get_connection_sessionmaker(connection.connection_url)()
+    try:
+        drop_version_tables(data_db, table_names)
+        data_db.commit()
+    finally:
+        data_db.close()
+    return True
+
+
+def _delete_versions(db: Session, version_ids: List[int], report: Dict[str, Any]) -> int:
+    """
+    Delete a batch of versions and drop their tables. Versions whose tables
+    are on a data connection that no longer exists are kept, as the only
+    record of those tables; returns how many were kept.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _COMPACTION_LOCK_KEY})
+    # Versions another compaction deleted in the meantime are no longer found
+    sizes = db.query(TableVersion.id, TableVersion.byte_size).filter(TableVersion.id.in_(version_ids)).all()
+    if not sizes:
+        db.rollback()
+        return 0
+
+    tables_by_connection: Dict[Optional[int], List[Tuple[int, str]]] = {}
+    for version_id, connection_id, version_data in db.query(
+        TableVersion.id, TableVersion.connection_id, TableVersion.version_data
+    ).filter(
+        TableVersion.id.in_(version_ids),
+        TableVersion.kind.in_(_TABLE_KINDS),
+    ):
+        table_name = (version_data or {}).get("snapshot_table") or (version_data or {}).get("archive_table")
+        if table_name:
+            tables_by_connection.setdefault(connection_id, []).append((version_id, table_name))
+    # Tables go first: if the deletes then fail, the next run drops them again with IF EXISTS
+    kept: Set[int] = set()
+    dropped_tables = 0
+    for connection_id, version_tables in tables_by_connection.items():
+        if _drop_snapshot_tables(db, connection_id, [table_name for _, table_name in version_tables]):
+            dropped_tables += len(version_tables)
+        else:
+            kept.update(version_id for version_id, _ in version_tables)
+
+    deleted = [(version_id, byte_size) for version_id, byte_size in sizes if version_id not in kept]
+    if deleted:
+        db.query(TableVersion).filter(TableVersion.id.in_([version_id for version_id, _ in deleted])).delete(
+            synchronize_session=False
+        )
+    db.commit()
+    report["deleted_versions"] += len(deleted)
+    report["dropped_tables"] += dropped_tables
+    report["reclaimed_bytes"] += sum(byte_size or 0 for _, byte_size in deleted)
+    return len(kept)
+
+
+def compact_table_versions(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Delete the versions the retention policies no longer keep, in batches of
+    TABLE_VERSION_COMPACTION_BATCH with a commit after each, so no transaction
+    holds many locks or leaves a large burst of dead rows for vacuum. Snapshot
+    and archive tables of deleted versions are dropped in their data database.
+    Returns the number of tables compacted, versions deleted, tables dropped
+    and bytes reclaimed (the stored size of the deleted versions), and the
+    tables that failed, including those with versions kept because their
+    data connection is gone.
+    """
+    report: Dict[str, Any] = {
+        "tables": 0,
+        "deleted_versions": 0,
+        "dropped_tables": 0,
+        "reclaimed_bytes": 0,
+        "failed_tables": [],
+    }
+    batch_size = max(settings.TABLE_VERSION_COMPACTION_BATCH, 1)
+    table_names = [table_name for (table_name,) in db.query(TableVersion.table_name).distinct().all()]
+    for table_name in table_names:
+        versions = db.query(TableVersion.id, TableVersion.kind, TableVersion.created_at).filter(
+            TableVersion.table_name == table_name,
+        ).all()
+        expired = select_expired_versions(versions, get_retention_policy(db, table_name), now)
+        db.rollback()
+        if not expired:
+            continue
+        report["tables"] += 1
+        try:
+            kept = 0
+            for start in range(0, len(expired), batch_size):
+                kept += _delete_versions(db, expired[start:start + batch_size], report)
+            if kept:
+                logger.warning(
+                    "Kept %d expired versions of table %s, their data connection no longer exists",
+                    kept,
+                    table_name,
+                )
+                report["failed_tables"].append(table_name)
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to compact versions of table %s", table_name)
+            report["failed_tables"].append(table_name)
+    return report
+
+
+def run_version_compaction() -> Dict[str, Any]:
+    """compact_table_versions in a session of its own, for the background runners"""
+    db = SessionLocal()
+    try:
+        report = compact_table_versions(db)
+    finally:
+        db.close()
+    if report["deleted_versions"] or report["failed_tables"]:
+        logger.info(
+            "Compacted table versions: %d deleted from %d tables, %d snapshot tables dropped, %d bytes reclaimed",
+            report["deleted_versions"],
+            report["tables"],
+            report["dropped_tables"],
+            report["reclaimed_bytes"],
+        )
+    return report
@@ -0,0 +1,84 @@
+"""
+Import worker: runs queued background imports outside the web process.
+
+    python -m app.worker
+
+Start as many as needed; each claims one job at a time from the import_jobs
+table of the metadata DB. Set IMPORT_JOB_RUNNER=worker for the web process so
+it only queues jobs. Workers also run the periodic table version compaction.
+"""
+import logging
+import os
+import signal
+import socket
+import time
+from app.config import settings
+from app.models import SessionLocal
+from app.routes.tables import run_import_job
+from app.utils.import_errors import purge_expired_error_reports
+from app.utils.import_queue import claim_import_job, reap_stale_import_jobs, purge_finished_import_jobs
+from app.utils.version_retention import run_version_compaction
+
+logger = logging.getLogger("app.worker")
+
+_PURGE_INTERVAL = 60  # seconds between sweeps of expired finished jobs and error reports
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = False
+
+    def stop(signum, frame) -> None:
+        # Finish the current job, then exit
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("Import worker %s started", worker_id)
+    last_purge = 0.0
+    last_compaction = None
+
+    while not stopping:
+        db = SessionLocal()
+        try:
+            reap_stale_import_jobs(db)
+            if time.monotonic() - last_purge >= _PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                purged = purge_finished_import_jobs(db)
+                if purged:
+                    logger.info("Purged %d finished import jobs", purged)
+                purged = purge_expired_error_reports(db)
+                if purged:
+                    logger.info("Purged %d expired error reports", purged)
+            job = claim_import_job(db, worker_id)
+            job_id = job.id if job is not None else None
+        except Exception:
+            logger.exception("Failed to claim an import job")
+            job_id = None
+        finally:
+            db.close()
+
+        compaction_interval = settings.TABLE_VERSION_COMPACTION_INTERVAL_SECONDS
+        if compaction_interval > 0 and (
+            last_compaction is None or time.monotonic() - last_compaction >= compaction_interval
+        ):
+            last_compaction = time.monotonic()
+            try:
+                run_version_compaction()
+            except Exception:
+                logger.exception("Failed to compact table versions")
+
+        if job_id is None:
+            time.sleep(settings.IMPORT_WORKER_POLL_SECONDS)
+            continue
+
+        logger.info("Running import job %s", job_id)
+        run_import_job(job_id)
+
+    logger.info("Import worker %s stopped", worker_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+# The app reads its settings at import time; keep the tests off any real database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def api():
+    """A test client with an admin token and an empty `people` table in the primary database"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models import Base, SessionLocal, User, engine
+    from app.utils.auth import create_access_token, hash_password
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.execute(text("DROP TABLE IF EXISTS people"))
+        db.execute(text("CREATE TABLE people (id INTEGER PRIMARY KEY, name VARCHAR(50), age INTEGER)"))
+        db.add(User(username="admin", email="admin@example.com", hashed_password=hash_password("secret"), role="admin"))
+        db.commit()
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    client.headers["Authorization"] = "Bearer " + create_access_token({"sub": "admin"})
+    return client
@@ -0,0 +1,23 @@
+import gzip
+import io
+import os
+from app.utils.compressed_input import open_decompressed
+
+
+def test_gzip_size_comes_from_the_trailer():
+    data = b"name,age\n" + b"Anna,30\n" * 1000
+
+    source, compression, size = open_decompressed(io.BytesIO(gzip.compress(data)))
+
+    assert compression == "gzip"
+    assert size == len(data)
+    assert source.read() == data
+
+
+def test_gzip_size_is_unknown_when_it_could_exceed_4_gb():
+    # Large enough for the trailer's size modulo 2**32 to be ambiguous
+    upload = gzip.compress(os.urandom(4200 * 1024), compresslevel=1)
+
+    _, _, size = open_decompressed(io.BytesIO(upload))
+
+    assert size is None
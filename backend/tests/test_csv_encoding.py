@@ -0,0 +1,57 @@
+import io
+import json
+import pytest
+from sqlalchemy import text
+from app.models import SessionLocal
+from app.utils.csv_handler import SAMPLE_SIZE, preview_csv, read_csv_stream
+
+ASCII_ROWS = b"".join(b"Anna%06d,30\n" % index for index in range(SAMPLE_SIZE // 8))
+LATE_CP1251 = b"name,age\n" + ASCII_ROWS + "Иван,41\n".encode("cp1251")
+
+
+def test_non_ascii_after_ascii_sample_falls_back_to_single_byte():
+    assert len(ASCII_ROWS) > SAMPLE_SIZE
+    headers, batches = read_csv_stream(io.BytesIO(LATE_CP1251), batch_size=100000)
+
+    rows = [row for _, batch in batches for row in batch]
+
+    assert headers == ["name", "age"]
+    assert rows[-1] == ["Иван", "41"]
+    assert rows[0] == ["Anna000000", "30"]
+
+
+def test_import_with_late_cp1251_rows(api):
+    response = api.post(
+        "/api/tables/import-csv",
+        files={"file": ("people.csv", LATE_CP1251)},
+        data={"table_name": "people", "request": json.dumps({"table_name": "people"})},
+    )
+    assert response.status_code == 200, response.text
+
+    db = SessionLocal()
+    try:
+        last = db.execute(text("SELECT name FROM people ORDER BY id DESC LIMIT 1")).scalar()
+    finally:
+        db.close()
+    assert last == "Иван"
+
+
+def test_corrupt_byte_in_utf8_after_ascii_sample_fails():
+    data = b"name,age\n" + ASCII_ROWS + b"Ann\xffa,30\n" + "Иван,41\n".encode("utf-8")
+    headers, batches = read_csv_stream(io.BytesIO(data), batch_size=100000)
+
+    with pytest.raises(ValueError, match="Failed to decode"):
+        list(batches)
+
+
+def test_preview_counts_rows_after_a_fallback_in_the_new_encoding():
+    # Rows of equal size in cp1251, so the estimate is exact when bytes are counted right
+    rows = 9000
+    cyrillic = b"".join("Иван%06d,41\n".encode("cp1251") % index for index in range(rows - 8000))
+    data = b"name,age\n" + ASCII_ROWS[:8000 * 14] + cyrillic
+
+    preview = preview_csv(io.BytesIO(data), preview_limit=8500, total_bytes=len(data))
+
+    assert preview["encoding"] == "cp1251"
+    assert preview["rows"][-1]["name"] == "Иван000499"
+    assert preview["estimated_total_rows"] == rows
@@ -0,0 +1,59 @@
+import json
+from sqlalchemy import text
+from app.models import ImportHistory, SessionLocal
+
+CSV = b"name,age\nAnna,30\nBoris,41\n"
+
+
+def _import(api, **request):
+    response = api.post(
+        "/api/tables/import-csv",
+        files={"file": ("people.csv", CSV)},
+        data={"table_name": "people", "request": json.dumps({"table_name": "people", **request})},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _names():
+    db = SessionLocal()
+    try:
+        return [name for (name,) in db.execute(text("SELECT name FROM people ORDER BY id"))]
+    finally:
+        db.close()
+
+
+def test_same_file_and_request_is_deduplicated(api):
+    assert not _import(api)["deduplicated"]
+    assert _import(api)["deduplicated"]
+    assert _names() == ["Anna", "Boris"]
+
+
+def test_same_file_with_edited_rows_is_imported(api):
+    _import(api)
+    edited = [{"name": "Anna", "age": "31"}, {"name": "Vera", "age": "25"}]
+
+    result = _import(api, edited_preview_rows=edited)
+
+    assert not result["deduplicated"]
+    assert result["rows_imported"] == 2
+    assert _names() == ["Anna", "Boris", "Anna", "Vera"]
+
+
+def test_same_file_with_other_mapping_is_imported(api):
+    _import(api)
+    result = _import(api, columns_mapping={"name": "name"})
+    assert not result["deduplicated"]
+
+
+def test_same_file_from_another_user_is_imported(api):
+    _import(api)
+    db = SessionLocal()
+    db.query(ImportHistory).update({"user_id": 2})
+    db.commit()
+    db.close()
+
+    result = _import(api)
+
+    assert not result["deduplicated"]
+    assert _names() == ["Anna", "Boris", "Anna", "Boris"]
@@ -0,0 +1,47 @@
+import os
+import time
+from app.config import settings
+from app.models import ImportHistory, SessionLocal
+from app.utils.import_errors import purge_expired_error_reports
+
+
+def _report(directory, name, age):
+    path = directory / name
+    path.write_bytes(b"")
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return str(path)
+
+
+def test_expired_error_reports_are_purged(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_ERROR_REPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "IMPORT_ERROR_REPORT_TTL_SECONDS", 3600)
+    expired = _report(tmp_path, "expired.jsonl.gz", 7200)
+    fresh = _report(tmp_path, "fresh.jsonl.gz", 60)
+    orphan = _report(tmp_path, "orphan.jsonl.gz", 7200)
+    resumable = _report(tmp_path, "resumable.jsonl.gz", 7200)
+
+    db = SessionLocal()
+    done = ImportHistory(
+        user_id=1, table_name="people", file_name="people.csv", status="partial",
+        error_count=500, validation_errors=[{"row": 2, "column": "age", "error": "bad"}], error_report_path=expired,
+    )
+    interrupted = ImportHistory(
+        user_id=1, table_name="people", file_name="people.csv", status="interrupted",
+        resume_state={"errors": {"report_path": resumable}},
+    )
+    db.add_all([done, interrupted])
+    db.commit()
+
+    assert purge_expired_error_reports(db) == 2
+    db.refresh(done)
+    done_id = done.id
+    assert done.error_report_path is None
+    db.close()
+    assert sorted(os.listdir(tmp_path)) == ["fresh.jsonl.gz", "resumable.jsonl.gz"]
+    assert os.path.exists(fresh) and not os.path.exists(orphan)
+
+    # The history keeps its inline errors
+    page = api.get(f"/api/tables/history/{done_id}/errors").json()
+    assert page["total"] == 500
+    assert [error["row"] for error in page["errors"]] == [2]
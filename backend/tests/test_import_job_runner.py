@@ -0,0 +1,101 @@
+import time
+from datetime import datetime, timedelta
+from app.config import settings
+from app.models import ImportJob, SessionLocal
+from app.routes.tables import run_import_job
+from app.utils.import_queue import start_import_job_heartbeat, update_import_job
+
+LONG_AGO = datetime.utcnow() - timedelta(hours=1)
+
+
+def _add_job(**fields):
+    db = SessionLocal()
+    job = ImportJob(
+        id="job-1",
+        user_id=1,
+        table_name="people",
+        file_name="people.csv",
+        status="running",
+        worker_id="worker-a",
+        heartbeat_at=LONG_AGO,
+        params={},
+        upload_data=b"name,age\nAnna,30\n",
+    )
+    for name, value in fields.items():
+        setattr(job, name, value)
+    db.add(job)
+    db.commit()
+    db.close()
+
+
+def _job():
+    db = SessionLocal()
+    try:
+        return db.query(ImportJob).filter(ImportJob.id == "job-1").first()
+    finally:
+        db.close()
+
+
+def test_missing_job_is_ignored(api):
+    run_import_job("no-such-job")
+
+
+def test_invalid_options_fail_the_job(api):
+    _add_job(params={"options": {"mode": "no-such-mode"}})
+
+    run_import_job("job-1")
+
+    assert _job().status == "failed"
+
+
+def test_update_from_another_worker_is_ignored(api):
+    _add_job(status="failed")
+
+    assert not update_import_job("job-1", "worker-a", status="completed")
+    assert not update_import_job("job-1", "worker-b", progress=50)
+    assert _job().status == "failed"
+
+
+def test_heartbeat_is_sent_while_the_job_runs(api, monkeypatch):
+    _add_job()
+    monkeypatch.setattr(settings, "IMPORT_JOB_HEARTBEAT_SECONDS", 0.01)
+
+    stop = start_import_job_heartbeat("job-1", "worker-a")
+    time.sleep(0.2)
+    stop()
+
+    assert _job().heartbeat_at > LONG_AGO + timedelta(minutes=30)
+
+
+def test_job_left_queued_is_run_after_startup(api, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    _add_job(status="queued", worker_id=None, params={"options": {}})
+    monkeypatch.setattr(settings, "IMPORT_INLINE_POLL_SECONDS", 0.05)
+
+    with TestClient(app):
+        deadline = time.monotonic() + 10
+        while _job().status == "queued" and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert _job().status == "completed"
+
+
+def test_cancel_right_before_the_commit_is_not_throttled_away(api, monkeypatch):
+    from app.routes import tables
+
+    _add_job(params={"options": {}})
+    checks = []
+
+    def cancel_requested(job_id):
+        # Asked to cancel after the batch was checked, less than a second before the commit
+        checks.append(job_id)
+        return len(checks) > 1
+
+    monkeypatch.setattr(tables, "is_import_job_cancel_requested", cancel_requested)
+
+    run_import_job("job-1")
+
+    assert len(checks) == 2
+    assert _job().status == "cancelled"
@@ -0,0 +1,81 @@
+import asyncio
+from app.config import settings
+from app.models import ImportJob, SessionLocal
+from app.routes import tables
+from app.utils import import_job_watch
+
+
+def _add_jobs(*job_ids):
+    db = SessionLocal()
+    for job_id in job_ids:
+        db.add(ImportJob(id=job_id, user_id=1, table_name="people", file_name="people.csv", status="queued", params={}))
+    db.commit()
+    db.close()
+
+
+def test_progress_stream_reaps_once_and_reuses_queue_status(api, monkeypatch):
+    _add_jobs("job-1")
+    calls = {"reap": 0, "queue": 0, "loads": 0}
+
+    def reap(db):
+        calls["reap"] += 1
+        return 0
+
+    def queue_status(db, job):
+        calls["queue"] += 1
+        return {"queue_position": 1, "estimated_wait_seconds": None}
+
+    load_import_jobs = import_job_watch.load_import_jobs
+
+    def load(job_ids):
+        # The job finishes after a few unchanged ticks of the stream
+        calls["loads"] += 1
+        if calls["loads"] == 6:
+            db = SessionLocal()
+            db.query(ImportJob).filter(ImportJob.id == "job-1").update({"status": "completed"})
+            db.commit()
+            db.close()
+        return load_import_jobs(job_ids)
+
+    monkeypatch.setattr(tables, "reap_stale_import_jobs", reap)
+    monkeypatch.setattr(tables, "get_queue_status", queue_status)
+    monkeypatch.setattr(import_job_watch, "load_import_jobs", load)
+    monkeypatch.setattr(settings, "IMPORT_PROGRESS_STREAM_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "IMPORT_QUEUE_STATUS_INTERVAL", 3600)
+
+    response = api.get("/api/tables/import-csv/jobs/job-1/events")
+
+    assert response.status_code == 200
+    assert response.text.count("event: progress") == 2
+    assert '"queue_position": 1' in response.text
+    assert calls["reap"] == 1
+    assert calls["queue"] == 1
+
+
+def test_streams_share_one_poller(api, monkeypatch):
+    _add_jobs("job-1", "job-2")
+    loads = []
+    load_import_jobs = import_job_watch.load_import_jobs
+
+    def load(job_ids):
+        loads.append(sorted(job_ids))
+        return load_import_jobs(job_ids)
+
+    monkeypatch.setattr(import_job_watch, "load_import_jobs", load)
+    monkeypatch.setattr(settings, "IMPORT_PROGRESS_STREAM_INTERVAL", 0.01)
+    watcher = import_job_watch.ImportJobWatcher()
+
+    async def follow(job_id):
+        rows = watcher.watch(job_id)
+        seen = [await rows.__anext__() for _ in range(4)]
+        await rows.aclose()
+        return [job.id for job in seen]
+
+    async def both():
+        return await asyncio.gather(follow("job-1"), follow("job-2"))
+
+    assert asyncio.run(both()) == [["job-1"] * 4, ["job-2"] * 4]
+    # One initial read per stream, then every tick reads both jobs at once
+    assert loads.count(["job-1"]) <= 2 and loads.count(["job-2"]) <= 2
+    assert ["job-1", "job-2"] in loads
+    assert len(loads) <= 2 + 4
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import pytest
+from app.config import settings
+from app.utils import import_staging
+from app.utils.import_staging import StagingQuotaExceeded
+
+
+class _SlowUpload:
+    """Upload that hands out its chunks one at a time, letting other uploads run in between"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def read(self, size=-1):
+        await asyncio.sleep(0)
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+@pytest.fixture
+def staging(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_STAGING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "IMPORT_STAGING_QUOTA_BYTES", 10)
+    monkeypatch.setattr(import_staging, "_RESERVATION_STEP", 2)
+    return tmp_path
+
+
+def _staged(staging):
+    return {name: os.path.getsize(staging / name) for name in os.listdir(staging) if name.endswith(".upload")}
+
+
+def test_concurrent_uploads_cannot_exceed_quota(staging):
+    async def upload():
+        return await import_staging.retain_upload(_SlowUpload([b"ab", b"cd", b"ef"]))
+
+    async def both():
+        return await asyncio.gather(upload(), upload(), return_exceptions=True)
+
+    results = asyncio.run(both())
+
+    assert sum(isinstance(result, StagingQuotaExceeded) for result in results) == 1
+    assert list(_staged(staging).values()) == [6]
+
+
+def test_finished_upload_releases_unused_reservation(staging, monkeypatch):
+    monkeypatch.setattr(import_staging, "_RESERVATION_STEP", 8)
+
+    path = asyncio.run(import_staging.retain_upload(_SlowUpload([b"abc"])))
+
+    with open(path, "rb") as retained:
+        assert retained.read() == b"abc"
+    assert _staged(staging) == {os.path.basename(path): 3}
@@ -0,0 +1,35 @@
+from app.utils import import_telemetry
+from app.utils.import_telemetry import ImportTelemetry
+
+
+def _memory(monkeypatch, peak, rss):
+    memory = {"peak": peak, "rss": rss}
+    monkeypatch.setattr(import_telemetry, "max_rss", lambda: memory["peak"])
+    monkeypatch.setattr(import_telemetry, "current_rss", lambda: memory["rss"])
+    return memory
+
+
+def _peaks(telemetry):
+    return {stage["name"]: stage["peak_rss_bytes"] for stage in telemetry.snapshot()["stages"]}
+
+
+def test_peak_freed_before_the_stage_ends_is_reported(monkeypatch):
+    memory = _memory(monkeypatch, peak=100, rss=100)
+    telemetry = ImportTelemetry()
+
+    with telemetry.stage("load"):
+        memory["peak"] = 500  # a batch is materialised and released again
+        memory["rss"] = 120
+
+    assert _peaks(telemetry) == {"load": 500}
+    assert telemetry.snapshot()["peak_rss_bytes"] == 500
+
+
+def test_stage_below_an_earlier_peak_reports_its_own_samples(monkeypatch):
+    memory = _memory(monkeypatch, peak=1000, rss=300)
+    telemetry = ImportTelemetry()
+
+    with telemetry.stage("validate"):
+        memory["rss"] = 200
+
+    assert _peaks(telemetry) == {"validate": 300}
@@ -0,0 +1,30 @@
+import json
+from app.config import settings
+from app.routes import tables
+
+
+def _import(api, **request):
+    return api.post(
+        "/api/tables/import-csv",
+        files={"file": ("people.csv", b"name,age\nAnna,30\n")},
+        data={"table_name": "people", "request": json.dumps({"table_name": "people", **request})},
+    )
+
+
+def test_requested_columnar_validation_without_pyarrow_is_rejected(api, monkeypatch):
+    monkeypatch.setattr(tables, "columnar_available", lambda: False)
+
+    response = _import(api, validation_mode="columnar")
+
+    assert response.status_code == 400
+    assert "pyarrow" in response.json()["detail"]
+
+
+def test_columnar_default_without_pyarrow_validates_rows(api, monkeypatch):
+    monkeypatch.setattr(tables, "columnar_available", lambda: False)
+    monkeypatch.setattr(settings, "IMPORT_VALIDATION_MODE", "columnar")
+
+    response = _import(api)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["rows_imported"] == 1
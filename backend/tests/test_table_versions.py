@@ -0,0 +1,108 @@
+import json
+from sqlalchemy import text
+from app.config import settings
+from app.models import ImportHistory, SessionLocal, TableVersion
+from app.routes import tables
+
+
+def _rows():
+    db = SessionLocal()
+    try:
+        return [tuple(row) for row in db.execute(text("SELECT name, age FROM people ORDER BY id"))]
+    finally:
+        db.close()
+
+
+def _versions():
+    db = SessionLocal()
+    try:
+        return db.query(TableVersion).order_by(TableVersion.id).all()
+    finally:
+        db.close()
+
+
+def test_row_edits_derive_row_count_from_the_previous_version(api, monkeypatch):
+    counted = []
+    row_count = tables.get_row_count
+    monkeypatch.setattr(tables, "get_row_count", lambda db, name: counted.append(name) or row_count(db, name))
+
+    first = api.post("/api/tables/people/rows", json={"values": {"name": "Anna", "age": 30}}).json()["row_id"]
+    api.post("/api/tables/people/rows", json={"values": {"name": "Boris", "age": 41}})
+    api.put(f"/api/tables/people/rows/{first}", json={"values": {"age": 31}})
+    api.request("DELETE", "/api/tables/people/rows", json={"row_ids": [first]})
+    api.post("/api/tables/people/rows", json={"values": {"name": "Vera", "age": 25}})
+
+    assert [version.row_count for version in _versions()] == [0, 1, 2, 2, 1]
+    assert len(counted) == 1
+
+
+def test_resumed_import_after_an_edit_is_rolled_back_from_a_new_base(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_STAGING_DIR", str(tmp_path))
+    response = api.post(
+        "/api/tables/import-csv",
+        files={"file": ("people.csv", b"name,age\nAnna,30\n")},
+        data={"table_name": "people", "request": json.dumps({"table_name": "people"})},
+    )
+    assert response.status_code == 200, response.text
+    api.put("/api/tables/people/rows/1", json={"values": {"age": 31}})
+    delta = _versions()[-1]
+    assert delta.kind == "delta"
+
+    # An import interrupted after its first row, resumed after the edit above
+    upload = tmp_path / "people.upload"
+    upload.write_bytes(b"name,age\nAnna,30\nBoris,41\n")
+    db = SessionLocal()
+    history = ImportHistory(
+        user_id=1,
+        table_name="people",
+        file_name="people.csv",
+        rows_imported=1,
+        status="interrupted",
+        checkpoint_row=3,
+        upload_path=str(upload),
+        resume_state={"columns_mapping": {}, "delimiter": None, "encoding": "utf-8", "options": {"resumable": True}},
+    )
+    db.add(history)
+    db.commit()
+    history_id = history.id
+    db.close()
+    assert api.post(f"/api/tables/import-csv/{history_id}/resume").status_code == 200
+    assert _rows() == [("Anna", 31), ("Boris", 41)]
+
+    # Restoring snapshots needs PostgreSQL, the replay plan shows what a rollback does
+    db = SessionLocal()
+    try:
+        base, deltas = tables._plan_version_replay(db, db.get(TableVersion, delta.id))
+        assert base is not None and base.message == "Before resuming CSV import: people.csv"
+        assert base.row_count == 1
+        assert [version.id for version in deltas] == [delta.id]
+    finally:
+        db.close()
+
+
+def test_compaction_keeps_versions_whose_connection_is_gone(api, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.utils.version_retention import compact_table_versions
+
+    for field in ("KEEP_LAST", "KEEP_DAYS", "KEEP_DAILY_DAYS", "KEEP_WEEKLY_WEEKS"):
+        monkeypatch.setattr(settings, f"TABLE_VERSION_{field}", 0)
+    old = datetime.utcnow() - timedelta(days=400)
+    db = SessionLocal()
+    db.add(TableVersion(
+        user_id=1, table_name="people", action="import_before", kind="snapshot", row_count=0,
+        byte_size=10, created_at=old, version_data={},
+    ))
+    db.add(TableVersion(
+        user_id=1, table_name="people", action="import_before", kind="table", row_count=0, byte_size=1000,
+        created_at=old, connection_id=999, version_data={"snapshot_table": "people_v1"},
+    ))
+    db.commit()
+
+    report = compact_table_versions(db)
+    db.close()
+
+    assert report["deleted_versions"] == 1
+    assert report["reclaimed_bytes"] == 10
+    assert report["dropped_tables"] == 0
+    assert report["failed_tables"] == ["people"]
+    assert [version.kind for version in _versions()] == ["table"]
@@ -0,0 +1,37 @@
+import pytest
+from app import worker
+from app.config import settings
+
+
+class _StopLoop(Exception):
+    pass
+
+
+class _Session:
+    def close(self) -> None:
+        pass
+
+
+def test_compaction_runs_once_per_interval(monkeypatch):
+    compactions = []
+    polls = []
+
+    def sleep(seconds):
+        polls.append(seconds)
+        if len(polls) == 2:
+            raise _StopLoop()
+
+    monkeypatch.setattr(settings, "TABLE_VERSION_COMPACTION_INTERVAL_SECONDS", 3600)
+    monkeypatch.setattr(worker, "SessionLocal", _Session)
+    monkeypatch.setattr(worker, "reap_stale_import_jobs", lambda db: 0)
+    monkeypatch.setattr(worker, "purge_finished_import_jobs", lambda db: 0)
+    monkeypatch.setattr(worker, "claim_import_job", lambda db, worker_id: None)
+    monkeypatch.setattr(worker, "run_version_compaction", lambda: compactions.append(1))
+    monkeypatch.setattr(worker.signal, "signal", lambda signum, handler: None)
+    monkeypatch.setattr(worker.time, "sleep", sleep)
+
+    with pytest.raises(_StopLoop):
+        worker.main()
+
+    assert len(polls) == 2
+    assert len(compactions) == 1
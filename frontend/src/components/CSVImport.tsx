@@ -12,11 +12,25 @@ interface ValidationError {
   suggested_fix: string;
 }
 
+interface ImportStageTelemetry {
+  name: string;
+  seconds: number;
+  rows_per_second?: number | null;
+  bytes_per_second?: number | null;
+}
+
 interface ImportJobState {
   jobId: string;
-  status: 'queued' | 'running' | 'completed' | 'failed' | 'unknown';
+  status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled' | 'unknown';
   progress: number;
   message: string;
+  cancelRequested?: boolean;
+  rowsProcessed?: number | null;
+  rowsPerSecond?: number | null;
+  etaSeconds?: number | null;
+  queuePosition?: number | null;
+  estimatedWaitSeconds?: number | null;
+  stages?: ImportStageTelemetry[];
 }
 
 type WizardStep = 1 | 2;
@@ -30,6 +44,7 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
   const [previewRows, setPreviewRows] = useState<Record<string, any>[]>([]);
   const [delimiterMode, setDelimiterMode] = useState<'auto' | ',' | ';' | '\t'>('auto');
   const [resolvedDelimiter, setResolvedDelimiter] = useState<string>('');
+  const [estimatedTotalRows, setEstimatedTotalRows] = useState<number | null>(null);
   const [encoding, setEncoding] = useState<string>('utf-8');
   const [useEditedPreviewRows, setUseEditedPreviewRows] = useState(false);
   const [useAsyncImport, setUseAsyncImport] = useState(true);
@@ -38,6 +53,7 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
   const [validationErrors, setValidationErrors] = useState<ValidationError[]>([]);
+  const [validationErrorCount, setValidationErrorCount] = useState(0);
   const [tableColumns, setTableColumns] = useState<string[]>([]);
 
   // Get table columns when table is selected
@@ -52,55 +68,76 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
       return;
     }
 
-    if (importJob.status === 'completed' || importJob.status === 'failed') {
-      return;
-    }
+    const controller = new AbortController();
+    const handleUpdate = (payload: any) => {
+      setImportJob({
+        jobId: payload.job_id,
+        status: payload.status,
+        progress: payload.progress ?? 0,
+        message: payload.message || '',
+        cancelRequested: payload.cancel_requested,
+        rowsProcessed: payload.rows_processed,
+        rowsPerSecond: payload.rows_per_second,
+        etaSeconds: payload.eta_seconds,
+        queuePosition: payload.queue_position,
+        estimatedWaitSeconds: payload.estimated_wait_seconds,
+        stages: payload.telemetry?.stages,
+      });
 
-    const intervalId = window.setInterval(async () => {
-      try {
-        const response = await tableService.getImportJobStatus(importJob.jobId);
-        const payload = response.data;
+      if (payload.status === 'completed' && payload.result) {
+        const result = payload.result;
+        if (Array.isArray(result.errors) && result.errors.length > 0) {
+          setValidationErrors(result.errors);
+          setValidationErrorCount(result.error_count ?? result.errors.length);
+          setError(`Импорт завершен с ошибками: ${result.error_count ?? result.errors.length}`);
+        } else {
+          setSuccess(`Успешно импортировано строк: ${result.rows_imported ?? 0}`);
+        }
 
-        setImportJob({
-          jobId: payload.job_id,
-          status: payload.status,
-          progress: payload.progress ?? 0,
-          message: payload.message || '',
-        });
+        setFile(null);
+        setSelectedTable('');
+        setCsvHeaders([]);
+        setPreviewRows([]);
+        setColumnsMapping({});
+        setStep(1);
+        setUseEditedPreviewRows(false);
+        setLoading(false);
+      }
 
-        if (payload.status === 'completed' && payload.result) {
-          const result = payload.result;
-          if (Array.isArray(result.errors) && result.errors.length > 0) {
-            setValidationErrors(result.errors);
-            setError(`Импорт завершен с ошибками: ${result.errors.length}`);
-          } else {
-            setSuccess(`Успешно импортировано строк: ${result.rows_imported ?? 0}`);
-          }
-
-          setFile(null);
-          setSelectedTable('');
-          setCsvHeaders([]);
-          setPreviewRows([]);
-          setColumnsMapping({});
-          setStep(1);
-          setUseEditedPreviewRows(false);
-          setLoading(false);
-        }
+      if (payload.status === 'failed') {
+        setError(payload.message || 'Асинхронный импорт завершился ошибкой');
+        setLoading(false);
+      }
 
-        if (payload.status === 'failed') {
-          setError(payload.message || 'Асинхронный импорт завершился ошибкой');
-          setLoading(false);
-        }
-      } catch (err: any) {
-        setError(err.response?.data?.detail || 'Ошибка получения статуса импорта');
+      if (payload.status === 'cancelled') {
+        setError('Импорт отменён');
         setLoading(false);
       }
-    }, 1500);
+    };
+
+    tableService.streamImportJob(importJob.jobId, handleUpdate, controller.signal).catch((err: any) => {
+      if (err.name !== 'AbortError') {
+        setError(err.message || 'Ошибка получения статуса импорта');
+        setLoading(false);
+      }
+    });
 
     return () => {
-      window.clearInterval(intervalId);
+      controller.abort();
     };
-  }, [importJob?.jobId, importJob?.status]);
+  }, [importJob?.jobId]);
+
+  const handleCancelImport = async () => {
+    if (!importJob) {
+      return;
+    }
+    try {
+      await tableService.cancelImportJob(importJob.jobId);
+      setImportJob({ ...importJob, cancelRequested: true });
+    } catch (err: any) {
+      setError(err.response?.data?.detail || 'Не удалось отменить импорт');
+    }
+  };
 
   const fetchTableSchema = async () => {
     try {
@@ -115,8 +152,9 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const selectedFile = e.target.files?.[0];
     if (selectedFile) {
-      if (selectedFile.type !== 'text/csv' && !selectedFile.name.endsWith('.csv')) {
-        setError('Пожалуйста, выберите CSV файл');
+      const isCsv = /\.csv(\.(gz|bz2|xz))?$|\.(zip|parquet|arrow|feather|ipc)$/i.test(selectedFile.name);
+      if (selectedFile.type !== 'text/csv' && !isCsv) {
+        setError('Пожалуйста, выберите CSV файл (можно сжатый: .gz, .bz2, .xz, .zip) или Parquet/Arrow');
         return;
       }
 
@@ -128,6 +166,7 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
       setPreviewRows([]);
       setColumnsMapping({});
       setResolvedDelimiter('');
+      setEstimatedTotalRows(null);
     }
   };
 
@@ -154,6 +193,7 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
       setCsvHeaders(headers);
       setPreviewRows(rows);
       setResolvedDelimiter(response.data.delimiter || '');
+      setEstimatedTotalRows(response.data.estimated_total_rows ?? null);
 
       const mapping: Record<string, string> = {};
       headers.forEach((header: string) => {
@@ -218,7 +258,8 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
       
       if (response.data.errors.length > 0) {
         setValidationErrors(response.data.errors);
-        setError(`Импорт завершен с ошибками: ${response.data.errors.length}`);
+        setValidationErrorCount(response.data.error_count ?? response.data.errors.length);
+        setError(`Импорт завершен с ошибками: ${response.data.error_count ?? response.data.errors.length}`);
       } else {
         setSuccess(`Успешно импортировано строк: ${response.data.rows_imported}`);
         setFile(null);
@@ -278,7 +319,7 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
           <input
             id="csv-file"
             type="file"
-            accept=".csv"
+            accept=".csv,.gz,.bz2,.xz,.zip,.parquet,.arrow,.feather,.ipc"
             onChange={handleFileChange}
             required
           />
@@ -325,6 +366,9 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
           {resolvedDelimiter && (
             <span className="detected-meta">Определён разделитель: <strong>{resolvedDelimiter === '\t' ? 'TAB' : resolvedDelimiter}</strong></span>
           )}
+          {estimatedTotalRows !== null && (
+            <span className="detected-meta">Строк в файле: <strong>~{estimatedTotalRows}</strong></span>
+          )}
         </div>
 
         {step === 2 && csvHeaders.length > 0 && tableColumns.length > 0 && (
@@ -411,6 +455,43 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
               <div className="job-progress-fill" style={{ width: `${Math.max(0, Math.min(100, importJob.progress))}%` }} />
             </div>
             <div className="job-status-message">{importJob.message}</div>
+            {importJob.status === 'queued' && importJob.queuePosition != null && (
+              <div className="job-status-message">
+                Позиция в очереди: {importJob.queuePosition}
+                {importJob.estimatedWaitSeconds != null && `, ожидание ~${importJob.estimatedWaitSeconds} с`}
+              </div>
+            )}
+            {importJob.status === 'running' && importJob.rowsPerSecond != null && (
+              <div className="job-status-message">
+                {importJob.rowsProcessed ?? 0} строк, {Math.round(importJob.rowsPerSecond)} строк/с
+                {importJob.etaSeconds != null && `, осталось ~${importJob.etaSeconds} с`}
+              </div>
+            )}
+            {importJob.stages && importJob.stages.length > 0 && (
+              <div className="job-status-message">
+                Этапы:{' '}
+                {importJob.stages
+                  .map((stage) => {
+                    const rate = stage.rows_per_second != null
+                      ? ` (${Math.round(stage.rows_per_second)} строк/с)`
+                      : stage.bytes_per_second != null
+                        ? ` (${(stage.bytes_per_second / 1048576).toFixed(1)} МБ/с)`
+                        : '';
+                    return `${stage.name} ${stage.seconds.toFixed(2)} с${rate}`;
+                  })
+                  .join(', ')}
+              </div>
+            )}
+            {(importJob.status === 'queued' || importJob.status === 'running') && (
+              <button
+                type="button"
+                onClick={handleCancelImport}
+                disabled={importJob.cancelRequested}
+                className="btn btn-small btn-danger"
+              >
+                {importJob.cancelRequested ? 'Отмена...' : 'Отменить импорт'}
+              </button>
+            )}
           </div>
         )}
 
@@ -433,8 +514,8 @@ const CSVImport: React.FC<CSVImportProps> = ({ tables }) => {
                 <p className="error-fix">💡 Решение: {error.suggested_fix}</p>
               </div>
             ))}
-            {validationErrors.length > 10 && (
-              <p className="more-errors">...и еще {validationErrors.length - 10} ошибок</p>
+            {validationErrorCount > 10 && (
+              <p className="more-errors">...и еще {validationErrorCount - 10} ошибок</p>
             )}
           </div>
         </div>
@@ -19,11 +19,16 @@ interface TableVersion {
   user_id: number;
   table_name: string;
   action: string;
+  kind: string;
   row_count: number;
   message?: string;
+  byte_size?: number | null;
+  source_version_id?: number | null;
   created_at: string;
 }
 
+const VERSIONS_PAGE_SIZE = 30;
+
 const ViewTable: React.FC<ViewTableProps> = ({ tables, onTablesChange }): JSX.Element => {
   const [selectedTable, setSelectedTable] = useState('');
   const [tableData, setTableData] = useState<TableData | null>(null);
@@ -40,6 +45,7 @@ const ViewTable: React.FC<ViewTableProps> = ({ tables, onTablesChange }): JSX.El
   const [selectedRowIds, setSelectedRowIds] = useState<number[]>([]);
   const [versions, setVersions] = useState<TableVersion[]>([]);
   const [selectedVersionId, setSelectedVersionId] = useState<string>('');
+  const [hasMoreVersions, setHasMoreVersions] = useState(false);
 
   useEffect(() => {
     if (selectedTable) {
@@ -67,8 +73,9 @@ const ViewTable: React.FC<ViewTableProps> = ({ tables, onTablesChange }): JSX.El
 
   const loadVersions = async (tableName: string) => {
     try {
-      const response = await tableService.getTableVersions(tableName, 30);
+      const response = await tableService.getTableVersions(tableName, VERSIONS_PAGE_SIZE);
       setVersions(response.data || []);
+      setHasMoreVersions((response.data || []).length === VERSIONS_PAGE_SIZE);
       setSelectedVersionId((prev) => {
         if (prev) {
           return prev;
@@ -80,6 +87,23 @@ const ViewTable: React.FC<ViewTableProps> = ({ tables, onTablesChange }): JSX.El
       });
     } catch {
       setVersions([]);
+      setHasMoreVersions(false);
+    }
+  };
+
+  const loadMoreVersions = async () => {
+    if (!selectedTable || versions.length === 0) return;
+    try {
+      const response = await tableService.getTableVersions(
+        selectedTable,
+        VERSIONS_PAGE_SIZE,
+        versions[versions.length - 1].id
+      );
+      const older: TableVersion[] = response.data || [];
+      setVersions((prev) => [...prev, ...older]);
+      setHasMoreVersions(older.length === VERSIONS_PAGE_SIZE);
+    } catch (err: any) {
+      setError(err.response?.data?.detail || 'Ошибка загрузки версий');
     }
   };
 
@@ -303,10 +327,17 @@ const ViewTable: React.FC<ViewTableProps> = ({ tables, onTablesChange }): JSX.El
             {versions.length === 0 && <option value="">Нет доступных версий</option>}
             {versions.map((version) => (
               <option key={version.id} value={String(version.id)}>
-                #{version.id} • {version.action} • rows: {version.row_count} • {new Date(version.created_at).toLocaleString()}
+                #{version.id} • {version.action} • rows: {version.row_count}
+                {version.byte_size != null ? ` • ${(version.byte_size / 1024).toFixed(1)} KB` : ''}
+                {version.source_version_id != null ? ` • из #${version.source_version_id}` : ''} • {new Date(version.created_at).toLocaleString()}
               </option>
             ))}
           </select>
+          {hasMoreVersions && (
+            <button className="btn btn-secondary" onClick={loadMoreVersions} disabled={loading}>
+              Ещё версии
+            </button>
+          )}
           <button
             className="btn btn-warning"
             onClick={handleRollback}
@@ -45,8 +45,8 @@ export const tableService = {
   getTableData: (tableName: string, limit: number = 100, offset: number = 0) =>
     api.get(`/tables/${tableName}/data`, { params: { limit, offset } }),
 
-  getTableVersions: (tableName: string, limit: number = 20) =>
-    api.get(`/tables/${tableName}/versions`, { params: { limit } }),
+  getTableVersions: (tableName: string, limit: number = 20, beforeId?: number) =>
+    api.get(`/tables/${tableName}/versions`, { params: { limit, before_id: beforeId } }),
 
   rollbackTableToVersion: (tableName: string, versionId: number) =>
     api.post(`/tables/${tableName}/rollback/${versionId}`),
@@ -142,6 +142,47 @@ export const tableService = {
 
   getImportJobStatus: (jobId: string) =>
     api.get(`/tables/import-csv/jobs/${jobId}`),
+
+  cancelImportJob: (jobId: string) =>
+    api.post(`/tables/import-csv/jobs/${jobId}/cancel`),
+
+  // Server-Sent Events over fetch, so the token goes in the Authorization header
+  streamImportJob: async (jobId: string, onUpdate: (payload: any) => void, signal: AbortSignal) => {
+    const token = localStorage.getItem('access_token');
+    const response = await fetch(`${API_BASE_URL}/tables/import-csv/jobs/${jobId}/events`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+      signal,
+    });
+    if (!response.ok || !response.body) {
+      const detail = await response.json().catch(() => null);
+      throw new Error(detail?.detail || 'Ошибка получения статуса импорта');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) {
+        return;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const data = buffer
+          .slice(0, boundary)
+          .split('\n')
+          .filter((line) => line.startsWith('data:'))
+          .map((line) => line.slice(5).trim())
+          .join('\n');
+        buffer = buffer.slice(boundary + 2);
+        if (data) {
+          onUpdate(JSON.parse(data));
+        }
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+  },
   
   getImportHistory: () =>
     api.get('/tables/history/list'),